@@ -0,0 +1,51 @@
+"""add vacancy search vector
+
+Revision ID: 66d8db324971
+Revises: 989966f609df
+Create Date: 2026-10-19 16:12:40.518203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "66d8db324971"
+down_revision: Union[str, None] = "989966f609df"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "vacancy",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('russian'::regconfig, title) "
+                "|| to_tsvector('english'::regconfig, title)",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "vacancy_search_vector_idx",
+        "vacancy",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "vacancy_search_vector_idx",
+        table_name="vacancy",
+        postgresql_using="gin",
+    )
+    op.drop_column("vacancy", "search_vector")
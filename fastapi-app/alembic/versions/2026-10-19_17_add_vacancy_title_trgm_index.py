@@ -0,0 +1,39 @@
+"""add vacancy title trgm index
+
+Revision ID: 258ba0287ba4
+Revises: 66d8db324971
+Create Date: 2026-10-19 17:03:11.904512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "258ba0287ba4"
+down_revision: Union[str, None] = "66d8db324971"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "vacancy_title_trgm_idx",
+        "vacancy",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "vacancy_title_trgm_idx",
+        table_name="vacancy",
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
@@ -0,0 +1,43 @@
+"""add vacancy change feed indexes
+
+Revision ID: fe555ee3a2d1
+Revises: 258ba0287ba4
+Create Date: 2026-10-19 18:10:42.730151
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "fe555ee3a2d1"
+down_revision: Union[str, None] = "258ba0287ba4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "vacancy_created_at_id_idx",
+        "vacancy",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "vacancy_deleted_at_id_idx",
+        "vacancy",
+        ["deleted_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "vacancy_deleted_at_id_idx",
+        table_name="vacancy",
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+    op.drop_index("vacancy_created_at_id_idx", table_name="vacancy")
@@ -0,0 +1,173 @@
+"""partition vacancy table
+
+Revision ID: 5c0b8e7d41a9
+Revises: fe555ee3a2d1
+Create Date: 2026-10-19 19:02:17.384920
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5c0b8e7d41a9"
+down_revision: Union[str, None] = "fe555ee3a2d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VACANCY_SEARCH_VECTOR = (
+    "to_tsvector('russian'::regconfig, title) "
+    "|| to_tsvector('english'::regconfig, title)"
+)
+VACANCY_PARTITIONS = {"vacancy_active": "false", "vacancy_archived": "true"}
+COPIED_COLUMNS = (
+    "title, grade, lang, experience, link, company_id, id, created_at, deleted_at"
+)
+
+
+def vacancy_columns() -> list[sa.Column]:
+    return [
+        sa.Column("title", sa.String(length=127), nullable=False),
+        sa.Column(
+            "grade",
+            postgresql.ENUM(name="vac_grade", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "lang",
+            postgresql.ENUM(name="language", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "experience",
+            sa.Integer(),
+            nullable=False,
+            comment="Мин количество лет опыта",
+        ),
+        sa.Column("link", sa.String(length=2000), nullable=False, comment="Vac link"),
+        sa.Column("company_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(VACANCY_SEARCH_VECTOR, persisted=True),
+            nullable=False,
+        ),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("deleted_at", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["company_id"],
+            ["company.id"],
+            name=op.f("vacancy_company_id_fkey"),
+            ondelete="CASCADE",
+        ),
+    ]
+
+
+def create_vacancy_indexes() -> None:
+    op.create_index(
+        "vacancy_search_vector_idx",
+        "vacancy",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "vacancy_title_trgm_idx",
+        "vacancy",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "vacancy_created_at_id_idx",
+        "vacancy",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "vacancy_deleted_at_id_idx",
+        "vacancy",
+        ["deleted_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def drop_vacancy_indexes(table_name: str) -> None:
+    for index in (
+        "vacancy_search_vector_idx",
+        "vacancy_title_trgm_idx",
+        "vacancy_created_at_id_idx",
+        "vacancy_deleted_at_id_idx",
+    ):
+        op.drop_index(index, table_name=table_name)
+
+
+def upgrade() -> None:
+    op.rename_table("vacancy", "vacancy_unpartitioned")
+    op.drop_constraint("vacancy_pkey", "vacancy_unpartitioned")
+    op.drop_constraint("vacancy_link_key", "vacancy_unpartitioned")
+    op.drop_constraint("vacancy_company_id_fkey", "vacancy_unpartitioned")
+    drop_vacancy_indexes("vacancy_unpartitioned")
+
+    op.create_table(
+        "vacancy",
+        *vacancy_columns(),
+        sa.Column(
+            "is_archived", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id", "is_archived", name=op.f("vacancy_pkey")),
+        sa.CheckConstraint(
+            "is_archived = (deleted_at IS NOT NULL)",
+            name=op.f("vacancy_archived_check"),
+        ),
+        postgresql_partition_by="LIST (is_archived)",
+    )
+    for partition, value in VACANCY_PARTITIONS.items():
+        op.execute(
+            f"CREATE TABLE {partition} PARTITION OF vacancy FOR VALUES IN ({value})"
+        )
+    op.execute(
+        f"INSERT INTO vacancy ({COPIED_COLUMNS}, is_archived) "
+        f"SELECT {COPIED_COLUMNS}, deleted_at IS NOT NULL FROM vacancy_unpartitioned"
+    )
+    op.drop_table("vacancy_unpartitioned")
+
+    create_vacancy_indexes()
+    op.create_index("vacancy_active_link_key", "vacancy_active", ["link"], unique=True)
+    op.create_index(
+        "vacancy_archived_link_idx", "vacancy_archived", ["link"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.rename_table("vacancy", "vacancy_partitioned")
+    op.drop_constraint("vacancy_pkey", "vacancy_partitioned")
+    op.drop_constraint("vacancy_company_id_fkey", "vacancy_partitioned")
+    drop_vacancy_indexes("vacancy_partitioned")
+
+    op.create_table(
+        "vacancy",
+        *vacancy_columns(),
+        sa.PrimaryKeyConstraint("id", name=op.f("vacancy_pkey")),
+        sa.UniqueConstraint("link", name=op.f("vacancy_link_key")),
+    )
+    # a link that came back after removal exists twice, keep the newest row
+    op.execute(
+        f"INSERT INTO vacancy ({COPIED_COLUMNS}) "
+        f"SELECT DISTINCT ON (link) {COPIED_COLUMNS} FROM vacancy_partitioned "
+        f"ORDER BY link, is_archived, created_at DESC"
+    )
+    op.drop_table("vacancy_partitioned")
+
+    create_vacancy_indexes()
@@ -0,0 +1,86 @@
+"""add vacancy link hash
+
+Revision ID: 9a4f2c1e6b37
+Revises: 5c0b8e7d41a9
+Create Date: 2026-10-19 20:14:05.518203
+
+"""
+
+from typing import Sequence, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4f2c1e6b37"
+down_revision: Union[str, None] = "5c0b8e7d41a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_link(link: str) -> str:
+    # src.utils.normalize_vacancy_link as of this revision, the hash of the
+    # stored link has to match the one the parsers compute
+    parts = urlsplit(link.strip())
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), "", ""))
+
+
+def upgrade() -> None:
+    # normalized links may collide on the old unique index
+    op.drop_index("vacancy_active_link_key", table_name="vacancy_active")
+    op.drop_index("vacancy_archived_link_idx", table_name="vacancy_archived")
+    connection = op.get_bind()
+    links = connection.execute(sa.text("SELECT id, link FROM vacancy")).all()
+    changed = [
+        {"id": id_, "link": normalize_link(link)}
+        for id_, link in links
+        if normalize_link(link) != link
+    ]
+    if changed:
+        connection.execute(
+            sa.text("UPDATE vacancy SET link = :link WHERE id = :id"), changed
+        )
+    # links that only differed in what was dropped now collide on the new
+    # unique key, the earliest vacancy of each is kept
+    op.execute("""
+        DELETE FROM vacancy USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY link, is_archived, deleted_at
+                ORDER BY created_at, id
+            ) AS n
+            FROM vacancy
+        ) AS ranked
+        WHERE vacancy.id = ranked.id AND ranked.n > 1
+        """)
+    op.add_column(
+        "vacancy",
+        sa.Column(
+            "link_hash",
+            sa.UUID(),
+            sa.Computed("md5(link)::uuid", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "vacancy_link_hash_key",
+        "vacancy",
+        ["link_hash", "is_archived", "deleted_at"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("vacancy_link_hash_key", table_name="vacancy")
+    op.drop_column("vacancy", "link_hash")
+    op.create_index("vacancy_active_link_key", "vacancy_active", ["link"], unique=True)
+    op.create_index(
+        "vacancy_archived_link_idx", "vacancy_archived", ["link"], unique=False
+    )
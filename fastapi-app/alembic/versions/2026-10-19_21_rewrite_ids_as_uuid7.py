@@ -0,0 +1,53 @@
+"""rewrite ids as uuid7
+
+Revision ID: 3d7e91b0c5fa
+Revises: 9a4f2c1e6b37
+Create Date: 2026-10-19 21:03:48.120644
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3d7e91b0c5fa"
+down_revision: Union[str, None] = "9a4f2c1e6b37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("company", "vacancy", "subscriber")
+
+
+def uuid7_from(created_at: str, uuid: str) -> str:
+    """created_at milliseconds and version 7 over the random bits of a uuid4,
+    the variant bits of both versions are the same."""
+    return (
+        f"(lpad(to_hex(floor(extract(epoch FROM {created_at}) * 1000)::bigint), "
+        f"12, '0') || '7' || substr(replace({uuid}::text, '-', ''), 14))::uuid"
+    )
+
+
+def upgrade() -> None:
+    op.drop_constraint("vacancy_company_id_fkey", "vacancy", type_="foreignkey")
+    company_id = uuid7_from("company.created_at", "company.id")
+    op.execute(
+        f"UPDATE vacancy SET company_id = {company_id} "
+        f"FROM company WHERE vacancy.company_id = company.id"
+    )
+    for table in TABLES:
+        op.execute(f"UPDATE {table} SET id = {uuid7_from('created_at', 'id')}")
+    op.create_foreign_key(
+        "vacancy_company_id_fkey",
+        "vacancy",
+        "company",
+        ["company_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+
+
+def downgrade() -> None:
+    # the rewritten ids are valid uuids for the previous revision too, and
+    # the random bits the timestamp replaced are gone
+    pass
@@ -0,0 +1,330 @@
+"""Throughput of each stage of the daily ingestion on replayed pages.
+
+    python -m benchmarks.ingestion run --reset --sizes 10 100 1000 \\
+        --latency 0.2 --output ingestion-$(git rev-parse --short HEAD).json
+    python -m benchmarks.ingestion compare ingestion-old.json ingestion-new.json
+
+The stages of daily_vacancy_processing, each timed over the whole backlog:
+
+    discovery  listing the vacancies and hashing their links
+    fetch      GET of every vacancy page
+    parse      title and description out of the page
+    classify   the GPT request, with its governor and retries, to the stub
+    persist    create_vacancies in shards of INGEST_SHARD_SIZE
+
+The pages come from benchmarks/replay.py, synthesized unless --fixtures is
+given, and OpenAI is benchmarks/openai_stub.py. Selenium listings are
+replayed as recorded link lists, the Aviasales listing page is parsed.
+Every backlog size runs in a fresh interpreter, so the peak RSS after a
+stage belongs to that size. Drops and recreates the tables of POSTGRES_DB.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Sequence
+
+from benchmarks import openai_stub
+from benchmarks.offline_run import reset_database
+from benchmarks.replay import Fixtures, offline, synthesize
+from src.config import get_settings
+from src.database import sessionmanager
+from src.db_crud.vacancies import create_vacancies
+from src.gpt_governor import gpt_governor
+from src.parsers import (
+    ALL_ACTUAL_PARSERS,
+    AviasalesVacancyParser,
+    add_company_id_to_parsers,
+)
+from src.utils import vacancy_link_hash
+
+STAGES = ("discovery", "fetch", "parse", "classify", "persist")
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(
+    latencies: Sequence[float],
+    items: int,
+    seconds: float,
+    errors: dict[str, int] | None = None,
+) -> dict:
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p99 = cuts[49], cuts[98]
+    else:
+        p50 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "items": items,
+        "seconds": seconds,
+        "links_per_second": items / seconds if seconds else 0.0,
+        "p50_ms": p50 * 1000,
+        "p99_ms": p99 * 1000,
+        "max_rss_mb": max_rss_mb(),
+        "failed": sum((errors or {}).values()),
+        "errors": errors or {},
+    }
+
+
+async def timed_map(
+    func: Callable[..., Awaitable], items: Sequence, concurrency: int
+) -> tuple[list, dict]:
+    """``func`` over ``items`` by ``concurrency`` tasks, in the items order.
+
+    An item that fails is skipped like the consumer skips a link: its
+    result is None and the error is counted by type.
+    """
+    results = [None] * len(items)
+    latencies = []
+    errors: dict[str, int] = {}
+    pending = iter(enumerate(items))
+
+    async def work():
+        for i, item in pending:
+            started = time.perf_counter()
+            try:
+                results[i] = await func(*item)
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(work() for _ in range(concurrency)))
+    return results, summarize(
+        latencies, len(items), time.perf_counter() - started, errors
+    )
+
+
+async def measure_size(
+    fixtures: Fixtures, links: int, concurrency: int, stub_app
+) -> dict:
+    # the Aviasales listing is an httpx request, replayed inside offline()
+    aviasales_listing = AviasalesVacancyParser.get_all_actual_vacancy_links
+    stages = {}
+    with offline(fixtures, links, stub_app):
+        # discovery
+        listers = [
+            (
+                aviasales_listing
+                if parser is AviasalesVacancyParser
+                else parser.get_all_actual_vacancy_links
+            )
+            for parser in ALL_ACTUAL_PARSERS
+        ]
+        started = time.perf_counter()
+        listed, latencies = [], []
+        for lister in listers:
+            call_started = time.perf_counter()
+            listed.extend(await lister())
+            latencies.append(time.perf_counter() - call_started)
+        known = {vacancy_link_hash(link.link_text) for link in listed}
+        stages["discovery"] = summarize(
+            latencies, len(known), time.perf_counter() - started
+        )
+        # the synthesized Aviasales page lists its share of the backlog,
+        # the rest of the stages go through exactly ``links`` links
+        vacancy_links = [
+            (link, parser)
+            for parser in ALL_ACTUAL_PARSERS
+            for link in fixtures.scaled_listings(links).get(parser.__name__, [])
+        ]
+
+        async def fetch(link, parser):
+            return await parser.fetch_vacancy_page(link)
+
+        pages, stages["fetch"] = await timed_map(fetch, vacancy_links, concurrency)
+
+        async def parse(page, parser):
+            return None if page is None else parser.parse_vacancy_page(page)
+
+        parsed, stages["parse"] = await timed_map(
+            parse,
+            [(page, parser) for page, (_, parser) in zip(pages, vacancy_links)],
+            1,
+        )
+
+        async def classify(vacancy, link, parser):
+            if vacancy is None:
+                return None
+            title, info = vacancy
+            return await parser._create_vacancy_schema(title, info, link)
+
+        schemas, stages["classify"] = await timed_map(
+            classify,
+            [
+                (vacancy, link, parser)
+                for vacancy, (link, parser) in zip(parsed, vacancy_links)
+            ],
+            concurrency,
+        )
+
+    schemas = [schema for schema in schemas if schema is not None]
+    size = get_settings().INGEST_SHARD_SIZE
+
+    async def persist(shard):
+        async with sessionmanager.session() as session:
+            return await create_vacancies(session, shard)
+
+    shards = [(schemas[i : i + size],) for i in range(0, len(schemas), size)]
+    _, stages["persist"] = await timed_map(persist, shards, concurrency)
+    # rows rather than shards
+    stages["persist"]["items"] = len(schemas)
+    stages["persist"]["links_per_second"] = len(schemas) / stages["persist"]["seconds"]
+    return {"links": links, "created": len(schemas), "stages": stages}
+
+
+async def run_size(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    gpt_governor.requests_per_minute = args.rpm
+    gpt_governor.tokens_per_minute = args.tpm
+    sessionmanager.init_from_settings(get_settings())
+    try:
+        await reset_database()
+        async with sessionmanager.session() as session:
+            await add_company_id_to_parsers(session)
+        fixtures = (
+            Fixtures.load(args.fixtures)
+            if args.fixtures
+            else synthesize(-(-args.links // len(ALL_ACTUAL_PARSERS)), args.seed)
+        )
+        stub_app = openai_stub.create_app(args.latency, args.error_rate, args.seed)
+        return await measure_size(fixtures, args.links, args.concurrency, stub_app)
+    finally:
+        await sessionmanager.close()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def child_args(args: argparse.Namespace, links: int) -> list[str]:
+    options = {
+        "--links": links,
+        "--concurrency": args.concurrency,
+        "--latency": args.latency,
+        "--error-rate": args.error_rate,
+        "--seed": args.seed,
+        "--rpm": args.rpm,
+        "--tpm": args.tpm,
+    }
+    if args.fixtures:
+        options["--fixtures"] = args.fixtures
+    return [sys.executable, "-m", "benchmarks.ingestion", "size"] + [
+        str(part) for option in options.items() for part in option
+    ]
+
+
+def run(args: argparse.Namespace) -> dict:
+    results = []
+    for links in args.sizes:
+        output = subprocess.run(
+            child_args(args, links), check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+        print_result(results[-1])
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+            "fixtures": str(args.fixtures) if args.fixtures else "synthesized",
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return report
+
+
+def print_result(result: dict) -> None:
+    print(f"\n{result['links']} links, {result['created']} created")
+    print(
+        f"{'stage':<10}{'links/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>10}"
+        f"{'failed':>8}"
+    )
+    for stage in STAGES:
+        s = result["stages"][stage]
+        print(
+            f"{stage:<10}{s['links_per_second']:>12.1f}{s['p50_ms']:>10.2f}"
+            f"{s['p99_ms']:>10.2f}{s['max_rss_mb']:>10.1f}{s['failed']:>8}"
+        )
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    old, new = (json.loads(path.read_text()) for path in (old_path, new_path))
+    print(f"{(old['commit'] or '?')[:10]} -> {(new['commit'] or '?')[:10]}")
+    old_results = {result["links"]: result for result in old["results"]}
+    print(f"{'links':>7} {'stage':<10}{'links/s':>22}{'p99 ms':>22}")
+    for result in new["results"]:
+        before = old_results.get(result["links"])
+        if before is None:
+            continue
+        for stage in STAGES:
+            a, b = before["stages"][stage], result["stages"][stage]
+            change = (
+                b["links_per_second"] / a["links_per_second"] - 1
+                if a["links_per_second"]
+                else 0.0
+            )
+            print(
+                f"{result['links']:>7} {stage:<10}"
+                f"{a['links_per_second']:>9.1f} ->{b['links_per_second']:>9.1f}"
+                f"{change:>+7.0%}{a['p99_ms']:>10.2f} ->{b['p99_ms']:>9.2f}"
+            )
+
+
+def add_run_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fixtures", type=Path)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    # the limits of the stub, not of the OpenAI account
+    parser.add_argument("--rpm", type=int, default=10_000)
+    parser.add_argument("--tpm", type=int, default=10_000_000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_command = commands.add_parser("run")
+    run_command.add_argument("--reset", action="store_true", required=True)
+    run_command.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000, 10_000]
+    )
+    run_command.add_argument("--output", type=Path)
+    add_run_options(run_command)
+    size_command = commands.add_parser("size", help="one backlog size, as JSON")
+    size_command.add_argument("--links", type=int, required=True)
+    add_run_options(size_command)
+    compare_command = commands.add_parser("compare")
+    compare_command.add_argument("old", type=Path)
+    compare_command.add_argument("new", type=Path)
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "size":
+        print(json.dumps(asyncio.run(run_size(args))))
+    else:
+        compare(args.old, args.new)
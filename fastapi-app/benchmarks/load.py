@@ -0,0 +1,147 @@
+"""Throughput and latency of the read endpoints per filter combination.
+
+    python -m benchmarks.seed --rows 100000 --truncate
+    python -m benchmarks.load --requests 200 --concurrency 8 --output load.json
+
+Without --base-url the app runs in process, its lifespan included, so the
+numbers leave out the network and the server but not the database. Every
+scenario is warmed up first, which also lets the vacancy snapshot build.
+Conditional requests are not sent, every response is a full one.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+
+ENDPOINTS = {
+    "all": ("/vacancies/all", {}),
+    "general-ifo": ("/vacancies/general-ifo", {}),
+    "time-trend": ("/vacancies/time-trend", {"mode": "30"}),
+}
+FILTERS = {
+    "none": {},
+    "lang": {"lang": "python"},
+    "grade": {"grade": "senior"},
+    "lang+grade": {"lang": "go", "grade": "middle"},
+    "experience": {"min_experience": 3, "max_experience": 6},
+}
+
+
+@asynccontextmanager
+async def api_client(base_url: str | None) -> AsyncIterator[httpx.AsyncClient]:
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            yield client
+        return
+    from src import init_app
+
+    app = init_app()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://load",
+            timeout=120,
+        ) as client:
+            yield client
+
+
+def percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        return cuts[49], cuts[94], cuts[98]
+    latency = latencies[0] if latencies else 0.0
+    return latency, latency, latency
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    path: str,
+    params: dict,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    for _ in range(warmup):
+        await client.get(path, params=params)
+    latencies = []
+    errors = 0
+    sizes = []
+    remaining = iter(range(requests))
+
+    async def work():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - started)
+            sizes.append(len(response.content))
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(work() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "mean_kb": statistics.fmean(sizes) / 1024 if sizes else 0.0,
+    }
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    results = []
+    print(
+        f"{'endpoint':<13}{'filter':<12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'KB':>9}{'errors':>8}"
+    )
+    async with api_client(args.base_url) as client:
+        for endpoint in args.endpoints:
+            path, endpoint_params = ENDPOINTS[endpoint]
+            for name in args.filters:
+                result = {"endpoint": endpoint, "filter": name} | await run_scenario(
+                    client,
+                    path,
+                    endpoint_params | FILTERS[name],
+                    args.requests,
+                    args.concurrency,
+                    args.warmup,
+                )
+                results.append(result)
+                print(
+                    f"{endpoint:<13}{name:<12}{result['requests_per_second']:>9.1f}"
+                    f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                    f"{result['p99_ms']:>9.1f}{result['mean_kb']:>9.1f}"
+                    f"{result['errors']:>8}"
+                )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument(
+        "--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS)
+    )
+    parser.add_argument(
+        "--filters", nargs="+", choices=list(FILTERS), default=list(FILTERS)
+    )
+    parser.add_argument("--output", type=Path)
+    asyncio.run(main(parser.parse_args()))
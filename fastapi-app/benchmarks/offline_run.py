@@ -0,0 +1,139 @@
+"""daily_vacancy_processing end to end without the network.
+
+    python -m benchmarks.offline_run --reset --links 1000 --consumers 4 \\
+        --latency 0.2 --error-rate 0.02
+
+Drops and recreates the tables of POSTGRES_DB, then runs the job with
+in-process ingestion consumers, on the fixtures of benchmarks/replay.py
+(synthesized unless --fixtures is given) and the OpenAI stub. The GPT
+governor enforces --rpm and --tpm, far above the account limits by default
+so that they do not hide the throughput of the pipeline.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+
+from benchmarks import openai_stub
+from benchmarks.replay import Fixtures, offline, synthesize
+from src.choices import Companies
+from src.config import get_settings
+from src.database import sessionmanager
+from src.db_crud.companies import create_companies
+from src.gpt_governor import gpt_governor
+from src.ingestion import DEAD_LETTER_KEY, QUEUE_KEY, IngestionConsumer
+from src.models import Base, Vacancy
+from src.redis_client import redis_client
+from src.schemas import CompanyCreateSchema
+
+
+async def reset_database() -> None:
+    async with sessionmanager.connect() as connection:
+        await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await sessionmanager.drop_all(connection, Base.metadata)
+        await sessionmanager.create_all(connection, Base.metadata)
+    async with sessionmanager.session() as session:
+        await create_companies(
+            session,
+            [
+                CompanyCreateSchema(name=name, company_vacs_url=f"{name}_url")
+                for name in Companies
+            ],
+        )
+
+
+async def count_vacancies() -> dict:
+    async with sessionmanager.session() as session:
+        rows = await session.execute(
+            select(Vacancy.deleted_at.is_(None), func.count()).group_by(
+                Vacancy.deleted_at.is_(None)
+            )
+        )
+    counts = dict(rows.all())
+    return {"active": counts.get(True, 0), "archived": counts.get(False, 0)}
+
+
+async def run_offline(
+    fixtures: Fixtures,
+    links: int,
+    consumers: int,
+    stub_app,
+    requests_per_minute: int = 10_000,
+    tokens_per_minute: int = 10_000_000,
+) -> dict:
+    """One daily run, its time and the vacancies it left behind."""
+    from src.jobs import daily_vacancy_processing
+
+    gpt_governor.requests_per_minute = requests_per_minute
+    gpt_governor.tokens_per_minute = tokens_per_minute
+    settings = get_settings()
+    settings.INGEST_LINK_DELAY = 0
+    settings.INGEST_POLL_INTERVAL = 0.1
+    await redis_client.delete(QUEUE_KEY, DEAD_LETTER_KEY)
+    with offline(fixtures, links, stub_app) as transport:
+        tasks = [
+            asyncio.create_task(IngestionConsumer().run()) for _ in range(consumers)
+        ]
+        started = time.perf_counter()
+        try:
+            await daily_vacancy_processing()
+        finally:
+            elapsed = time.perf_counter() - started
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "links": links,
+        "consumers": consumers,
+        "seconds": elapsed,
+        "links_per_second": links / elapsed,
+        "replay_misses": transport.misses,
+        "gpt_requests": stub_app.state.requests,
+        "dead_shards": await redis_client.llen(DEAD_LETTER_KEY),
+    } | await count_vacancies()
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    sessionmanager.init_from_settings(get_settings())
+    await reset_database()
+    fixtures = (
+        Fixtures.load(args.fixtures)
+        if args.fixtures
+        else synthesize(args.per_parser, args.seed)
+    )
+    stub_app = openai_stub.create_app(args.latency, args.error_rate, args.seed)
+    try:
+        result = await run_offline(
+            fixtures, args.links, args.consumers, stub_app, args.rpm, args.tpm
+        )
+    finally:
+        await sessionmanager.close()
+    queue_wait = gpt_governor.stats.queue_wait
+    for name, value in result.items():
+        print(
+            f"{name:<18}{value:>12.2f}"
+            if isinstance(value, float)
+            else f"{name:<18}{value:>12}"
+        )
+    print(f"{'gpt wait p95 ms':<18}{queue_wait.percentile(95):>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reset", action="store_true", required=True)
+    parser.add_argument("--links", type=int, default=100)
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--fixtures", type=Path)
+    parser.add_argument("--per-parser", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    # the limits of the stub, not of the OpenAI account
+    parser.add_argument("--rpm", type=int, default=10_000)
+    parser.add_argument("--tpm", type=int, default=10_000_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,130 @@
+"""OpenAI compatible chat completions that classify vacancies by keywords.
+
+    OPENAI_STUB_LATENCY=0.3 OPENAI_STUB_ERROR_RATE=0.05 \\
+        uvicorn benchmarks.openai_stub:app --port 8100
+
+and GPT_BASE_URL=http://localhost:8100/v1 for the worker. benchmarks/replay.py
+mounts the app in process instead. Answers depend on the prompt only, and
+failures on the seed and the order of the requests, so a run is repeatable.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LANGUAGE_KEYWORDS = {
+    "c_sharp": ("c#", ".net"),
+    "java": ("java ", "kotlin"),
+    "frontend": ("frontend", "javascript", "typescript", "react", "vue"),
+    "python": ("python", "django"),
+    "go": ("golang", " go "),
+    "c_plus_plus": ("c++",),
+    "ios": ("ios", "swift"),
+}
+GRADE_KEYWORDS = {
+    "intern": ("стажер", "стажёр", "intern"),
+    "junior": ("junior", "младший"),
+    "senior": ("senior", "ведущий", "старший"),
+    "team_lead": ("team lead", "teamlead", "тимлид", "руководитель"),
+}
+NOT_DEV_KEYWORDS = ("аналитик", "менеджер", "дизайнер", "маркетолог", "рекрутер")
+EXPERIENCE_RE = re.compile(r"(?:от\s+)?(\d+)\+?\s*(?:год|года|лет)")
+
+
+def classify(text: str) -> dict:
+    text = f" {text.lower()} "
+    lang = next(
+        (
+            lang
+            for lang, keywords in LANGUAGE_KEYWORDS.items()
+            if any(keyword in text for keyword in keywords)
+        ),
+        "other",
+    )
+    grade = next(
+        (
+            grade
+            for grade, keywords in GRADE_KEYWORDS.items()
+            if any(keyword in text for keyword in keywords)
+        ),
+        "middle",
+    )
+    experience = EXPERIENCE_RE.search(text)
+    is_dev = lang != "other" or not any(word in text for word in NOT_DEV_KEYWORDS)
+    return {
+        "experience": int(experience.group(1)) if experience else 0,
+        "grade": grade,
+        "lang": lang,
+        "is_dev": int(is_dev),
+    }
+
+
+def create_app(latency: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    """``error_rate`` of the requests fail, half with 429 and half with 500."""
+    app = FastAPI()
+    failures = random.Random(seed)
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if failures.random() < error_rate:
+            if failures.random() < 0.5:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "requests"}},
+                    status_code=429,
+                    headers={
+                        "retry-after-ms": "200",
+                        "x-ratelimit-reset-requests": "200ms",
+                    },
+                )
+            return JSONResponse(
+                {"error": {"message": "The server had an error", "type": "server"}},
+                status_code=500,
+            )
+        prompt = body["messages"][-1]["content"]
+        content = json.dumps(classify(prompt))
+        prompt_tokens = sum(len(m["content"]) // 3 for m in body["messages"])
+        completion_tokens = len(content) // 3
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-stub-{app.state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+            headers={
+                "x-ratelimit-limit-requests": "10000",
+                "x-ratelimit-limit-tokens": "10000000",
+            },
+        )
+
+    return app
+
+
+app = create_app(
+    latency=float(os.environ.get("OPENAI_STUB_LATENCY", 0)),
+    error_rate=float(os.environ.get("OPENAI_STUB_ERROR_RATE", 0)),
+    seed=int(os.environ.get("OPENAI_STUB_SEED", 0)),
+)
@@ -0,0 +1,93 @@
+"""Bulk inserts into a uuid4 and a uuid7 keyed table, then compares the time
+and the primary key index each of them ended up with.
+
+    python -m benchmarks.primary_keys --rows 1000000 --batch 10000
+
+Runs against the database from the settings, on temporary tables.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import asyncpg
+
+from src.config import get_settings
+from src.utils import uuid7
+
+ID_FACTORIES = {"uuid4": uuid4, "uuid7": uuid7}
+
+
+async def connect() -> asyncpg.Connection:
+    settings = get_settings()
+    return await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+
+
+async def insert_rows(
+    connection: asyncpg.Connection, kind: str, rows: int, batch: int
+) -> dict:
+    table = f"bench_{kind}"
+    await connection.execute(
+        f"CREATE TEMP TABLE {table} ("
+        "id uuid PRIMARY KEY, created_at timestamptz NOT NULL DEFAULT now(), "
+        "title text NOT NULL)"
+    )
+    new_id = ID_FACTORIES[kind]
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        await connection.copy_records_to_table(
+            table,
+            records=[
+                (new_id(), f"vacancy {i}")
+                for i in range(offset, min(offset + batch, rows))
+            ],
+            columns=("id", "title"),
+        )
+    elapsed = time.perf_counter() - started
+    index_size = await connection.fetchval(f"SELECT pg_relation_size('{table}_pkey')")
+    await connection.execute(f"ANALYZE {table}")
+    # 1 when the heap is in id order, around 0 when ids are scattered
+    correlation = await connection.fetchval(
+        "SELECT correlation FROM pg_stats WHERE tablename = $1 AND attname = 'id'",
+        table,
+    )
+    await connection.execute(f"DROP TABLE {table}")
+    return {
+        "kind": kind,
+        "rows_per_second": rows / elapsed,
+        "seconds": elapsed,
+        "index_mb": index_size / 2**20,
+        "correlation": correlation,
+    }
+
+
+async def main(rows: int, batch: int) -> None:
+    connection = await connect()
+    try:
+        results = [
+            await insert_rows(connection, kind, rows, batch) for kind in ID_FACTORIES
+        ]
+    finally:
+        await connection.close()
+    print(f"{'ids':<8}{'seconds':>10}{'rows/s':>12}{'pkey MB':>10}{'corr':>8}")
+    for result in results:
+        print(
+            f"{result['kind']:<8}{result['seconds']:>10.2f}"
+            f"{result['rows_per_second']:>12.0f}{result['index_mb']:>10.1f}"
+            f"{result['correlation'] or 0:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.batch))
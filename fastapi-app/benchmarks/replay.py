@@ -0,0 +1,319 @@
+"""Offline runs of the parsers on recorded career site responses.
+
+    python -m benchmarks.replay record benchmarks/fixtures/live
+    python -m benchmarks.replay synthesize benchmarks/fixtures/synthetic --per-parser 20
+
+Recording lists every parser's vacancies live, selenium included, and
+fetches their pages, classifying them with the OpenAI stub. A fixture
+directory holds the listed links in listings.json and every HTTP response
+in responses.jsonl. Synthesized fixtures have the same layout and pages
+shaped like each site's, for when no recording is at hand.
+
+Inside ``offline()`` the parsers list the fixture's links, httpx requests
+are answered from the fixture and OpenAI by benchmarks/openai_stub.py.
+Asked for more links than were recorded, the listings repeat the recorded
+ones with a ``~<n>`` suffix, which the replay strips before the lookup, so
+every copy is a new vacancy with the same page.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import httpx
+
+from benchmarks import openai_stub
+from src import parsers
+from src.parsers import ALL_ACTUAL_PARSERS, CompanyVacanciesParser, VacancyLink
+
+logger = logging.getLogger(__name__)
+
+LISTINGS_FILE = "listings.json"
+RESPONSES_FILE = "responses.jsonl"
+COPY_SUFFIX_RE = re.compile(r"~\d+$")
+
+
+def _response_key(method: str, url: httpx.URL | str) -> tuple[str, str]:
+    url = httpx.URL(str(url))
+    return method, str(url.copy_with(path=COPY_SUFFIX_RE.sub("", url.path)))
+
+
+class Fixtures:
+    def __init__(self, listings: dict[str, list[str]], responses: list[dict]):
+        self.listings = listings
+        self.responses = {
+            _response_key(response["method"], response["url"]): response
+            for response in responses
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> "Fixtures":
+        listings = json.loads((path / LISTINGS_FILE).read_text())
+        with open(path / RESPONSES_FILE) as file:
+            responses = [json.loads(line) for line in file]
+        return cls(listings, responses)
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        (path / LISTINGS_FILE).write_text(
+            json.dumps(self.listings, ensure_ascii=False, indent=2)
+        )
+        with open(path / RESPONSES_FILE, "w") as file:
+            for response in self.responses.values():
+                file.write(json.dumps(response) + "\n")
+
+    def scaled_listings(self, links: int) -> dict[str, list[str]]:
+        """``links`` links in total, repeating the recorded ones."""
+        recorded = [
+            (parser, link) for parser, links in self.listings.items() for link in links
+        ]
+        listings: dict[str, list[str]] = {parser: [] for parser in self.listings}
+        for i in range(links):
+            parser, link = recorded[i % len(recorded)]
+            copy = i // len(recorded)
+            listings[parser].append(f"{link}~{copy}" if copy else link)
+        return listings
+
+
+def _serialize(request: httpx.Request, response: httpx.Response) -> dict:
+    return {
+        "method": request.method,
+        "url": str(request.url),
+        "status": response.status_code,
+        "headers": {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length")
+        },
+        "body": base64.b64encode(response.content).decode(),
+    }
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.records: list[dict] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        await response.aread()
+        self.records.append(_serialize(request, response))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers from the fixture, 404 for anything that was not recorded."""
+
+    def __init__(self, fixtures: Fixtures):
+        self.fixtures = fixtures
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        recorded = self.fixtures.responses.get(
+            _response_key(request.method, request.url)
+        )
+        if recorded is None:
+            self.misses += 1
+            return httpx.Response(404, request=request)
+        return httpx.Response(
+            recorded["status"],
+            headers=recorded["headers"],
+            content=base64.b64decode(recorded["body"]),
+            request=request,
+        )
+
+
+def stub_gpt_client(app):
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key="stub",
+        base_url="http://openai-stub/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app)),
+    )
+
+
+def _listing(parser: type[CompanyVacanciesParser], links: Sequence[str]):
+    async def get_all_actual_vacancy_links(cls) -> list[VacancyLink]:
+        return [VacancyLink(link, cls) for link in links]
+
+    return classmethod(get_all_actual_vacancy_links)
+
+
+@contextmanager
+def offline(
+    fixtures: Fixtures, links: int | None = None, stub_app=None
+) -> Iterator[ReplayTransport]:
+    """Parsers list, fetch and classify from the fixtures and the stub."""
+    listings = fixtures.scaled_listings(links) if links else fixtures.listings
+    transport = ReplayTransport(fixtures)
+    gpt_client = stub_gpt_client(stub_app or openai_stub.create_app())
+    saved_listings = {
+        parser: parser.__dict__["get_all_actual_vacancy_links"]
+        for parser in ALL_ACTUAL_PARSERS
+    }
+    saved_get_gpt_client = parsers.get_gpt_client
+    parsers.http_transport = transport
+    parsers.get_gpt_client = lambda: gpt_client
+    for parser in ALL_ACTUAL_PARSERS:
+        parser.get_all_actual_vacancy_links = _listing(
+            parser, listings.get(parser.__name__, [])
+        )
+    try:
+        yield transport
+    finally:
+        parsers.http_transport = None
+        parsers.get_gpt_client = saved_get_gpt_client
+        for parser, listing in saved_listings.items():
+            parser.get_all_actual_vacancy_links = listing
+
+
+async def record(
+    path: Path, parsers_to_record=ALL_ACTUAL_PARSERS, limit: int | None = None
+) -> Fixtures:
+    transport = RecordingTransport(httpx.AsyncHTTPTransport())
+    gpt_client = stub_gpt_client(openai_stub.create_app())
+    saved_get_gpt_client = parsers.get_gpt_client
+    parsers.http_transport = transport
+    parsers.get_gpt_client = lambda: gpt_client
+    listings = {}
+    try:
+        for parser in parsers_to_record:
+            links = await parser.get_all_actual_vacancy_links()
+            listings[parser.__name__] = [link.link_text for link in links][:limit]
+            for link in listings[parser.__name__]:
+                try:
+                    await parser.vacancy_schema_from_vacancy_link(link)
+                except Exception as e:
+                    # the failed response is recorded all the same
+                    logger.warning("Vacancy %s was not parsed: %r", link, e)
+    finally:
+        parsers.http_transport = None
+        parsers.get_gpt_client = saved_get_gpt_client
+    fixtures = Fixtures(listings, transport.records)
+    fixtures.save(path)
+    return fixtures
+
+
+SYNTHETIC_TITLES = (
+    "Python разработчик",
+    "Senior Golang разработчик",
+    "Junior Frontend разработчик (React)",
+    "Java разработчик",
+    "Ведущий iOS разработчик",
+    "C# разработчик",
+    "Тимлид команды Python",
+    "Стажёр C++",
+    "Аналитик данных",
+    "Продуктовый дизайнер",
+)
+SYNTHETIC_REQUIREMENTS = (
+    "Опыт коммерческой разработки от {years} лет. ",
+    "Знание SQL и умение читать планы запросов. ",
+    "Опыт работы с очередями сообщений. ",
+    "Понимание принципов CI/CD и контейнеризации. ",
+    "Умение писать тесты и проводить код-ревью. ",
+)
+
+
+def synthesize(per_parser: int, seed: int = 0) -> Fixtures:
+    """Pages shaped like the three career sites, ``per_parser`` for each."""
+    rng = random.Random(seed)
+    listings: dict[str, list[str]] = {}
+    responses = []
+
+    def page(url: str, body: str, content_type: str = "text/html; charset=utf-8"):
+        responses.append(
+            {
+                "method": "GET",
+                "url": url,
+                "status": 200,
+                "headers": {"content-type": content_type},
+                "body": base64.b64encode(body.encode()).decode(),
+            }
+        )
+
+    def vacancy(i: int) -> tuple[str, str]:
+        title = SYNTHETIC_TITLES[i % len(SYNTHETIC_TITLES)]
+        requirements = "".join(
+            rng.sample(SYNTHETIC_REQUIREMENTS, 3) * rng.randint(2, 8)
+        ).format(years=rng.randint(1, 6))
+        return title, requirements
+
+    listing_links = []
+    for i in range(per_parser):
+        title, requirements = vacancy(i)
+        url = f"https://www.aviasales.ru/about/vacancies/{4_000_000 + i}"
+        listing_links.append(url)
+        page(
+            url,
+            f"<html><head><title>Работа в Авиасейлс — {title}</title></head><body>"
+            f'<div class="vacancy__requirements">{requirements}</div></body></html>',
+        )
+    listings["AviasalesVacancyParser"] = listing_links
+    page(
+        "https://www.aviasales.ru/about/vacancies",
+        "<html><body>"
+        + "".join(
+            f'<a href="{httpx.URL(url).path}">{i}</a>'
+            for i, url in enumerate(listing_links)
+        )
+        + "</body></html>",
+    )
+
+    listings["SelectelVacancyParser"] = []
+    for i in range(per_parser):
+        title, requirements = vacancy(i + 3)
+        url = (
+            "https://api.selectel.ru/proxy/public/employee/api/public/vacancies/"
+            f"{2000 + i}"
+        )
+        listings["SelectelVacancyParser"].append(url)
+        page(
+            url,
+            json.dumps({"title": title, "detailed_desc": requirements}),
+            "application/json",
+        )
+
+    listings["X5VacancyParser"] = []
+    for i in range(per_parser):
+        title, requirements = vacancy(i + 6)
+        url = f"https://x5-tech.ru/vacancy/vacancy-{i}"
+        listings["X5VacancyParser"].append(url)
+        page(
+            url,
+            f"<html><head><title>{title} — открытая вакансия в команде X5 Tech"
+            "</title></head><body>"
+            f'<div class="VacancyPage_descriptionText___AFQG">{requirements}</div>'
+            "</body></html>",
+        )
+    return Fixtures(listings, responses)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_command = commands.add_parser("record")
+    record_command.add_argument("path", type=Path)
+    record_command.add_argument("--limit", type=int, help="links per parser")
+    synthesize_command = commands.add_parser("synthesize")
+    synthesize_command.add_argument("path", type=Path)
+    synthesize_command.add_argument("--per-parser", type=int, default=20)
+    synthesize_command.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.path, limit=args.limit))
+    else:
+        synthesize(args.per_parser, args.seed).save(args.path)
@@ -0,0 +1,233 @@
+"""Synthetic vacancies at production volumes, loaded with COPY.
+
+    python -m benchmarks.seed --rows 1000000 --truncate
+
+Vacancies are spread evenly over the last --days, across the companies
+and with grades, languages and experience in realistic proportions.
+--archived of them were removed some time after they were created. The
+ids are uuid7 of the creation time, so the table looks as if it had grown
+day by day. Runs against the database from the settings, the same --seed
+gives the same rows.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+
+import asyncpg
+
+from benchmarks.primary_keys import connect
+from src.choices import Companies, Grades, Languages
+from src.data_version import bump_data_version
+from src.utils import uuid7
+
+GRADE_WEIGHTS = {
+    Grades.INTERN: 4,
+    Grades.JUNIOR: 16,
+    Grades.MIDDLE: 42,
+    Grades.SENIOR: 30,
+    Grades.TEAM_LEAD: 8,
+}
+LANGUAGE_WEIGHTS = {
+    Languages.PYTHON: 18,
+    Languages.JAVA: 17,
+    Languages.FRONTEND: 20,
+    Languages.GO: 14,
+    Languages.C_SHARP: 8,
+    Languages.C_PLUS_PLUS: 5,
+    Languages.IOS: 7,
+    Languages.OTHER: 11,
+}
+EXPERIENCE_RANGES = {
+    Grades.INTERN: (0, 0),
+    Grades.JUNIOR: (0, 1),
+    Grades.MIDDLE: (1, 3),
+    Grades.SENIOR: (3, 6),
+    Grades.TEAM_LEAD: (4, 8),
+}
+GRADE_TITLES = {
+    Grades.INTERN: "Стажёр",
+    Grades.JUNIOR: "Junior",
+    Grades.MIDDLE: "Middle",
+    Grades.SENIOR: "Senior",
+    Grades.TEAM_LEAD: "Team Lead",
+}
+LANGUAGE_TITLES = {
+    Languages.PYTHON: "Python",
+    Languages.JAVA: "Java",
+    Languages.FRONTEND: "Frontend",
+    Languages.GO: "Golang",
+    Languages.C_SHARP: "C#",
+    Languages.C_PLUS_PLUS: "C++",
+    Languages.IOS: "iOS",
+    Languages.OTHER: "Rust",
+}
+TEAMS = (
+    "платежи",
+    "поиск",
+    "логистика",
+    "облачная платформа",
+    "рекомендации",
+    "биллинг",
+    "мобильное приложение",
+    "внутренние сервисы",
+)
+COLUMNS = (
+    "id",
+    "created_at",
+    "deleted_at",
+    "is_archived",
+    "title",
+    "grade",
+    "lang",
+    "experience",
+    "link",
+    "company_id",
+)
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def uuid7_at(timestamp_ms: int, rng: random.Random) -> UUID:
+    """uuid7 of the given time, laid out like src.utils.uuid7."""
+    return UUID(
+        int=timestamp_ms << 80
+        | 0x7 << 76
+        | rng.getrandbits(12) << 64
+        | 0b10 << 62
+        | rng.getrandbits(62)
+    )
+
+
+def vacancy_records(
+    rng: random.Random,
+    company_ids: list[UUID],
+    start_ms: int,
+    end_ms: int,
+    rows: int,
+    archived: float,
+    now_ms: int,
+) -> list[tuple]:
+    """``rows`` vacancies created between start_ms and end_ms, in id order."""
+    grades = rng.choices(list(GRADE_WEIGHTS), list(GRADE_WEIGHTS.values()), k=rows)
+    langs = rng.choices(list(LANGUAGE_WEIGHTS), list(LANGUAGE_WEIGHTS.values()), k=rows)
+    records = []
+    for created_ms, grade, lang in zip(
+        sorted(rng.randrange(start_ms, end_ms) for _ in range(rows)), grades, langs
+    ):
+        vacancy_id = uuid7_at(created_ms, rng)
+        deleted_at = None
+        if rng.random() < archived:
+            deleted_ms = min(created_ms + rng.randrange(DAY_MS, 90 * DAY_MS), now_ms)
+            deleted_at = datetime.fromtimestamp(deleted_ms / 1000, tz=timezone.utc)
+        company_id = rng.choice(company_ids)
+        records.append(
+            (
+                vacancy_id,
+                datetime.fromtimestamp(created_ms / 1000, tz=timezone.utc),
+                deleted_at,
+                deleted_at is not None,
+                f"{GRADE_TITLES[grade]} {LANGUAGE_TITLES[lang]} разработчик "
+                f"({rng.choice(TEAMS)})",
+                # the enum types hold the member names
+                grade.name,
+                lang.name,
+                rng.randint(*EXPERIENCE_RANGES[grade]),
+                f"https://careers.example.com/{company_id.hex[-6:]}/{vacancy_id.hex}",
+                company_id,
+            )
+        )
+    return records
+
+
+async def company_ids(connection: asyncpg.Connection) -> list[UUID]:
+    """Ids of the active companies, created when there are none."""
+    ids = await connection.fetch("SELECT id FROM company WHERE deleted_at IS NULL")
+    if not ids:
+        await connection.executemany(
+            "INSERT INTO company (id, name, company_vacs_url) VALUES ($1, $2, $3)",
+            [(uuid7(), name.name, f"{name}_url") for name in Companies],
+        )
+        ids = await connection.fetch("SELECT id FROM company WHERE deleted_at IS NULL")
+    return [row["id"] for row in ids]
+
+
+async def seed(
+    connection: asyncpg.Connection,
+    rows: int,
+    *,
+    days: int = 365,
+    archived: float = 0.3,
+    batch: int = 50_000,
+    seed: int = 0,
+    truncate: bool = False,
+) -> dict:
+    rng = random.Random(seed)
+    companies = await company_ids(connection)
+    if truncate:
+        await connection.execute("TRUNCATE vacancy")
+    now_ms = time.time_ns() // 1_000_000
+    start_ms = now_ms - days * DAY_MS
+    batches = -(-rows // batch)
+    started = time.perf_counter()
+    for i in range(batches):
+        # each batch covers its own stretch of time, so ids keep ascending
+        batch_rows = min(batch, rows - i * batch)
+        await connection.copy_records_to_table(
+            "vacancy",
+            records=vacancy_records(
+                rng,
+                companies,
+                start_ms + (now_ms - start_ms) * i // batches,
+                start_ms + (now_ms - start_ms) * (i + 1) // batches,
+                batch_rows,
+                archived,
+                now_ms,
+            ),
+            columns=COLUMNS,
+        )
+    copied = time.perf_counter() - started
+    await connection.execute("ANALYZE vacancy")
+    await bump_data_version()
+    return {
+        "rows": rows,
+        "seconds": copied,
+        "rows_per_second": rows / copied if copied else 0.0,
+        "table_mb": await connection.fetchval(
+            "SELECT sum(pg_total_relation_size(inhrelid)) / 2.0 ^ 20 "
+            "FROM pg_inherits WHERE inhparent = 'vacancy'::regclass"
+        ),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    connection = await connect()
+    try:
+        result = await seed(
+            connection,
+            args.rows,
+            days=args.days,
+            archived=args.archived,
+            batch=args.batch,
+            seed=args.seed,
+            truncate=args.truncate,
+        )
+    finally:
+        await connection.close()
+    print(
+        f"{result['rows']} rows in {result['seconds']:.1f}s, "
+        f"{result['rows_per_second']:.0f} rows/s, {result['table_mb']:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--archived", type=float, default=0.3)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truncate", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""Import time and memory of the API and worker processes.
+
+    python -m benchmarks.startup --runs 5
+
+Every target is imported in a fresh interpreter. The worker loads openai
+and selenium only once a crawl starts.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CRAWLER = "import src.jobs, selenium.webdriver, openai"
+TARGETS = {
+    "api": "from src import init_app; init_app(init_db=False)",
+    # what an API worker loaded when src imported the scheduler and parsers
+    "api before": f"from src import init_app; init_app(init_db=False); {CRAWLER}",
+    "worker idle": "import src.worker",
+    "worker crawl": f"import src.worker; {CRAWLER}",
+}
+HEAVY_PACKAGES = ("selenium", "openai", "bs4", "apscheduler")
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": sum(
+        name.partition(".")[0] in {heavy!r} for name in sys.modules
+    ),
+}}))
+"""
+
+
+def probe(code: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_PACKAGES)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(runs: int) -> None:
+    print(f"{'process':<14}{'import s':>10}{'max RSS MB':>12}{'heavy mods':>12}")
+    for name, code in TARGETS.items():
+        results = [probe(code) for _ in range(runs)]
+        print(
+            f"{name:<14}"
+            f"{statistics.median(r['seconds'] for r in results):>10.3f}"
+            f"{statistics.median(r['max_rss_mb'] for r in results):>12.1f}"
+            f"{results[0]['heavy_modules']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.runs)
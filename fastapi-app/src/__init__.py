@@ -4,8 +4,8 @@ from src.database import sessionmanager
 from fastapi import FastAPI
 
 from src.config import get_settings
-from src.jobs import scheduler
-from src.parsers import add_company_id_to_parsers
+from src.snapshot import vacancy_snapshot
+from src.vacancy_stream import vacancy_broadcaster
 
 
 def init_app(init_db=True):
@@ -15,17 +15,15 @@ def init_app(init_db=True):
     async def lifespan(_: FastAPI):
         # on startup
         if init_db:
-            sessionmanager.init(settings.SQLALCHEMY_DATABASE_URL.unicode_string())
-            async with sessionmanager.session() as session:
-                await add_company_id_to_parsers(session)
-            scheduler.start()
+            sessionmanager.init_from_settings(settings)
+            vacancy_snapshot.schedule_rebuild()
 
         yield
         # on shutdown
+        await vacancy_broadcaster.close()
         if init_db:
             if sessionmanager._engine is not None:
                 await sessionmanager.close()
-            scheduler.shutdown()
 
     server = FastAPI(
         title=settings.TITLE,
@@ -0,0 +1,69 @@
+import hashlib
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException, Request, Response
+from starlette import status
+
+from src.config import get_settings
+from src.data_version import data_version_lsn, get_data_version
+from src.database import sessionmanager
+from src.db_crud.vacancies import get_db_timezone
+
+_db_timezone: ZoneInfo | None = None
+
+
+def make_etag(version: str, request: Request, *extra: str) -> str:
+    query = sorted(request.query_params.multi_items())
+    key = ":".join([version, request.url.path, str(query), *extra])
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def db_today() -> date:
+    """Today in the time zone of the database, the one trends count days in."""
+    global _db_timezone
+    if _db_timezone is None:
+        async with sessionmanager.session() as session:
+            _db_timezone = ZoneInfo(await get_db_timezone(session))
+    return datetime.now(_db_timezone).date()
+
+
+async def conditional_get(request: Request, response: Response) -> None:
+    """Answers If-None-Match with 304 before the endpoint touches the db.
+
+    Must be declared before the session dependency, so a revalidated
+    request never checks out a connection and the read session knows
+    which replicas have replayed the version of the response.
+    """
+    await _conditional_get(request, response)
+
+
+async def conditional_get_daily(request: Request, response: Response) -> None:
+    """conditional_get for responses that also change when the day does."""
+    await _conditional_get(request, response, (await db_today()).isoformat())
+
+
+async def _conditional_get(request: Request, response: Response, *extra: str) -> None:
+    version = await get_data_version()
+    if version is None:
+        response.headers["Cache-Control"] = "no-cache"
+        return
+    request.state.min_lsn = data_version_lsn(version)
+    etag = make_etag(version, request, *extra)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={get_settings().CACHE_MAX_AGE}",
+    }
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
@@ -1,3 +1,4 @@
 from src.api.endpoints.vacancies import router as vacancies_router
 from src.api.endpoints.companies import router as companies_router
 from src.api.endpoints.subscribers import router as subs_router
+from src.api.endpoints.internal import router as internal_router
@@ -4,15 +4,20 @@ from fastapi import APIRouter
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import get_async_session
+from src.api.dependencies import conditional_get
+from src.database import get_async_read_session
 from src.db_crud import companies as crud_companies
 from src.schemas import CompanyRetrieveSchema
 
 router = APIRouter()
-CurrentSession = Annotated[AsyncSession, Depends(get_async_session)]
+CurrentSession = Annotated[AsyncSession, Depends(get_async_read_session)]
 
 
-@router.get("/all", response_model=list[CompanyRetrieveSchema])
+@router.get(
+    "/all",
+    response_model=list[CompanyRetrieveSchema],
+    dependencies=[Depends(conditional_get)],
+)
 async def get_companies(session: CurrentSession):
     companies = await crud_companies.get_all_companies(session=session, deleted=False)
     return companies
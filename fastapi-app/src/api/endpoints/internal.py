@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from starlette import status
+
+from src.gpt_governor import get_gpt_stats
+from src.query_stats import query_stats
+
+router = APIRouter()
+
+
+@router.get("/db-stats")
+async def get_db_stats() -> dict:
+    return query_stats.to_dict()
+
+
+@router.delete("/db-stats", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_db_stats() -> None:
+    query_stats.reset()
+
+
+@router.get("/gpt-stats")
+async def get_gpt_governor_stats() -> list[dict]:
+    return await get_gpt_stats()
@@ -34,29 +34,25 @@ async def get_by_email(session: CurrentSession, email: str) -> SubscriberRetriev
 async def create_one_subscriber(
     session: CurrentSession, sub_schema: SubscriberCreateSchema
 ) -> SubscriberRetrieveSchema:
-    check_subscriber = await get_subscriber_by_email(session, sub_schema.email)
-    if check_subscriber:
+    subscriber = await create_subscriber(session, sub_schema)
+    if subscriber is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
-    subscriber = await create_subscriber(session, sub_schema)
     return SubscriberRetrieveSchema(**subscriber.to_dict())
 
 
 @router.delete("/{email}")
 async def delete_by_email(session: CurrentSession, email: str) -> None:
-    subscriber = await get_subscriber_by_email(session, email)
-    if not subscriber:
+    if not await delete_subscriber(session, email):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    await delete_subscriber(session, subscriber[0])
 
 
 @router.put("/{email}")
 async def update_by_email(
     session: CurrentSession, email: str, sub_schema: SubscriberUpdateSchema
 ) -> SubscriberRetrieveSchema:
-    subscriber = await get_subscriber_by_email(session, email)
-    if not subscriber:
+    subscriber = await update_subscriber(session, email, sub_schema)
+    if subscriber is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    subscriber = await update_subscriber(session, subscriber[0], sub_schema)
     return SubscriberRetrieveSchema(**subscriber.to_dict())
@@ -1,19 +1,46 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from functools import partial
+from uuid import UUID
 from typing import Annotated
 
-from fastapi import Depends, Query, APIRouter
-from pydantic import BaseModel
+from fastapi import Depends, HTTPException, Query, APIRouter, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
-from src.choices import Languages, Grades, TimeTrendMode
-from src.database import get_async_session
+from src.api.dependencies import conditional_get, conditional_get_daily
+from src.choices import ExportFormat, Languages, Grades, TimeTrendMode, VacancyEvent
+from src.company_names import company_names
+from src.config import get_settings
+from src.data_version import data_version_lsn, get_data_version
+from src.database import get_async_read_session, sessionmanager
 from src.db_crud import vacancies as crud_vacancies
+from src.export import ENCODERS, MEDIA_TYPES, is_format_available
 from src.schemas.vacancies import (
+    VacancyChangeSchema,
+    VacancyChangesSchema,
     VacancyWithCompanyNameSchema,
     VacanciesGeneralInfoSchema,
+    VacancySearchResultSchema,
 )
+from src.singleflight import RedisSingleFlight, SingleFlight
+from src.snapshot import vacancy_snapshot
+from src.utils import switch_keyboard_layout
+from src.vacancy_stream import vacancy_broadcaster
 
 router = APIRouter()
-CurrentSession = Annotated[AsyncSession, Depends(get_async_session)]
+CurrentSession = Annotated[AsyncSession, Depends(get_async_read_session)]
+
+settings = get_settings()
+general_info_flight = SingleFlight()
+general_info_shared_flight = RedisSingleFlight(
+    prefix="vacs4devs:general-info",
+    lock_ttl=settings.SINGLE_FLIGHT_LOCK_TTL,
+    result_ttl=settings.SINGLE_FLIGHT_RESULT_TTL,
+)
 
 
 class FilterParams(BaseModel):
@@ -23,10 +50,15 @@ class FilterParams(BaseModel):
     max_experience: int = 100
 
 
-@router.get("/all", response_model=list[VacancyWithCompanyNameSchema])
+@router.get(
+    "/all",
+    response_model=list[VacancyWithCompanyNameSchema],
+    dependencies=[Depends(conditional_get)],
+)
 async def get_active_vacancies(
     session: CurrentSession, filter_query: Annotated[FilterParams, Query()]
 ):
+    names = await company_names.get()
     vacancies = await crud_vacancies.get_vacancies(
         session=session,
         lang=filter_query.lang,
@@ -34,41 +66,260 @@ async def get_active_vacancies(
         min_experience=filter_query.min_experience,
         max_experience=filter_query.max_experience,
         deleted=False,
-        with_company_name=True,
+        company_ids=list(names),
     )
     response = []
     for vacancy in vacancies:
         response.append(
             VacancyWithCompanyNameSchema(
-                **vacancy.Vacancy.to_dict(), company_name=vacancy.company_name
+                **vacancy.Vacancy.to_dict(),
+                company_name=names[vacancy.Vacancy.company_id],
             )
         )
     return response
 
 
-@router.get("/general-ifo", response_model=VacanciesGeneralInfoSchema)
+class ExportParams(FilterParams):
+    format: ExportFormat = ExportFormat.NDJSON
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    deleted: bool = False
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_vacancies(
+    export_query: Annotated[ExportParams, Query()],
+) -> StreamingResponse:
+    if not is_format_available(export_query.format):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"{export_query.format} export is not available",
+        )
+    return StreamingResponse(
+        ENCODERS[export_query.format](_export_batches(export_query)),
+        media_type=MEDIA_TYPES[export_query.format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="vacancies.{export_query.format}"'
+            )
+        },
+    )
+
+
+async def _export_batches(export_query: ExportParams):
+    # the body is sent after the request dependencies are closed,
+    # so the cursor needs a session of its own
+    async with sessionmanager.read_session() as session:
+        async for batch in crud_vacancies.stream_vacancies(
+            session=session,
+            deleted=export_query.deleted,
+            lang=export_query.lang,
+            grade=export_query.grade,
+            min_experience=export_query.min_experience,
+            max_experience=export_query.max_experience,
+            created_from=export_query.created_from,
+            created_to=export_query.created_to,
+            batch_size=settings.EXPORT_BATCH_SIZE,
+        ):
+            yield batch
+
+
+class ChangesParams(BaseModel):
+    since: str | None = None
+    limit: int = Field(500, ge=1, le=1000)
+
+
+def _encode_cursor(event_at: datetime, id_: UUID, event: VacancyEvent) -> str:
+    data = json.dumps([event_at.isoformat(), str(id_), event.value])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID, VacancyEvent]:
+    try:
+        event_at, id_, event = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(event_at), UUID(id_), VacancyEvent(event)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+@router.get("/changes", response_model=VacancyChangesSchema)
+async def get_vacancy_changes(
+    session: CurrentSession, changes_query: Annotated[ChangesParams, Query()]
+):
+    """Vacancies created or deleted after ``since``, oldest first.
+
+    Start without ``since`` and pass the returned ``cursor`` on the next
+    call. ``has_more`` means the page was full and more is ready now.
+    """
+    since = _decode_cursor(changes_query.since) if changes_query.since else None
+    rows = await crud_vacancies.get_vacancy_changes(
+        session=session,
+        since=since,
+        safety_lag=timedelta(seconds=settings.CHANGES_SAFETY_LAG),
+        limit=changes_query.limit,
+    )
+    changes = [
+        VacancyChangeSchema(
+            event=row.event,
+            event_at=row.event_at,
+            vacancy=VacancyWithCompanyNameSchema(**row._mapping),
+        )
+        for row in rows
+    ]
+    if changes:
+        last = changes[-1]
+        cursor = _encode_cursor(last.event_at, last.vacancy.id, last.event)
+    else:
+        cursor = changes_query.since
+    return VacancyChangesSchema(
+        changes=changes, cursor=cursor, has_more=len(rows) == changes_query.limit
+    )
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_new_vacancies(
+    filter_query: Annotated[FilterParams, Query()],
+) -> StreamingResponse:
+    return StreamingResponse(
+        vacancy_broadcaster.listen(
+            lang=filter_query.lang,
+            grade=filter_query.grade,
+            min_experience=filter_query.min_experience,
+            max_experience=filter_query.max_experience,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class SearchParams(BaseModel):
+    q: str = Field(min_length=2, max_length=200)
+    page: int = Field(1, ge=1)
+    size: int = Field(20, ge=1, le=100)
+
+
+@router.get(
+    "/search",
+    response_model=list[VacancySearchResultSchema],
+    dependencies=[Depends(conditional_get)],
+)
+async def search_active_vacancies(
+    session: CurrentSession, search_query: Annotated[SearchParams, Query()]
+):
+    vacancies = await crud_vacancies.search_vacancies(
+        session=session,
+        query=search_query.q,
+        limit=search_query.size,
+        offset=(search_query.page - 1) * search_query.size,
+    )
+    response = []
+    for vacancy in vacancies:
+        response.append(
+            VacancySearchResultSchema(
+                **vacancy.Vacancy.to_dict(),
+                company_name=vacancy.company_name,
+                rank=vacancy.rank,
+            )
+        )
+    return response
+
+
+class SuggestParams(BaseModel):
+    q: str = Field(min_length=2, max_length=64)
+    limit: int = Field(10, ge=1, le=20)
+
+
+@router.get("/suggest", dependencies=[Depends(conditional_get)])
+async def suggest_vacancy_titles(
+    session: CurrentSession, suggest_query: Annotated[SuggestParams, Query()]
+) -> list[str]:
+    query = suggest_query.q.strip().lower()
+    variants = list(dict.fromkeys([query, switch_keyboard_layout(query)]))
+    return await crud_vacancies.suggest_vacancy_titles(
+        session=session,
+        variants=variants,
+        similarity_threshold=settings.TYPEAHEAD_SIMILARITY_THRESHOLD,
+        limit=suggest_query.limit,
+    )
+
+
+@router.get(
+    "/general-ifo",
+    response_model=VacanciesGeneralInfoSchema,
+    dependencies=[Depends(conditional_get)],
+)
 async def get_general_info_about_vacancies(
-    session: CurrentSession, filter_query: Annotated[FilterParams, Query()]
+    request: Request,
+    filter_query: Annotated[FilterParams, Query()],
 ) -> VacanciesGeneralInfoSchema:
-    result = await crud_vacancies.get_general_info(
-        session=session,
-        lang=filter_query.lang,
-        grade=filter_query.grade,
-        min_experience=filter_query.min_experience,
-        max_experience=filter_query.max_experience,
+    min_lsn = getattr(request.state, "min_lsn", None)
+    key = f"{min_lsn}:{filter_query.model_dump_json()}"
+    return await general_info_flight.do(
+        key, partial(_get_shared_general_info, filter_query, min_lsn)
+    )
+
+
+async def _get_shared_general_info(
+    filter_query: FilterParams, min_lsn: str | None
+) -> VacanciesGeneralInfoSchema:
+    if not settings.SINGLE_FLIGHT_REDIS:
+        return await _get_general_info(filter_query, min_lsn)
+    version = await get_data_version()
+    if version is None:
+        return await _get_general_info(filter_query, min_lsn)
+    # the version may have been bumped since conditional_get, the result
+    # is shared under this one
+    return await general_info_shared_flight.do(
+        f"{version}:{filter_query.model_dump_json()}",
+        partial(_get_general_info, filter_query, data_version_lsn(version)),
+        dumps=VacanciesGeneralInfoSchema.model_dump_json,
+        loads=VacanciesGeneralInfoSchema.model_validate_json,
     )
-    return result
+
+
+async def _get_general_info(
+    filter_query: FilterParams, min_lsn: str | None
+) -> VacanciesGeneralInfoSchema:
+    snapshot = await vacancy_snapshot.get()
+    if snapshot is not None:
+        return snapshot.general_info(
+            lang=filter_query.lang,
+            grade=filter_query.grade,
+            min_experience=filter_query.min_experience,
+            max_experience=filter_query.max_experience,
+        )
+    # the computation outlives the request that started it,
+    # so it can't use the request session
+    async with sessionmanager.read_session(min_lsn) as session:
+        return await crud_vacancies.get_general_info(
+            session=session,
+            lang=filter_query.lang,
+            grade=filter_query.grade,
+            min_experience=filter_query.min_experience,
+            max_experience=filter_query.max_experience,
+        )
 
 
 class TimeTrendFilterParams(FilterParams):
     mode: TimeTrendMode
 
 
-@router.get("/time-trend")
+@router.get("/time-trend", dependencies=[Depends(conditional_get_daily)])
 async def get_time_trend__for_new_vacancies(
     session: CurrentSession,
     filter_query: Annotated[TimeTrendFilterParams, Query()],
 ) -> dict[str, int]:
+    snapshot = await vacancy_snapshot.get()
+    if snapshot is not None:
+        return snapshot.time_trend(
+            lang=filter_query.lang,
+            grade=filter_query.grade,
+            min_experience=filter_query.min_experience,
+            max_experience=filter_query.max_experience,
+            trend_size=int(filter_query.mode.value),
+        )
     return await crud_vacancies.get_time_trend(
         session=session,
         lang=filter_query.lang,
@@ -1,7 +1,12 @@
 from fastapi import APIRouter, Depends, status
 
 from src.config import get_settings
-from src.api.endpoints import vacancies_router, companies_router, subs_router
+from src.api.endpoints import (
+    vacancies_router,
+    companies_router,
+    subs_router,
+    internal_router,
+)
 
 settings = get_settings()
 
@@ -10,3 +15,4 @@ main_router = APIRouter()
 main_router.include_router(vacancies_router, prefix="/vacancies", tags=["Вакансии"])
 main_router.include_router(companies_router, prefix="/companies", tags=["Компании"])
 main_router.include_router(subs_router, prefix="/subscribers", tags=["Подписчики"])
+main_router.include_router(internal_router, prefix="/internal", include_in_schema=False)
@@ -29,3 +29,14 @@ class Languages(enum.StrEnum):
 class TimeTrendMode(enum.Enum):
     WEEK = "7"
     MONTH = "30"
+
+
+class ExportFormat(enum.StrEnum):
+    NDJSON = enum.auto()
+    CSV = enum.auto()
+    PARQUET = enum.auto()
+
+
+class VacancyEvent(enum.StrEnum):
+    CREATED = enum.auto()
+    DELETED = enum.auto()
@@ -0,0 +1,40 @@
+from functools import partial
+from uuid import UUID
+
+from src.choices import Companies
+from src.data_version import get_data_version
+from src.database import sessionmanager
+from src.db_crud.companies import get_active_company_names
+from src.singleflight import SingleFlight
+
+
+class CompanyNameCache:
+    """Names of the active companies by id, kept per data version.
+
+    Companies change far less often than vacancies are listed, so listings
+    look the name up here instead of joining company. A soft-deleted
+    company is not in the map, callers filter its vacancies out by that.
+    """
+
+    def __init__(self):
+        self._version: str | None = None
+        self._names: dict[UUID, Companies] = {}
+        self._flight = SingleFlight()
+
+    async def get(self) -> dict[UUID, Companies]:
+        version = await get_data_version()
+        if version is not None and version == self._version:
+            return self._names
+        return await self._flight.do(str(version), partial(self._load, version))
+
+    async def _load(self, version: str | None) -> dict[UUID, Companies]:
+        # same rule as the snapshot: the version is read before the rows and
+        # from the primary, so old names are never kept under a new version
+        async with sessionmanager.session() as session:
+            names = await get_active_company_names(session)
+        if version is not None:
+            self._version, self._names = version, names
+        return names
+
+
+company_names = CompanyNameCache()
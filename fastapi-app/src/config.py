@@ -27,13 +27,87 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URL: PostgresDsn | None = None
+    # Pooling per worker process, see DatabaseSessionManager.init
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_NULL_POOL: bool = False
+    # Set when connecting through PgBouncer in transaction pooling mode
+    DB_PGBOUNCER: bool = False
+    # Read-only replicas for the GET endpoints, a JSON list of DSNs
+    SQLALCHEMY_REPLICA_URLS: list[PostgresDsn] = []
+    REPLICA_MAX_LAG: float = 30
+    REPLICA_CHECK_INTERVAL: float = 5
+    SLOW_QUERY_MS: float = 200
 
     REDIS_HOST: str
     REDIS_PORT: str
+    REDIS_APP_DB: int = 0
+
+    # HTTP caching of the read endpoints, see src/api/dependencies.py
+    CACHE_MAX_AGE: int = 60
+    DATA_VERSION_TTL: int = 60 * 60 * 24
+
+    # Sharing of analytics computations between workers, see src/singleflight.py
+    SINGLE_FLIGHT_REDIS: bool = False
+    SINGLE_FLIGHT_LOCK_TTL: float = 30
+    SINGLE_FLIGHT_RESULT_TTL: float = 5
+
+    # In-memory stats over vacancies, see src/snapshot.py
+    VACANCY_SNAPSHOT: bool = True
+
+    TYPEAHEAD_SIMILARITY_THRESHOLD: float = 0.3
+    EXPORT_BATCH_SIZE: int = 1000
+    # Change feed holds back events younger than this, keep above REPLICA_MAX_LAG
+    CHANGES_SAFETY_LAG: float = 60
+    # Server-sent events of new vacancies, see src/vacancy_stream.py
+    SSE_QUEUE_SIZE: int = 100
+    SSE_HEARTBEAT_INTERVAL: float = 15
+
+    # Subscriber digests are not sent while SMTP_HOST is empty, see src/digest.py
+    SMTP_HOST: str | None = None
+    SMTP_PORT: int = 25
+    SMTP_USER: str | None = None
+    SMTP_PASSWORD: str | None = None
+    SMTP_STARTTLS: bool = False
+    SMTP_TIMEOUT: float = 30
+    SMTP_SENDER: str = "vacs4devs <noreply@localhost>"
+    SMTP_CONNECTIONS: int = 10
+    SMTP_MESSAGES_PER_CONNECTION: int = 100
+
+    # Only the worker holding the lease runs scheduled jobs, see src/leader.py
+    LEADER_LEASE_TTL: float = 30
+    LEADER_RENEW_INTERVAL: float = 10
+
+    # Sharded ingestion queue consumed by every worker, see src/ingestion.py
+    INGEST_CONSUMERS: int = 1
+    INGEST_SHARD_SIZE: int = 10
+    INGEST_MAX_ATTEMPTS: int = 3
+    INGEST_CONSUMER_TTL: float = 30
+    INGEST_RUN_TIMEOUT: float = 6 * 60 * 60
+    INGEST_POLL_INTERVAL: float = 5
+    # pause between the pages of one consumer, keeps the career sites calm
+    INGEST_LINK_DELAY: float = 3
+
+    # Retries of outgoing requests, per host, see src/retry.py
+    RETRY_BUDGET_PER_MINUTE: int = 30
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_TIMEOUT: float = 60
+
+    # OpenAI limits shared by all workers, see src/gpt_governor.py
+    GPT_REQUESTS_PER_MINUTE: int = 500
+    GPT_TOKENS_PER_MINUTE: int = 200_000
+    # concurrent requests of one worker process
+    GPT_CONCURRENCY: int = 4
+    GPT_TIMEOUT: float = 30
 
     SELENIUM_HOST: str
 
     GPT_API_KEY: str
+    # an OpenAI compatible server, such as benchmarks/openai_stub.py
+    GPT_BASE_URL: str | None = None
 
     @field_validator("SQLALCHEMY_DATABASE_URL", mode="before")
     def assemble_db_connection_string(
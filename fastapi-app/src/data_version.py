@@ -0,0 +1,64 @@
+import logging
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.config import get_settings
+from src.database import sessionmanager
+from src.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = "vacs4devs:data_version"
+
+
+async def get_data_version() -> str | None:
+    """Token that changes every time vacancies or companies are modified.
+
+    The token is shared by all workers through redis. ``None`` means the
+    version is unknown right now and nothing may be cached against it.
+    The key expires after ``DATA_VERSION_TTL``, so a lost bump can only
+    keep caches stale for a bounded time.
+    """
+    try:
+        version = await redis_client.get(DATA_VERSION_KEY)
+        if version is None:
+            await redis_client.set(
+                DATA_VERSION_KEY,
+                uuid4().hex,
+                ex=get_settings().DATA_VERSION_TTL,
+                nx=True,
+            )
+            version = await redis_client.get(DATA_VERSION_KEY)
+    except RedisError as e:
+        logger.warning("Data version is unavailable: %s", e)
+        return None
+    return version
+
+
+def data_version_lsn(version: str | None) -> str | None:
+    """WAL position of the primary the version was bumped at, if known."""
+    if version is None:
+        return None
+    return version.partition("@")[2] or None
+
+
+async def bump_data_version() -> None:
+    """New version for the changes committed before the call.
+
+    With replicas the version carries the WAL position of the primary, so
+    reads cached against it skip the replicas that are behind it.
+    """
+    try:
+        lsn = await sessionmanager.primary_lsn()
+    except (SQLAlchemyError, OSError) as e:
+        logger.error("Data version was not bumped: %s", e)
+        return
+    version = uuid4().hex if lsn is None else f"{uuid4().hex}@{lsn}"
+    try:
+        await redis_client.set(
+            DATA_VERSION_KEY, version, ex=get_settings().DATA_VERSION_TTL
+        )
+    except RedisError as e:
+        logger.error("Data version was not bumped: %s", e)
@@ -1,7 +1,12 @@
 import contextlib
-from typing import AsyncIterator
+import itertools
+import logging
+import time
+from typing import AsyncIterator, Sequence
+from uuid import uuid4
 
-from sqlalchemy import MetaData
+from fastapi import Request
+from sqlalchemy import MetaData, text
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -10,11 +15,60 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
+from src.config import Settings
+from src.query_stats import (
+    TimedAsyncAdaptedQueuePool,
+    TimedNullPool,
+    instrument_engine,
+    query_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+REPLICA_CONNECT_TIMEOUT = 2
+# replay timestamp stays old on an idle primary, so a replica that has
+# replayed everything it received is not lagging. The lag is NULL without a
+# walreceiver or before the first replayed transaction.
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+END::float8,
+CASE
+    WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+    ELSE pg_current_wal_lsn()
+END::text
+"""
+
+
+def _unique_prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def parse_lsn(lsn: str) -> int:
+    high, low = lsn.split("/")
+    return int(high, 16) << 32 | int(low, 16)
+
+
+class _Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.read_only_engine = engine.execution_options(postgresql_readonly=True)
+        self.available = True
+        self.checked_at = float("-inf")
+        self.replayed_lsn = 0
+
 
 class DatabaseSessionManager:
     def __init__(self):
         self._engine: AsyncEngine | None = None
+        self._read_only_engine: AsyncEngine | None = None
         self._sessionmaker: async_sessionmaker | None = None
+        self._replicas: list[_Replica] = []
+        self._replica_counter = itertools.count()
+        self._max_replica_lag = 0.0
+        self._replica_check_interval = 0.0
 
     def init(
         self,
@@ -23,27 +77,102 @@ class DatabaseSessionManager:
         echo_pool: bool = False,
         max_overflow: int = 10,
         pool_size: int = 5,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        null_pool: bool = False,
+        pgbouncer: bool = False,
+        replica_hosts: Sequence[str] = (),
+        max_replica_lag: float = 30,
+        replica_check_interval: float = 5,
+        slow_query_ms: float = 200,
     ) -> None:
-        self._engine = create_async_engine(
-            host,
-            echo=echo,
-            echo_pool=echo_pool,
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            connect_args={"server_settings": {"jit": "off"}},
+        query_stats.slow_query_ms = slow_query_ms
+        engine_options = {
+            "echo": echo,
+            "echo_pool": echo_pool,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+        }
+        if null_pool:
+            engine_options["poolclass"] = TimedNullPool
+        else:
+            engine_options |= {
+                "poolclass": TimedAsyncAdaptedQueuePool,
+                "pool_size": pool_size,
+                "max_overflow": max_overflow,
+                "pool_timeout": pool_timeout,
+            }
+        if pgbouncer:
+            # transaction pooling hands every transaction to any server
+            # connection: named prepared statements must not be reused
+            # and startup parameters are rejected, so set jit on the role
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_prepared_statement_name,
+            }
+        else:
+            connect_args = {"server_settings": {"jit": "off"}}
+
+        self._engine = self._create_engine(
+            host, connect_args=connect_args, **engine_options
+        )
+        self._read_only_engine = self._engine.execution_options(
+            postgresql_readonly=True
         )
+        self._replicas = [
+            _Replica(
+                self._create_engine(
+                    replica_host,
+                    connect_args=connect_args | {"timeout": REPLICA_CONNECT_TIMEOUT},
+                    **engine_options,
+                )
+            )
+            for replica_host in replica_hosts
+        ]
+        self._max_replica_lag = max_replica_lag
+        self._replica_check_interval = replica_check_interval
         self._sessionmaker = async_sessionmaker(
             autocommit=False,
             autoflush=False,
             bind=self._engine,
         )
 
+    def init_from_settings(self, settings: Settings) -> None:
+        self.init(
+            settings.SQLALCHEMY_DATABASE_URL.unicode_string(),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            null_pool=settings.DB_NULL_POOL,
+            pgbouncer=settings.DB_PGBOUNCER,
+            replica_hosts=[
+                url.unicode_string() for url in settings.SQLALCHEMY_REPLICA_URLS
+            ],
+            max_replica_lag=settings.REPLICA_MAX_LAG,
+            replica_check_interval=settings.REPLICA_CHECK_INTERVAL,
+            slow_query_ms=settings.SLOW_QUERY_MS,
+        )
+
+    @staticmethod
+    def _create_engine(host: str, **kwargs) -> AsyncEngine:
+        engine = create_async_engine(host, **kwargs)
+        instrument_engine(engine)
+        return engine
+
     async def close(self):
         if self._engine is None:
             raise Exception("DatabaseSessionManager is not initialized")
         await self._engine.dispose()
+        for replica in self._replicas:
+            await replica.engine.dispose()
         self._engine = None
+        self._read_only_engine = None
         self._sessionmaker = None
+        self._replicas = []
 
     @contextlib.asynccontextmanager
     async def connect(self) -> AsyncIterator[AsyncConnection]:
@@ -71,6 +200,84 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
+    @contextlib.asynccontextmanager
+    async def read_session(
+        self, min_lsn: str | None = None
+    ) -> AsyncIterator[AsyncSession]:
+        """Read-only session on a healthy replica, or on the primary.
+
+        Replicas are taken round-robin. One that lags more than
+        ``max_replica_lag`` seconds or fails to connect is skipped until
+        its next check, and so is one that had not replayed the primary
+        up to ``min_lsn`` at its last check.
+        """
+        if self._sessionmaker is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        session = await self._replica_session(parse_lsn(min_lsn) if min_lsn else 0)
+        if session is None:
+            session = self._sessionmaker(bind=self._read_only_engine)
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def _replica_session(self, min_lsn: int) -> AsyncSession | None:
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[next(self._replica_counter) % len(self._replicas)]
+            if not await self._check_replica(replica):
+                continue
+            if replica.replayed_lsn < min_lsn:
+                continue
+            session = self._sessionmaker(bind=replica.read_only_engine)
+            try:
+                await session.connection()
+            except Exception as e:
+                await session.close()
+                self._mark_unavailable(replica, e)
+                continue
+            return session
+        return None
+
+    async def _check_replica(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        if now - replica.checked_at < self._replica_check_interval:
+            return replica.available
+        replica.checked_at = now
+        try:
+            async with replica.engine.connect() as connection:
+                result = await connection.execute(text(REPLICA_LAG_QUERY))
+                lag, replayed_lsn = result.one()
+        except Exception as e:
+            self._mark_unavailable(replica, e)
+            return False
+        if lag is None or replayed_lsn is None:
+            logger.warning(
+                "Replica %s has no known replay position", replica.engine.url
+            )
+            replica.available = False
+            return False
+        replica.replayed_lsn = parse_lsn(replayed_lsn)
+        replica.available = lag <= self._max_replica_lag
+        if not replica.available:
+            logger.warning("Replica %s lags by %ss", replica.engine.url, lag)
+        return replica.available
+
+    def _mark_unavailable(self, replica: _Replica, error: Exception) -> None:
+        logger.warning("Replica %s is unavailable: %s", replica.engine.url, error)
+        replica.available = False
+        replica.checked_at = time.monotonic()
+
+    async def primary_lsn(self) -> str | None:
+        """WAL position of the primary, ``None`` when there are no replicas."""
+        if not self._replicas:
+            return None
+        async with self.connect() as connection:
+            return await connection.scalar(text("SELECT pg_current_wal_lsn()::text"))
+
     async def create_all(self, connection: AsyncConnection, metadata: MetaData):
         await connection.run_sync(metadata.create_all)
 
@@ -84,3 +291,11 @@ sessionmanager = DatabaseSessionManager()
 async def get_async_session():
     async with sessionmanager.session() as session:
         yield session
+
+
+async def get_async_read_session(request: Request):
+    # set by conditional_get: a response cached against the data version
+    # must not come from a replica that has not replayed that version yet
+    min_lsn = getattr(request.state, "min_lsn", None)
+    async with sessionmanager.read_session(min_lsn) as session:
+        yield session
@@ -1,6 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Sequence
+from uuid import UUID
 
+from src.choices import Companies
+from src.data_version import bump_data_version
 from src.models import Company
 from sqlalchemy import select
 
@@ -11,19 +14,26 @@ async def get_all_companies(
     session: AsyncSession,
     deleted: bool,
 ) -> Sequence[Company]:
-    stmt = select(Company).order_by(Company.created_at)
+    stmt = select(Company).order_by(Company.id)
     if not deleted:
         stmt = stmt.filter(Company.deleted_at.is_(None))
     result = await session.scalars(stmt)
     return result.all()
 
 
+async def get_active_company_names(session: AsyncSession) -> dict[UUID, Companies]:
+    stmt = select(Company.id, Company.name).where(Company.deleted_at.is_(None))
+    result = await session.execute(stmt)
+    return dict(result.tuples().all())
+
+
 async def create_company(
     session: AsyncSession, company_create: CompanyCreateSchema
 ) -> Company:
     company = Company(**company_create.model_dump())
     session.add(company)
     await session.commit()
+    await bump_data_version()
     await session.refresh(company)
     return company
 
@@ -37,6 +47,7 @@ async def create_companies(
         objs.append(db_obj)
     session.add_all(objs)
     await session.commit()
+    await bump_data_version()
     for db_obj in objs:
         await session.refresh(db_obj)
     return objs
@@ -1,12 +1,21 @@
 from typing import Sequence
+from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import and_, delete, false, func, or_, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Subscriber
+from src.models import Company, Subscriber, Vacancy
 from src.schemas import SubscriberCreateSchema, SubscriberUpdateSchema
 
 
+def _keep_loaded(session: AsyncSession, subscriber: Subscriber | None) -> None:
+    # commit expires everything in the session, and reloading the values
+    # RETURNING has just delivered would cost another round trip
+    if subscriber is not None:
+        session.expunge(subscriber)
+
+
 async def get_subscriber_by_email(
     session: AsyncSession, email: str
 ) -> Sequence[Subscriber]:
@@ -17,29 +26,73 @@ async def get_subscriber_by_email(
 
 async def create_subscriber(
     session: AsyncSession, subs_schema: SubscriberCreateSchema
-) -> Subscriber:
-    subscriber = Subscriber(**subs_schema.model_dump())
-    session.add(subscriber)
+) -> Subscriber | None:
+    """Returns ``None`` if the email is already registered."""
+    query = (
+        insert(Subscriber)
+        .values(**subs_schema.model_dump())
+        .on_conflict_do_nothing(index_elements=[Subscriber.email])
+        .returning(Subscriber)
+    )
+    subscriber = await session.scalar(query)
+    _keep_loaded(session, subscriber)
     await session.commit()
-    await session.refresh(subscriber)
     return subscriber
 
 
-async def delete_subscriber(session: AsyncSession, subscriber: Subscriber):
-    await session.delete(subscriber)
+async def delete_subscriber(session: AsyncSession, email: str) -> bool:
+    query = delete(Subscriber).where(Subscriber.email == email).returning(Subscriber.id)
+    deleted_id = await session.scalar(query)
     await session.commit()
+    return deleted_id is not None
 
 
 async def update_subscriber(
     session: AsyncSession,
-    subscriber: Subscriber,
+    email: str,
     updated_fields: SubscriberUpdateSchema,
-):
-    updated_fields = updated_fields.model_dump()
-    for field in updated_fields:
-        if updated_fields[field]:
-            setattr(subscriber, field, updated_fields[field])
-    session.add(subscriber)
+) -> Subscriber | None:
+    updated_fields = {
+        field: value for field, value in updated_fields.model_dump().items() if value
+    }
+    if not updated_fields:
+        subscriber = await get_subscriber_by_email(session, email)
+        return subscriber[0] if subscriber else None
+    query = (
+        update(Subscriber)
+        .where(Subscriber.email == email)
+        .values(**updated_fields)
+        .returning(Subscriber)
+    )
+    subscriber = await session.scalar(query)
+    _keep_loaded(session, subscriber)
     await session.commit()
-    await session.refresh(subscriber)
     return subscriber
+
+
+async def get_digest_recipients(session: AsyncSession, vacancy_ids: Sequence[UUID]):
+    """Matches subscribers to the given vacancies in one join.
+
+    Rows are ``(email, name, vacancy_ids)``, one per subscriber with at
+    least one match. A subscriber without a grade gets every grade.
+    """
+    vacancy_ids_agg = func.array_agg(aggregate_order_by(Vacancy.id, Vacancy.id))
+    stmt = (
+        select(Subscriber.email, Subscriber.name, vacancy_ids_agg)
+        .join(
+            Vacancy,
+            and_(
+                Vacancy.lang == Subscriber.lang,
+                or_(Subscriber.grade.is_(None), Vacancy.grade == Subscriber.grade),
+            ),
+        )
+        .join(Vacancy.company.and_(Company.deleted_at.is_(None)))
+        .where(
+            Vacancy.id.in_(vacancy_ids),
+            Vacancy.is_archived == false(),
+            Subscriber.deleted_at.is_(None),
+        )
+        .group_by(Subscriber.id)
+    )
+    result = await session.execute(stmt)
+    return result.all()
@@ -1,11 +1,31 @@
-from sqlalchemy import select, func, cast, Date
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Collection, Sequence
+from uuid import UUID
+
+from sqlalchemy import (
+    select,
+    func,
+    cast,
+    Date,
+    literal,
+    literal_column,
+    or_,
+    tuple_,
+    union_all,
+    false,
+    true,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.choices import Languages, Grades
+from src.choices import Languages, Grades, VacancyEvent
 from src.models import Vacancy, Company
 from src.schemas import VacancyCreateSchema, VacancyRetrieveSchema
 from src.schemas.vacancies import VacanciesGeneralInfoSchema
 
+# every column of every row is a bind parameter, asyncpg takes 32767
+CREATE_VACANCIES_BATCH_SIZE = 1000
+
 
 async def get_vacancies(
     session: AsyncSession,
@@ -14,28 +34,23 @@ async def get_vacancies(
     grade: Grades | None,
     min_experience: int,
     max_experience: int,
-    with_company_name: bool = False,
+    company_ids: Collection[UUID] | None = None,
 ):
     stmt = (
         select(Vacancy)
         .where(
             Vacancy.experience >= min_experience, Vacancy.experience <= max_experience
         )
-        .order_by(Vacancy.created_at)
+        .order_by(Vacancy.id)
     )
     if not deleted:
-        stmt = stmt.filter(Vacancy.deleted_at.is_(None))
+        stmt = stmt.filter(Vacancy.is_archived == false())
     if lang:
         stmt = stmt.filter(Vacancy.lang == lang)
     if grade:
         stmt = stmt.filter(Vacancy.grade == grade)
-    if with_company_name:
-        stmt = stmt.join(
-            Vacancy.company.and_(
-                Company.deleted_at.is_(None),
-            )
-        )
-        stmt = stmt.add_columns(Company.name.label("company_name"))
+    if company_ids is not None:
+        stmt = stmt.filter(Vacancy.company_id.in_(company_ids))
 
     result = await session.execute(stmt)
     return result.all()
@@ -54,14 +69,29 @@ async def create_vacancy(
 async def create_vacancies(
     session: AsyncSession, vacancies: list[VacancyCreateSchema]
 ) -> list[Vacancy]:
+    """Links that already belong to an active vacancy are skipped."""
+    if not vacancies:
+        return []
     objs = []
-    for vac in vacancies:
-        db_obj = Vacancy(**vac.model_dump())
-        objs.append(db_obj)
-    session.add_all(objs)
-    await session.commit()
+    for i in range(0, len(vacancies), CREATE_VACANCIES_BATCH_SIZE):
+        batch = vacancies[i : i + CREATE_VACANCIES_BATCH_SIZE]
+        query = (
+            insert(Vacancy)
+            .values([vac.model_dump() for vac in batch])
+            .on_conflict_do_nothing(
+                index_elements=[
+                    Vacancy.link_hash,
+                    Vacancy.is_archived,
+                    Vacancy.deleted_at,
+                ]
+            )
+            .returning(Vacancy)
+        )
+        objs.extend((await session.scalars(query)).all())
+    # keep what RETURNING has loaded, commit would expire it
     for db_obj in objs:
-        await session.refresh(db_obj)
+        session.expunge(db_obj)
+    await session.commit()
     return objs
 
 
@@ -110,7 +140,7 @@ async def get_general_info(
 
     active_vacs_stmt = (
         select(func.count(Vacancy.id))
-        .where(Vacancy.deleted_at.is_(None))
+        .where(Vacancy.is_archived == false())
         .join(suit_vacancies, Vacancy.id == suit_vacancies.c.id)
     )
     active_vacs_cnt = await session.scalars(active_vacs_stmt)
@@ -157,7 +187,7 @@ async def get_general_info(
             func.avg(cast(Vacancy.deleted_at, Date) - cast(Vacancy.created_at, Date))
         )
         .join(suit_vacancies, Vacancy.id == suit_vacancies.c.id)
-        .where(Vacancy.deleted_at.isnot(None))
+        .where(Vacancy.is_archived == true())
     )
     avg_vacancy_lifetime = await session.scalars(avg_vacancy_lifetime_stmt)
     lifetime = avg_vacancy_lifetime.all()
@@ -196,3 +226,217 @@ async def get_time_trend(
     for date_cnt in time_trend:
         result[date_cnt[0].isoformat()] = date_cnt[1]
     return result
+
+
+def _search_query(query: str):
+    return func.websearch_to_tsquery(cast("russian", REGCONFIG), query).op("||")(
+        func.websearch_to_tsquery(cast("english", REGCONFIG), query)
+    )
+
+
+async def search_vacancies(
+    session: AsyncSession,
+    query: str,
+    limit: int,
+    offset: int,
+):
+    ts_query = _search_query(query)
+    rank = func.ts_rank_cd(Vacancy.search_vector, ts_query)
+    stmt = (
+        select(Vacancy, Company.name.label("company_name"), rank.label("rank"))
+        .join(
+            Vacancy.company.and_(
+                Company.deleted_at.is_(None),
+            )
+        )
+        .where(
+            Vacancy.is_archived == false(),
+            Vacancy.search_vector.op("@@")(ts_query),
+        )
+        .order_by(rank.desc(), Vacancy.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def suggest_vacancy_titles(
+    session: AsyncSession,
+    variants: list[str],
+    similarity_threshold: float,
+    limit: int,
+) -> list[str]:
+    await session.execute(
+        select(
+            func.set_config(
+                "pg_trgm.word_similarity_threshold", str(similarity_threshold), True
+            )
+        )
+    )
+    distance = func.least(
+        *[literal(variant).op("<<->")(Vacancy.title) for variant in variants]
+    )
+    stmt = (
+        select(Vacancy.title)
+        .where(
+            or_(*[literal(variant).op("<%")(Vacancy.title) for variant in variants]),
+            Vacancy.is_archived == false(),
+        )
+        .group_by(Vacancy.title)
+        .order_by(func.min(distance), Vacancy.title)
+        .limit(limit)
+    )
+    result = await session.scalars(stmt)
+    return list(result.all())
+
+
+async def get_vacancies_for_snapshot(session: AsyncSession):
+    stmt = (
+        select(
+            Vacancy.lang,
+            Vacancy.grade,
+            Vacancy.experience,
+            Company.name,
+            Company.deleted_at.is_(None),
+            cast(Vacancy.created_at, Date),
+            cast(Vacancy.deleted_at, Date),
+        )
+        .join(Vacancy.company)
+        .order_by(cast(Vacancy.created_at, Date))
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def get_db_timezone(session: AsyncSession) -> str:
+    return await session.scalar(select(func.current_setting("TimeZone")))
+
+
+async def get_vacancies_by_ids(session: AsyncSession, ids: Sequence[UUID]):
+    stmt = (
+        select(Vacancy, Company.name.label("company_name"))
+        .join(Vacancy.company)
+        .where(Vacancy.id.in_(ids))
+        .order_by(Vacancy.id)
+    )
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def stream_vacancies(
+    session: AsyncSession,
+    deleted: bool,
+    lang: Languages | None,
+    grade: Grades | None,
+    min_experience: int,
+    max_experience: int,
+    created_from: datetime | None,
+    created_to: datetime | None,
+    batch_size: int,
+) -> AsyncIterator[Sequence]:
+    """Yields batches of rows read through a server-side cursor."""
+    stmt = (
+        select(
+            Vacancy.id,
+            Vacancy.title,
+            Vacancy.grade,
+            Vacancy.lang,
+            Vacancy.experience,
+            Vacancy.link,
+            Vacancy.company_id,
+            Company.name.label("company_name"),
+            Vacancy.created_at,
+            Vacancy.deleted_at,
+        )
+        .join(
+            Vacancy.company.and_(
+                Company.deleted_at.is_(None),
+            )
+        )
+        .where(
+            Vacancy.experience >= min_experience, Vacancy.experience <= max_experience
+        )
+        .order_by(Vacancy.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if not deleted:
+        stmt = stmt.filter(Vacancy.is_archived == false())
+    if lang:
+        stmt = stmt.filter(Vacancy.lang == lang)
+    if grade:
+        stmt = stmt.filter(Vacancy.grade == grade)
+    if created_from:
+        stmt = stmt.filter(Vacancy.created_at >= created_from)
+    if created_to:
+        stmt = stmt.filter(Vacancy.created_at < created_to)
+
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+
+def _vacancy_events(
+    event: VacancyEvent,
+    event_at,
+    since: tuple[datetime, UUID] | None,
+    include_since: bool,
+    until,
+    limit: int,
+):
+    stmt = select(
+        *Vacancy.__table__.c["id", "title", "grade", "lang", "experience", "link"],
+        *Vacancy.__table__.c["company_id", "created_at", "deleted_at"],
+        Company.name.label("company_name"),
+        literal_column(f"'{event.value}'").label("event"),
+        event_at.label("event_at"),
+    ).join(Vacancy.company)
+    stmt = stmt.where(event_at.is_not(None), event_at < until)
+    if event == VacancyEvent.DELETED:
+        stmt = stmt.where(Vacancy.is_archived == true())
+    if since is not None:
+        position = tuple_(event_at, Vacancy.id)
+        watermark = tuple_(literal(since[0], event_at.type), literal(since[1]))
+        stmt = stmt.where(
+            position >= watermark if include_since else position > watermark
+        )
+    return stmt.order_by(event_at, Vacancy.id).limit(limit)
+
+
+async def get_vacancy_changes(
+    session: AsyncSession,
+    since: tuple[datetime, UUID, VacancyEvent] | None,
+    safety_lag: timedelta,
+    limit: int,
+):
+    """Creations and soft deletions after the ``since`` position, in order.
+
+    Events are ordered by ``(event_at, id, event)``, where ``event_at`` is
+    ``created_at`` or ``deleted_at``. Each side is a range scan over its own
+    index. Events newer than ``safety_lag`` are held back: a row carries
+    the time its transaction started, so it may become visible after a
+    client has already moved past that time.
+    """
+    until = func.now() - safety_lag
+    position = since[:2] if since else None
+    created = _vacancy_events(
+        VacancyEvent.CREATED, Vacancy.created_at, position, False, until, limit
+    )
+    # a creation and a deletion of one vacancy may share the timestamp
+    deleted = _vacancy_events(
+        VacancyEvent.DELETED,
+        Vacancy.deleted_at,
+        position,
+        since is not None and since[2] == VacancyEvent.CREATED,
+        until,
+        limit,
+    )
+    events = union_all(created.subquery().select(), deleted.subquery().select())
+    events = events.subquery()
+    stmt = (
+        select(events)
+        .order_by(events.c.event_at, events.c.id, events.c.event)
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return result.all()
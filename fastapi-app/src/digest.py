@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import smtplib
+from email.message import EmailMessage
+from typing import Iterable, Iterator, Sequence
+from uuid import UUID
+
+from src.config import get_settings
+from src.database import sessionmanager
+from src.db_crud.subscribers import get_digest_recipients
+from src.db_crud.vacancies import get_vacancies_by_ids
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SUBJECT = "Новые вакансии"
+
+
+def render_vacancy(vacancy, company_name: str) -> str:
+    return (
+        f"{vacancy.title}\n"
+        f"{company_name}, {vacancy.grade}, опыт от {vacancy.experience} г.\n"
+        f"{vacancy.link}\n"
+    )
+
+
+class DigestRenderer:
+    """Renders digest bodies, every distinct vacancy list only once.
+
+    Subscribers with the same preferences match the same vacancies, so the
+    list is rendered per preference group and only the greeting per person.
+    """
+
+    def __init__(self, sender: str, vacancies: dict[UUID, str]):
+        self.sender = sender
+        self._vacancies = vacancies
+        self._blocks: dict[tuple[UUID, ...], str] = {}
+
+    def _block(self, vacancy_ids: tuple[UUID, ...]) -> str:
+        block = self._blocks.get(vacancy_ids)
+        if block is None:
+            block = "\n".join(self._vacancies[id_] for id_ in vacancy_ids)
+            self._blocks[vacancy_ids] = block
+        return block
+
+    def render(
+        self, email: str, name: str, vacancy_ids: Sequence[UUID]
+    ) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = DIGEST_SUBJECT
+        message["From"] = self.sender
+        message["To"] = email
+        message.set_content(
+            f"{name}, здравствуйте!\n\n"
+            f"За сутки появились вакансии по вашей подписке:\n\n"
+            f"{self._block(tuple(vacancy_ids))}"
+        )
+        return message
+
+
+class SMTPPool:
+    """Sends messages over a fixed number of reused SMTP connections.
+
+    smtplib is blocking, so every connection lives in a worker thread and
+    the number of connections bounds the concurrency. A connection is
+    reopened after ``messages_per_connection`` messages, since relays
+    limit how much they accept per session.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        timeout: float = 30,
+        connections: int = 10,
+        messages_per_connection: int = 100,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections = connections
+        self.messages_per_connection = messages_per_connection
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        return smtp
+
+    @staticmethod
+    def _quit(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except smtplib.SMTPException:
+            smtp.close()
+
+    def _send(self, smtp: smtplib.SMTP | None, message: EmailMessage) -> smtplib.SMTP:
+        if smtp is None:
+            smtp = self._connect()
+        try:
+            smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            smtp = self._connect()
+            smtp.send_message(message)
+        return smtp
+
+    async def _worker(self, messages: Iterator[EmailMessage]) -> tuple[int, int]:
+        sent = failed = 0
+        smtp = None
+        sent_by_connection = 0
+        try:
+            # the iterator is shared, next() never yields to the loop
+            for message in messages:
+                if sent_by_connection >= self.messages_per_connection:
+                    await asyncio.to_thread(self._quit, smtp)
+                    smtp, sent_by_connection = None, 0
+                try:
+                    smtp = await asyncio.to_thread(self._send, smtp, message)
+                except (smtplib.SMTPException, OSError) as e:
+                    logger.warning("Message to %s was not sent: %s", message["To"], e)
+                    failed += 1
+                    if smtp is not None and not isinstance(
+                        e, smtplib.SMTPRecipientsRefused
+                    ):
+                        await asyncio.to_thread(smtp.close)
+                        smtp, sent_by_connection = None, 0
+                    continue
+                sent += 1
+                sent_by_connection += 1
+        finally:
+            if smtp is not None:
+                await asyncio.to_thread(self._quit, smtp)
+        return sent, failed
+
+    async def send_all(self, messages: Iterable[EmailMessage]) -> tuple[int, int]:
+        """Returns the numbers of sent and failed messages."""
+        messages = iter(messages)
+        results = await asyncio.gather(
+            *(self._worker(messages) for _ in range(self.connections))
+        )
+        return sum(sent for sent, _ in results), sum(failed for _, failed in results)
+
+
+async def send_vacancy_digests(vacancy_ids: Sequence[UUID]) -> None:
+    settings = get_settings()
+    if not settings.SMTP_HOST or not vacancy_ids:
+        return
+
+    async with sessionmanager.session() as session:
+        vacancies = await get_vacancies_by_ids(session, vacancy_ids)
+        recipients = await get_digest_recipients(session, vacancy_ids)
+    if not recipients:
+        return
+
+    renderer = DigestRenderer(
+        settings.SMTP_SENDER,
+        {
+            row.Vacancy.id: render_vacancy(row.Vacancy, row.company_name)
+            for row in vacancies
+        },
+    )
+    pool = SMTPPool(
+        settings.SMTP_HOST,
+        settings.SMTP_PORT,
+        user=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        starttls=settings.SMTP_STARTTLS,
+        timeout=settings.SMTP_TIMEOUT,
+        connections=settings.SMTP_CONNECTIONS,
+        messages_per_connection=settings.SMTP_MESSAGES_PER_CONNECTION,
+    )
+    sent, failed = await pool.send_all(
+        renderer.render(email, name, ids) for email, name, ids in recipients
+    )
+    logger.info("Vacancy digests sent: %s, failed: %s", sent, failed)
@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+from src.choices import ExportFormat
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_COLUMNS = (
+    "id",
+    "title",
+    "grade",
+    "lang",
+    "experience",
+    "link",
+    "company_id",
+    "company_name",
+    "created_at",
+    "deleted_at",
+)
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+Batches = AsyncIterable[Sequence[tuple]]
+
+
+def _cell(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+async def ndjson_chunks(batches: Batches) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_cell, row))), ensure_ascii=False)
+            + "\n"
+            for row in batch
+        ).encode()
+
+
+async def csv_chunks(batches: Batches) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in batches:
+        writer.writerows(map(_cell, row) for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing out what was written since the last take."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    timestamp = pyarrow.timestamp("us", tz="UTC")
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.string()),
+            ("title", pyarrow.string()),
+            ("grade", pyarrow.string()),
+            ("lang", pyarrow.string()),
+            ("experience", pyarrow.int32()),
+            ("link", pyarrow.string()),
+            ("company_id", pyarrow.string()),
+            ("company_name", pyarrow.string()),
+            ("created_at", timestamp),
+            ("deleted_at", timestamp),
+        ]
+    )
+
+
+async def parquet_chunks(batches: Batches) -> AsyncIterator[bytes]:
+    """Every batch becomes a row group, flushed to the client right away."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        async for batch in batches:
+            columns = list(zip(*batch))
+            for i in (0, 2, 3, 6, 7):
+                columns[i] = [str(value) for value in columns[i]]
+            writer.write_batch(
+                pyarrow.RecordBatch.from_arrays(
+                    [
+                        pyarrow.array(column, type=field.type)
+                        for column, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {
+    ExportFormat.NDJSON: ndjson_chunks,
+    ExportFormat.CSV: csv_chunks,
+    ExportFormat.PARQUET: parquet_chunks,
+}
+
+
+def is_format_available(export_format: ExportFormat) -> bool:
+    return export_format != ExportFormat.PARQUET or pyarrow is not None
@@ -0,0 +1,288 @@
+"""Keeps the OpenAI requests of all workers within the account rate limits.
+
+Requests and tokens per minute are two token buckets in redis, refilled
+continuously. A request waits until both buckets hold enough for it: one
+request and the estimated prompt plus completion tokens. Once the response
+reports its usage, the tokens bucket is corrected by the difference.
+
+The x-ratelimit headers of every response lower the limits and the bucket
+levels to what OpenAI reports, and a 429 stops every worker until the
+reset the response asked for.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from contextlib import suppress
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+
+from src.config import get_settings
+from src.query_stats import LatencyHistogram
+from src.redis_client import redis_client
+from src.retry import retry_after
+
+logger = logging.getLogger(__name__)
+
+GPT_PREFIX = "vacs4devs:gpt"
+REQUESTS_KEY = f"{GPT_PREFIX}:bucket:requests"
+TOKENS_KEY = f"{GPT_PREFIX}:bucket:tokens"
+PAUSE_KEY = f"{GPT_PREFIX}:paused"
+STATS_PREFIX = f"{GPT_PREFIX}:stats"
+STATS_TTL = 24 * 60 * 60
+# the answer is a JSON object of four short fields
+COMPLETION_TOKENS = 100
+# a waiting request checks the buckets at least this often
+MAX_POLL_INTERVAL = 1.0
+
+# KEYS: requests bucket, tokens bucket, pause
+# ARGV: requests per minute, tokens per minute, tokens of the request
+# returns the seconds to wait, "0" once both buckets were debited
+ACQUIRE_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local paused = redis.call("pttl", KEYS[3])
+if paused > 0 then
+    return tostring(paused / 1000)
+end
+local function level(key, capacity)
+    local state = redis.call("hmget", key, "level", "at")
+    local value = tonumber(state[1]) or capacity
+    local at = tonumber(state[2]) or now
+    return math.min(capacity, value + (now - at) * capacity / 60)
+end
+local requests_capacity = tonumber(ARGV[1])
+local tokens_capacity = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), tokens_capacity)
+local requests = level(KEYS[1], requests_capacity)
+local tokens = level(KEYS[2], tokens_capacity)
+local wait = 0
+if requests < 1 then
+    wait = (1 - requests) * 60 / requests_capacity
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60 / tokens_capacity)
+end
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call("hset", KEYS[1], "level", tostring(requests - 1), "at", tostring(now))
+redis.call("hset", KEYS[2], "level", tostring(tokens - cost), "at", tostring(now))
+redis.call("expire", KEYS[1], 120)
+redis.call("expire", KEYS[2], 120)
+return "0"
+"""
+
+# KEYS: requests bucket, tokens bucket
+# ARGV: requests per minute, tokens per minute, extra tokens to debit,
+# remaining requests and tokens reported by OpenAI or ""
+ADJUST_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local function adjust(key, capacity, debit, remaining)
+    local state = redis.call("hmget", key, "level", "at")
+    local value = tonumber(state[1]) or capacity
+    local at = tonumber(state[2]) or now
+    value = math.min(capacity, value + (now - at) * capacity / 60) - debit
+    if remaining ~= "" then
+        value = math.min(value, tonumber(remaining))
+    end
+    value = math.max(value, -capacity)
+    redis.call("hset", key, "level", tostring(value), "at", tostring(now))
+    redis.call("expire", key, 120)
+end
+adjust(KEYS[1], tonumber(ARGV[1]), 0, ARGV[4])
+adjust(KEYS[2], tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[5])
+return 1
+"""
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Seconds of an x-ratelimit-reset-* header such as ``6m0s`` or ``20ms``."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _header_int(headers, name: str) -> int | None:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Upper estimate of the prompt tokens without loading a tokenizer.
+
+    A token is about 4 bytes of english text and a little more than one
+    cyrillic letter, which is 2 bytes in UTF-8.
+    """
+    tokens = 3
+    for message in messages:
+        tokens += 4 + len(str(message.get("content", "")).encode()) // 3
+    return tokens
+
+
+class GptGovernorStats:
+    def __init__(self):
+        self.queue_wait = LatencyHistogram()
+        self.waiting = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.estimated_tokens = 0
+        self.used_tokens = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "queue_wait": self.queue_wait.to_dict(),
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "estimated_tokens": self.estimated_tokens,
+            "used_tokens": self.used_tokens,
+        }
+
+
+class GptGovernor:
+    def __init__(
+        self, requests_per_minute: int, tokens_per_minute: int, concurrency: int
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.concurrency = asyncio.Semaphore(concurrency)
+        self.stats = GptGovernorStats()
+        self.stats_key = f"{STATS_PREFIX}:{uuid4().hex}"
+
+    @classmethod
+    def from_settings(cls) -> "GptGovernor":
+        settings = get_settings()
+        return cls(
+            settings.GPT_REQUESTS_PER_MINUTE,
+            settings.GPT_TOKENS_PER_MINUTE,
+            settings.GPT_CONCURRENCY,
+        )
+
+    async def complete(self, client, **request):
+        """client.chat.completions.create(**request) once the limits allow it."""
+        estimated = estimate_tokens(request.get("messages", [])) + COMPLETION_TOKENS
+        started = time.perf_counter()
+        self.stats.waiting += 1
+        try:
+            # debit the buckets only when the request can be sent right away,
+            # or a caller queued on the semaphore holds tokens it is not using
+            await self.concurrency.acquire()
+            try:
+                await self._acquire(estimated)
+            except BaseException:
+                self.concurrency.release()
+                raise
+        finally:
+            self.stats.waiting -= 1
+            self.stats.queue_wait.record((time.perf_counter() - started) * 1000)
+        try:
+            self.stats.requests += 1
+            self.stats.estimated_tokens += estimated
+            try:
+                raw = await client.chat.completions.with_raw_response.create(**request)
+            except Exception as e:
+                if getattr(e, "status_code", None) == 429:
+                    self.stats.rate_limited += 1
+                    await self._pause(e)
+                raise
+            completion = raw.parse()
+            used = completion.usage.total_tokens if completion.usage else estimated
+            self.stats.used_tokens += used
+            await self._observe(raw.headers, used - estimated)
+            return completion
+        finally:
+            self.concurrency.release()
+            await self.publish_stats()
+
+    async def _acquire(self, tokens: int) -> None:
+        while True:
+            try:
+                wait = float(
+                    await redis_client.eval(
+                        ACQUIRE_SCRIPT,
+                        3,
+                        REQUESTS_KEY,
+                        TOKENS_KEY,
+                        PAUSE_KEY,
+                        self.requests_per_minute,
+                        self.tokens_per_minute,
+                        tokens,
+                    )
+                )
+            except RedisError as e:
+                # OpenAI still answers 429s, which the retry policy handles
+                logger.warning("GPT rate limits are not enforced: %s", e)
+                return
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, MAX_POLL_INTERVAL))
+
+    async def _observe(self, headers, extra_tokens: int) -> None:
+        limit = _header_int(headers, "x-ratelimit-limit-requests")
+        if limit and limit < self.requests_per_minute:
+            self.requests_per_minute = limit
+        limit = _header_int(headers, "x-ratelimit-limit-tokens")
+        if limit and limit < self.tokens_per_minute:
+            self.tokens_per_minute = limit
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        try:
+            await redis_client.eval(
+                ADJUST_SCRIPT,
+                2,
+                REQUESTS_KEY,
+                TOKENS_KEY,
+                self.requests_per_minute,
+                self.tokens_per_minute,
+                extra_tokens,
+                "" if remaining_requests is None else remaining_requests,
+                "" if remaining_tokens is None else remaining_tokens,
+            )
+        except RedisError as e:
+            logger.warning("GPT rate limits were not adjusted: %s", e)
+
+    async def _pause(self, exc: Exception) -> None:
+        headers = exc.response.headers
+        pause = max(
+            parse_reset(headers.get("x-ratelimit-reset-requests")) or 0,
+            parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0,
+            retry_after(exc) or 0,
+        )
+        if pause <= 0:
+            pause = 1
+        logger.warning("OpenAI rate limit hit, pausing requests for %.1fs", pause)
+        with suppress(RedisError):
+            await redis_client.set(PAUSE_KEY, 1, px=int(pause * 1000))
+
+    async def publish_stats(self) -> None:
+        stats = self.stats.to_dict() | {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "published_at": time.time(),
+        }
+        with suppress(RedisError):
+            await redis_client.set(self.stats_key, json.dumps(stats), ex=STATS_TTL)
+
+
+async def get_gpt_stats() -> list[dict]:
+    """Stats of every worker process that sent a request in the last day."""
+    keys = [key async for key in redis_client.scan_iter(f"{STATS_PREFIX}:*")]
+    if not keys:
+        return []
+    return [json.loads(value) for value in await redis_client.mget(keys) if value]
+
+
+gpt_governor = GptGovernor.from_settings()
@@ -0,0 +1,311 @@
+"""Distributed part of the daily ingestion, see daily_vacancy_processing.
+
+The coordinator splits the new links into shards on a redis list, every
+worker process consumes them. A consumer moves a shard into its own
+processing list with BLMOVE and removes it from there once the shard is
+done (ack), re-queued with one more attempt (retry) or, after
+INGEST_MAX_ATTEMPTS, moved to the dead letter list. Each of these also
+counts the shard off the run, so the coordinator knows when all shards
+have reported. Shards held by a consumer whose heartbeat expired are put
+back on the queue by the coordinator.
+A shard that can't be read goes to the dead letter list right away.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from typing import Sequence
+from urllib.parse import urlsplit
+from uuid import UUID, uuid4
+
+from redis.exceptions import RedisError
+
+from src.config import get_settings
+from src.database import sessionmanager
+from src.db_crud.vacancies import create_vacancies, get_vacancies_by_ids
+from src.parsers import (
+    ALL_ACTUAL_PARSERS,
+    CompanyVacanciesParser,
+    VacancyLink,
+    add_company_id_to_parsers,
+)
+from src.redis_client import redis_client
+from src.schemas.vacancies import VacancyWithCompanyNameSchema
+from src.retry import RetryError, RetryPolicy
+from src.vacancy_stream import publish_vacancies
+
+logger = logging.getLogger(__name__)
+
+INGEST_PREFIX = "vacs4devs:ingest"
+QUEUE_KEY = f"{INGEST_PREFIX}:queue"
+DEAD_LETTER_KEY = f"{INGEST_PREFIX}:dead"
+# BLMOVE returns after this many seconds without a shard, so the consumer
+# notices cancellation and redis outages
+POLL_TIMEOUT = 1
+RECONNECT_DELAY = 1
+LINK_POLICY = RetryPolicy(3, base_delay=2, max_delay=60)
+
+# a shard that was requeued from under a slow consumer is counted off once,
+# by whoever still holds it; a run that timed out has no counter any more
+FINISH_SHARD_SCRIPT = """
+if redis.call("lrem", KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+if ARGV[2] ~= "" then
+    redis.call("rpush", KEYS[3], ARGV[2])
+end
+if ARGV[3] == "1" and redis.call("exists", KEYS[2]) == 1 then
+    redis.call("decr", KEYS[2])
+end
+return 1
+"""
+
+
+def _pending_key(run_id: str) -> str:
+    return f"{INGEST_PREFIX}:run:{run_id}:pending"
+
+
+def _created_key(run_id: str) -> str:
+    return f"{INGEST_PREFIX}:run:{run_id}:created"
+
+
+def _run_of(shard: str) -> str | None:
+    try:
+        run_id = json.loads(shard)["run"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    return run_id if isinstance(run_id, str) else None
+
+
+def make_shards(run_id: str, links: Sequence[VacancyLink]) -> list[str]:
+    """Shards never mix parsers, a shard is a consumer's unit of work."""
+    size = get_settings().INGEST_SHARD_SIZE
+    by_parser: dict[str, list[str]] = {}
+    for link in links:
+        by_parser.setdefault(link.parser_class.__name__, []).append(link.link_text)
+    shards = []
+    for parser, parser_links in by_parser.items():
+        for start in range(0, len(parser_links), size):
+            shards.append(
+                json.dumps(
+                    {
+                        "run": run_id,
+                        "shard": len(shards),
+                        "parser": parser,
+                        "links": parser_links[start : start + size],
+                        "attempts": 0,
+                    }
+                )
+            )
+    return shards
+
+
+async def enqueue_run(run_id: str, shards: Sequence[str]) -> None:
+    ttl = int(get_settings().INGEST_RUN_TIMEOUT * 2)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(_pending_key(run_id), len(shards), ex=ttl)
+        if shards:
+            pipe.rpush(QUEUE_KEY, *shards)
+        await pipe.execute()
+
+
+async def requeue_stale_shards() -> int:
+    """Puts back the shards of consumers that stopped sending heartbeats."""
+    requeued = 0
+    async for processing_key in redis_client.scan_iter(f"{INGEST_PREFIX}:processing:*"):
+        consumer_id = processing_key.rsplit(":", 1)[1]
+        if await redis_client.exists(f"{INGEST_PREFIX}:consumer:{consumer_id}"):
+            continue
+        while await redis_client.lmove(processing_key, QUEUE_KEY, "RIGHT", "LEFT"):
+            requeued += 1
+    if requeued:
+        logger.warning("Requeued %s shards of stopped consumers", requeued)
+    return requeued
+
+
+async def wait_for_run(run_id: str, timeout: float, poll_interval: float) -> bool:
+    """True once every shard of the run was acked or dead-lettered."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            pending = int(await redis_client.get(_pending_key(run_id)) or 0)
+            if pending <= 0:
+                return True
+            await requeue_stale_shards()
+        except RedisError as e:
+            logger.warning("Ingestion run %s state is unavailable: %s", run_id, e)
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+
+
+async def pop_created_ids(run_id: str) -> list[UUID]:
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.smembers(_created_key(run_id))
+        pipe.delete(_created_key(run_id), _pending_key(run_id))
+        created, _ = await pipe.execute()
+    return sorted(UUID(vacancy_id) for vacancy_id in created)
+
+
+class IngestionConsumer:
+    def __init__(
+        self, parsers: Sequence[type[CompanyVacanciesParser]] = ALL_ACTUAL_PARSERS
+    ):
+        self.id = uuid4().hex
+        self.parsers = {parser.__name__: parser for parser in parsers}
+        self.processing_key = f"{INGEST_PREFIX}:processing:{self.id}"
+        self.heartbeat_key = f"{INGEST_PREFIX}:consumer:{self.id}"
+
+    async def run(self) -> None:
+        # the heartbeat must exist before the first shard is taken, or the
+        # coordinator would requeue it
+        await self._beat()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while True:
+                try:
+                    shard = await redis_client.blmove(
+                        QUEUE_KEY, self.processing_key, POLL_TIMEOUT, "LEFT", "RIGHT"
+                    )
+                except RedisError as e:
+                    logger.warning("Ingestion queue is unavailable: %s", e)
+                    await asyncio.sleep(RECONNECT_DELAY)
+                    continue
+                if shard is None:
+                    continue
+                try:
+                    await self.handle(shard)
+                except Exception:
+                    # requeued, it would take down the next consumer as well
+                    logger.exception("Malformed shard is dead-lettered: %.200s", shard)
+                    await self._dead_letter(shard)
+        finally:
+            heartbeat.cancel()
+            with suppress(RedisError):
+                await redis_client.delete(self.heartbeat_key)
+
+    async def _beat(self) -> None:
+        ttl = get_settings().INGEST_CONSUMER_TTL
+        try:
+            await redis_client.set(self.heartbeat_key, 1, px=int(ttl * 1000))
+        except RedisError as e:
+            logger.warning("Consumer heartbeat was not sent: %s", e)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(get_settings().INGEST_CONSUMER_TTL / 3)
+            await self._beat()
+
+    async def handle(self, shard: str) -> None:
+        unit = json.loads(shard)
+        try:
+            created_ids = await self.process(unit)
+        except Exception:
+            logger.exception(
+                "Shard %s of run %s failed, attempt %s",
+                unit["shard"],
+                unit["run"],
+                unit["attempts"] + 1,
+            )
+            await self._retry(shard, unit)
+        else:
+            await self._ack(shard, unit, created_ids)
+
+    async def process(self, unit: dict) -> list[UUID]:
+        parser = self.parsers[unit["parser"]]
+        async with sessionmanager.session() as session:
+            await add_company_id_to_parsers(session)
+
+        schemas = []
+        for link in unit["links"]:
+            # only the career site counts against its breaker and budget, the
+            # model has GPT_POLICY and the governor
+            try:
+                page = await LINK_POLICY.call(
+                    parser.fetch_vacancy_page,
+                    link,
+                    host=urlsplit(link).hostname,
+                )
+                schema = await parser.vacancy_schema_from_page(page, link)
+            except (RetryError, ValueError) as e:
+                # the rest of the shard goes on, the link is picked up again
+                # by the next run
+                logger.warning("Vacancy %s is skipped: %s", link, e)
+                schema = None
+            await asyncio.sleep(get_settings().INGEST_LINK_DELAY)
+            if schema is not None:
+                schemas.append(schema)
+
+        async with sessionmanager.session() as session:
+            created = await create_vacancies(session, schemas)
+            created_ids = [vacancy.id for vacancy in created]
+            rows = await get_vacancies_by_ids(session, created_ids)
+        await publish_vacancies(
+            [
+                VacancyWithCompanyNameSchema(
+                    **row.Vacancy.to_dict(), company_name=row.company_name
+                )
+                for row in rows
+            ]
+        )
+        return created_ids
+
+    async def _ack(self, shard: str, unit: dict, created_ids: list[UUID]) -> None:
+        if created_ids:
+            created_key = _created_key(unit["run"])
+            try:
+                async with redis_client.pipeline(transaction=True) as pipe:
+                    pipe.sadd(created_key, *(str(i) for i in created_ids))
+                    pipe.expire(created_key, int(get_settings().INGEST_RUN_TIMEOUT * 2))
+                    await pipe.execute()
+            except RedisError as e:
+                logger.error("Created vacancies of run %s are lost: %s", unit["run"], e)
+        await self._finish(shard, unit, QUEUE_KEY, "", done=True)
+
+    async def _retry(self, shard: str, unit: dict) -> None:
+        unit["attempts"] += 1
+        if unit["attempts"] < get_settings().INGEST_MAX_ATTEMPTS:
+            await self._finish(shard, unit, QUEUE_KEY, json.dumps(unit), done=False)
+        else:
+            await self._finish(
+                shard, unit, DEAD_LETTER_KEY, json.dumps(unit), done=True
+            )
+
+    async def _dead_letter(self, shard: str) -> None:
+        run_id = _run_of(shard)
+        try:
+            await redis_client.eval(
+                FINISH_SHARD_SCRIPT,
+                3,
+                self.processing_key,
+                _pending_key(run_id or ""),
+                DEAD_LETTER_KEY,
+                shard,
+                shard,
+                int(run_id is not None),
+            )
+        except RedisError as e:
+            logger.error("Malformed shard was not dead-lettered: %s", e)
+
+    async def _finish(
+        self, shard: str, unit: dict, target_key: str, payload: str, done: bool
+    ) -> None:
+        try:
+            await redis_client.eval(
+                FINISH_SHARD_SCRIPT,
+                3,
+                self.processing_key,
+                _pending_key(unit["run"]),
+                target_key,
+                shard,
+                payload,
+                int(done),
+            )
+        except RedisError as e:
+            # the shard stays in the processing list, it is requeued once
+            # this consumer stops
+            logger.error(
+                "Shard %s of run %s was not finished: %s", unit["shard"], unit["run"], e
+            )
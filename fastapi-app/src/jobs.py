@@ -1,26 +1,38 @@
-import asyncio
 from datetime import datetime, timezone
 
 from apscheduler.jobstores.redis import RedisJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from src.config import get_settings
+from src.data_version import bump_data_version
 from src.database import sessionmanager
-from src.db_crud.vacancies import get_vacancies, update_vacancies, create_vacancies
+from src.digest import send_vacancy_digests
+from src.db_crud.vacancies import (
+    get_vacancies,
+    get_vacancies_by_ids,
+    update_vacancies,
+)
+from src.ingestion import enqueue_run, make_shards, pop_created_ids, wait_for_run
 from src.parsers import ALL_ACTUAL_PARSERS, add_company_id_to_parsers, test_openai
 from src.schemas import VacancyRetrieveSchema
-from src.utils import retry
+from src.retry import RetryError, RetryPolicy
+from src.utils import uuid7, vacancy_link_hash
 
 
 async def daily_vacancy_processing() -> None:
+    """Coordinates a run, the links are classified by the ingestion consumers.
+
+    Vacancies that are no longer listed are archived only once every shard
+    has reported, or the run timed out.
+    """
     print("JOB STARTED")
     openai_permission = await test_openai()
     if not openai_permission:
         print("NO PERMISSION")
         return
     print("PERMISSION")
-    all_vacs_retry_decor = retry(5, delay=5, backoff=2, exceptions=(Exception,))
-    vac_retry_decor = retry(2, delay=30, backoff=2, exceptions=(Exception,))
+    settings = get_settings()
+    listing_policy = RetryPolicy(6, base_delay=5, max_delay=120)
 
     async with sessionmanager.session() as session:
         await add_company_id_to_parsers(session)
@@ -32,49 +44,61 @@ async def daily_vacancy_processing() -> None:
             max_experience=100,
             deleted=False,
         )
-        vacancies_dict = {}
-        for vacancy in vacancies_models:
-            vacancies_dict[vacancy.Vacancy.link] = [vacancy.Vacancy, True]
+    unlisted = {
+        vacancy.Vacancy.link_hash: (vacancy.Vacancy.id, vacancy.Vacancy.company_id)
+        for vacancy in vacancies_models
+    }
 
-        all_vacancies = []
-        for parser in ALL_ACTUAL_PARSERS:
-            all_vacancies_wrapped = all_vacs_retry_decor(
+    all_vacancies = []
+    failed_companies = set()
+    for parser in ALL_ACTUAL_PARSERS:
+        try:
+            parser_vacancies = await listing_policy.call(
                 parser.get_all_actual_vacancy_links
             )
-            parser_vacancies = await all_vacancies_wrapped()
-            if parser_vacancies:
-                all_vacancies.extend(parser_vacancies)
+        except RetryError as e:
+            # the company's vacancies are not archived for a missing listing
+            print("listing failed ", parser.__name__, e)
+            failed_companies.add(parser.company_id)
+            continue
+        all_vacancies.extend(parser_vacancies)
+    unlisted = {
+        link_hash: vacancy_id
+        for link_hash, (vacancy_id, company_id) in unlisted.items()
+        if company_id not in failed_companies
+    }
 
-        new_vacancies = []
-        for vac_link in all_vacancies:
-            if vac_link.link_text not in vacancies_dict:
-                new_vacancies.append(vac_link)
-            else:
-                vacancies_dict[vac_link.link_text][1] = False
+    new_vacancies = []
+    known = set(unlisted)
+    for vac_link in all_vacancies:
+        link_hash = vacancy_link_hash(vac_link.link_text)
+        if link_hash not in known:
+            new_vacancies.append(vac_link)
+        unlisted.pop(link_hash, None)
 
-        objs_to_update = {}
-        for link, vac in vacancies_dict.items():
-            if vac[1] is True:
-                vac_schema = VacancyRetrieveSchema(**vac[0].to_dict())
-                vac_schema.deleted_at = datetime.now(tz=timezone.utc)
-                objs_to_update[vac[0]] = vac_schema
+    run_id = uuid7().hex
+    shards = make_shards(run_id, new_vacancies)
+    print("all ", len(all_vacancies))
+    print("new ", len(new_vacancies))
+    print("shards ", len(shards))
+    await enqueue_run(run_id, shards)
+    if not await wait_for_run(
+        run_id, settings.INGEST_RUN_TIMEOUT, settings.INGEST_POLL_INTERVAL
+    ):
+        print("run timed out ", run_id)
+    created_ids = await pop_created_ids(run_id)
+    print("created ", len(created_ids))
 
+    async with sessionmanager.session() as session:
+        objs_to_update = {}
+        for row in await get_vacancies_by_ids(session, list(unlisted.values())):
+            vac_schema = VacancyRetrieveSchema(**row.Vacancy.to_dict())
+            vac_schema.deleted_at = datetime.now(tz=timezone.utc)
+            objs_to_update[row.Vacancy] = vac_schema
         print("to update ", len(objs_to_update))
         await update_vacancies(session, objs_to_update)
-
-        print("all ", len(all_vacancies))
-        print("new ", len(new_vacancies))
-        new_vacancies_schemas = []
-        for new_vacancy in new_vacancies:
-            schema_from_link_wrapped = vac_retry_decor(
-                new_vacancy.parser_class.vacancy_schema_from_vacancy_link
-            )
-            res = await schema_from_link_wrapped(new_vacancy.link_text)
-            await asyncio.sleep(3)
-            if res is not None:
-                new_vacancies_schemas.append(res)
-        print("new schemas ", len(new_vacancies_schemas))
-        await create_vacancies(session, new_vacancies_schemas)
+    await bump_data_version()
+    await send_vacancy_digests(created_ids)
 
 
 jobstores = {
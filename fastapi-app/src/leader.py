@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Callable
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+
+from src.redis_client import redis_client
+from src.singleflight import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+RENEW_LEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LeaderElection:
+    """At most one process holds the lease, a redis key with a ttl.
+
+    The leader renews the key every ``renew_interval``. A candidate takes
+    the key with SET NX once it expires, so a dead leader is replaced
+    within ``ttl``. A leader that cannot renew steps down before its lease
+    could have expired, so two leaders never overlap while clocks agree.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        ttl: float,
+        renew_interval: float,
+        on_elected: Callable[[], None],
+        on_deposed: Callable[[], None],
+    ):
+        self.key = key
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_elected = on_elected
+        self.on_deposed = on_deposed
+        self.is_leader = False
+        self._token = uuid4().hex
+        self._lease_until = float("-inf")
+
+    async def step(self) -> bool:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        ttl_ms = int(self.ttl * 1000)
+        try:
+            if self.is_leader:
+                leading = bool(
+                    await redis_client.eval(
+                        RENEW_LEASE_SCRIPT, 1, self.key, self._token, ttl_ms
+                    )
+                )
+            else:
+                leading = bool(
+                    await redis_client.set(self.key, self._token, nx=True, px=ttl_ms)
+                )
+        except RedisError as e:
+            logger.warning("Leader lease %s is unavailable: %s", self.key, e)
+            # the next step comes after renew_interval, by then the lease
+            # must still be ours
+            leading = self.is_leader and (
+                loop.time() + self.renew_interval < self._lease_until
+            )
+        else:
+            if leading:
+                self._lease_until = started + self.ttl
+        self._set_leader(leading)
+        return leading
+
+    async def run(self) -> None:
+        while True:
+            await self.step()
+            await asyncio.sleep(self.renew_interval)
+
+    async def resign(self) -> None:
+        if not self.is_leader:
+            return
+        self._set_leader(False)
+        try:
+            await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, self.key, self._token)
+        except RedisError as e:
+            logger.warning("Leader lease %s was not released: %s", self.key, e)
+
+    def _set_leader(self, leading: bool) -> None:
+        if leading == self.is_leader:
+            return
+        self.is_leader = leading
+        if leading:
+            logger.info("Elected as leader of %s", self.key)
+            self.on_elected()
+        else:
+            logger.info("No longer leader of %s", self.key)
+            self.on_deposed()
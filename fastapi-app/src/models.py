@@ -1,14 +1,20 @@
 from contextlib import suppress
 from datetime import datetime
 from uuid import UUID as PY_UUID
-from uuid import uuid4
 
 from sqlalchemy import MetaData, ForeignKey
 from sqlalchemy import (
+    DDL,
+    CheckConstraint,
+    Computed,
+    Index,
     String,
+    event,
+    false,
     func,
+    text,
 )
-from sqlalchemy.dialects.postgresql import ENUM, TIMESTAMP
+from sqlalchemy.dialects.postgresql import ENUM, TIMESTAMP, TSVECTOR
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import (
@@ -17,6 +23,7 @@ from sqlalchemy.orm import (
     registry,
     DeclarativeBase,
     relationship,
+    validates,
 )
 
 from src.choices import Companies, Grades, Languages
@@ -26,15 +33,24 @@ from src.constants import (
     URL_LENGTH,
     NAME_STR_LENGTH,
 )
+from src.utils import uuid7
 
 mapper_registry = registry()
 
+VACANCY_SEARCH_VECTOR = (
+    "to_tsvector('russian'::regconfig, title) "
+    "|| to_tsvector('english'::regconfig, title)"
+)
+# vacancy is partitioned by is_archived, see Vacancy
+VACANCY_PARTITIONS = {"vacancy_active": "false", "vacancy_archived": "true"}
+VACANCY_LINK_HASH = "md5(link)::uuid"
+
 
 class Base(DeclarativeBase):
     __abstract__ = True
     metadata = MetaData(naming_convention=POSTGRES_INDEXES_NAMING_CONVENTION)
 
-    id: Mapped[PY_UUID] = mapped_column(UUID, primary_key=True, default=uuid4)
+    id: Mapped[PY_UUID] = mapped_column(UUID, primary_key=True, default=uuid7)
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -83,13 +99,73 @@ class Vacancy(Base):
     experience: Mapped[int] = mapped_column(comment="Мин количество лет опыта")
     link: Mapped[str] = mapped_column(
         String(URL_LENGTH),
-        unique=True,
         comment="Vac link",
     )
+    # the link is normalized before it gets here, see normalize_vacancy_link
+    link_hash: Mapped[PY_UUID] = mapped_column(
+        UUID, Computed(VACANCY_LINK_HASH, persisted=True)
+    )
     company_id: Mapped[PY_UUID] = mapped_column(
         ForeignKey("company.id", ondelete="CASCADE")
     )
     company: Mapped[Company] = relationship(cascade="all, delete")
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(VACANCY_SEARCH_VECTOR, persisted=True),
+        deferred=True,
+    )
+    # partition key, so it is part of the table primary key, but the mapper
+    # still identifies vacancies by id alone
+    is_archived: Mapped[bool] = mapped_column(
+        primary_key=True, default=False, server_default=false(), sort_order=1
+    )
+
+    __table_args__ = (
+        Index("vacancy_search_vector_idx", "search_vector", postgresql_using="gin"),
+        Index(
+            "vacancy_title_trgm_idx",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index("vacancy_created_at_id_idx", "created_at", "id"),
+        Index(
+            "vacancy_deleted_at_id_idx",
+            "deleted_at",
+            "id",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        # a unique index on a partitioned table has to include is_archived, and
+        # deleted_at keeps apart the rows of a link archived more than once:
+        # among active vacancies it is NULL, so the link hash alone is unique
+        Index(
+            "vacancy_link_hash_key",
+            "link_hash",
+            "is_archived",
+            "deleted_at",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+        CheckConstraint("is_archived = (deleted_at IS NOT NULL)", name="archived"),
+        {"postgresql_partition_by": "LIST (is_archived)"},
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        return {"primary_key": [cls.__table__.c.id]}
+
+    @validates("deleted_at")
+    def _archive_when_deleted(self, key, deleted_at):
+        self.is_archived = deleted_at is not None
+        return deleted_at
+
+
+for partition, value in VACANCY_PARTITIONS.items():
+    event.listen(
+        Vacancy.__table__,
+        "after_create",
+        DDL(f"CREATE TABLE {partition} PARTITION OF vacancy FOR VALUES IN ({value})"),
+    )
 
 
 class Subscriber(Base):
@@ -3,22 +3,59 @@ from __future__ import annotations
 import json
 import time
 from abc import ABC, abstractmethod
+from functools import cache
 
 import httpx
 from bs4 import BeautifulSoup
-from openai import AsyncOpenAI, PermissionDeniedError
 from pydantic import BaseModel, Field
-from selenium import webdriver
-from selenium.webdriver.common.by import By
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.choices import Grades, Languages, Companies
 from src.config import get_settings
 from src.db_crud.companies import get_all_companies
+from src.gpt_governor import gpt_governor
+from src.retry import RetryPolicy
 from src.schemas import VacancyCreateSchema
+from src.utils import normalize_vacancy_link
 
 settings = get_settings()
-gpt_client = AsyncOpenAI(api_key=settings.GPT_API_KEY, timeout=5)
+
+
+GPT_POLICY = RetryPolicy(4, base_delay=1, max_delay=30)
+
+# benchmarks/replay.py swaps it for recorded responses
+http_transport: httpx.AsyncBaseTransport | None = None
+
+
+def http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=http_transport)
+
+
+# openai and selenium are the bulk of this module's import time and memory,
+# they are loaded on first use rather than when the worker starts
+@cache
+def get_gpt_client():
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=settings.GPT_API_KEY,
+        base_url=settings.GPT_BASE_URL,
+        timeout=settings.GPT_TIMEOUT,
+        # retried by the RetryPolicy of the caller
+        max_retries=0,
+    )
+
+
+def remote_chrome_driver():
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--ignore-ssl-errors=yes")
+    options.add_argument("--ignore-certificate-errors")
+    return webdriver.Remote(
+        command_executor=f"http://{settings.SELENIUM_HOST}:4444/wd/hub",
+        options=options,
+    )
 
 
 VACANCY_ANALYZE_PROMPT = """
@@ -45,7 +82,11 @@ frontend это javasript, ios как правило это swift. other это
 
 
 async def gpt_analyze_vacancy_info(info):
-    response = await gpt_client.chat.completions.create(
+    client = get_gpt_client()
+    response = await GPT_POLICY.call(
+        gpt_governor.complete,
+        client,
+        host=client.base_url.host,
         model="gpt-4o-mini",
         store=True,
         response_format={"type": "json_object"},
@@ -82,11 +123,37 @@ class CompanyVacanciesParser(ABC):
         pass
 
     @classmethod
-    @abstractmethod
     async def vacancy_schema_from_vacancy_link(
         cls, vacancy_link_text: str
     ) -> VacancyCreateSchema | None:
-        pass
+        page = await cls.fetch_vacancy_page(vacancy_link_text)
+        return await cls.vacancy_schema_from_page(page, vacancy_link_text)
+
+    @classmethod
+    async def vacancy_schema_from_page(
+        cls, page: str, vacancy_link_text: str
+    ) -> VacancyCreateSchema | None:
+        vacancy = cls.parse_vacancy_page(page)
+        if vacancy is None:
+            return None
+        vacancy_title, vacancy_info = vacancy
+        return await cls._create_vacancy_schema(
+            vacancy_title=vacancy_title,
+            vacancy_info=vacancy_info,
+            vacancy_link_text=vacancy_link_text,
+        )
+
+    @classmethod
+    async def fetch_vacancy_page(cls, vacancy_link_text: str) -> str:
+        async with http_client() as client:
+            vacancy_page = await client.get(vacancy_link_text)
+            vacancy_page.raise_for_status()
+        return vacancy_page.text
+
+    @classmethod
+    @abstractmethod
+    def parse_vacancy_page(cls, page: str) -> tuple[str, str] | None:
+        """Title and the text to classify, None when the page has neither."""
 
     @classmethod
     async def _create_vacancy_schema(
@@ -108,7 +175,7 @@ class CompanyVacanciesParser(ABC):
 
 class VacancyLink:
     def __init__(self, link_text: str, parser_class) -> None:
-        self.link_text = link_text
+        self.link_text = normalize_vacancy_link(link_text)
         self.parser_class = parser_class
 
 
@@ -117,7 +184,11 @@ class AviasalesVacancyParser(CompanyVacanciesParser):
 
     @classmethod
     async def get_all_actual_vacancy_links(cls) -> list[VacancyLink]:
-        vacancies_page = httpx.get("https://www.aviasales.ru/about/vacancies")
+        async with http_client() as client:
+            vacancies_page = await client.get(
+                "https://www.aviasales.ru/about/vacancies"
+            )
+        vacancies_page.raise_for_status()
         soup = BeautifulSoup(vacancies_page.text, "html.parser")
         vacancies_links = []
         for link in soup.find_all("a"):
@@ -131,12 +202,8 @@ class AviasalesVacancyParser(CompanyVacanciesParser):
         return vacancies_links
 
     @classmethod
-    async def vacancy_schema_from_vacancy_link(
-        cls, vacancy_link_text: str
-    ) -> VacancyCreateSchema | None:
-        async with httpx.AsyncClient() as http_client:
-            vacancy_page = await http_client.get(vacancy_link_text)
-        soup = BeautifulSoup(vacancy_page.text, "html.parser")
+    def parse_vacancy_page(cls, page: str) -> tuple[str, str] | None:
+        soup = BeautifulSoup(page, "html.parser")
         try:
             vacancy_title = soup.find("title").text
             vacancy_title = (
@@ -150,11 +217,7 @@ class AviasalesVacancyParser(CompanyVacanciesParser):
         if not vacancy_reqs or not vacancy_title:
             return None
         vacancy_info = f"Название вакансии {vacancy_title}. Требования: {vacancy_reqs}"
-        return await cls._create_vacancy_schema(
-            vacancy_title=vacancy_title,
-            vacancy_info=vacancy_info,
-            vacancy_link_text=vacancy_link_text,
-        )
+        return vacancy_title, vacancy_info
 
 
 class SelectelVacancyParser(CompanyVacanciesParser):
@@ -162,13 +225,9 @@ class SelectelVacancyParser(CompanyVacanciesParser):
 
     @classmethod
     async def get_all_actual_vacancy_links(cls) -> list[VacancyLink]:
-        options = webdriver.ChromeOptions()
-        options.add_argument("--ignore-ssl-errors=yes")
-        options.add_argument("--ignore-certificate-errors")
-        driver = webdriver.Remote(
-            command_executor=f"http://{settings.SELENIUM_HOST}:4444/wd/hub",
-            options=options,
-        )
+        from selenium.webdriver.common.by import By
+
+        driver = remote_chrome_driver()
         driver.get("https://selectel.ru/careers/all?code=backend,frontend")
         elements = driver.find_elements(By.CLASS_NAME, "card__link")
         vacancies_links = []
@@ -185,13 +244,9 @@ class SelectelVacancyParser(CompanyVacanciesParser):
         return vacancies_links
 
     @classmethod
-    async def vacancy_schema_from_vacancy_link(
-        cls, vacancy_link_text: str
-    ) -> VacancyCreateSchema | None:
-        async with httpx.AsyncClient() as http_client:
-            vacancy_page = await http_client.get(vacancy_link_text)
+    def parse_vacancy_page(cls, page: str) -> tuple[str, str] | None:
         try:
-            vac_dict_info = json.loads(vacancy_page.text)
+            vac_dict_info = json.loads(page)
             vacancy_title = vac_dict_info["title"]
             vacancy_desc = vac_dict_info["detailed_desc"]
         except (TypeError, KeyError, AttributeError):
@@ -199,11 +254,7 @@ class SelectelVacancyParser(CompanyVacanciesParser):
         if not vacancy_title or not vacancy_desc:
             return None
         vacancy_info = f"Название вакансии {vacancy_title}. Описание: {vacancy_desc}"
-        return await cls._create_vacancy_schema(
-            vacancy_title=vacancy_title,
-            vacancy_info=vacancy_info,
-            vacancy_link_text=vacancy_link_text,
-        )
+        return vacancy_title, vacancy_info
 
 
 class X5VacancyParser(CompanyVacanciesParser):
@@ -211,13 +262,9 @@ class X5VacancyParser(CompanyVacanciesParser):
 
     @classmethod
     async def get_all_actual_vacancy_links(cls) -> list[VacancyLink]:
-        options = webdriver.ChromeOptions()
-        options.add_argument("--ignore-ssl-errors=yes")
-        options.add_argument("--ignore-certificate-errors")
-        driver = webdriver.Remote(
-            command_executor=f"http://{settings.SELENIUM_HOST}:4444/wd/hub",
-            options=options,
-        )
+        from selenium.webdriver.common.by import By
+
+        driver = remote_chrome_driver()
         driver.get("https://x5-tech.ru/vacancy?directionIds=660e855270131eafa8d27678")
         spt = 1
         last_height = driver.execute_script("return document.body.scrollHeight")
@@ -233,22 +280,16 @@ class X5VacancyParser(CompanyVacanciesParser):
         elements = driver.find_elements(By.CLASS_NAME, "VacanciesItem_title__iBYZP")
         vacancies_links = []
         for element in elements:
-            text = element.get_attribute("href")
-            qst_index = text.rindex("?") if "?" in text else None
-            if qst_index is not None:
-                text = text[:qst_index]
-            vacancies_links.append(VacancyLink(link_text=text, parser_class=cls))
+            vacancies_links.append(
+                VacancyLink(link_text=element.get_attribute("href"), parser_class=cls)
+            )
         driver.close()
         driver.quit()
         return vacancies_links
 
     @classmethod
-    async def vacancy_schema_from_vacancy_link(
-        cls, vacancy_link_text: str
-    ) -> VacancyCreateSchema | None:
-        async with httpx.AsyncClient() as http_client:
-            vacancy_page = await http_client.get(vacancy_link_text)
-        soup = BeautifulSoup(vacancy_page.text, "html.parser")
+    def parse_vacancy_page(cls, page: str) -> tuple[str, str] | None:
+        soup = BeautifulSoup(page, "html.parser")
         try:
             vacancy_title = soup.find("title").text
             vacancy_title = (
@@ -264,11 +305,7 @@ class X5VacancyParser(CompanyVacanciesParser):
         if not vacancy_title or not vacancy_reqs:
             return None
         vacancy_info = f"Название вакансии {vacancy_title}. Требования: {vacancy_reqs}"
-        return await cls._create_vacancy_schema(
-            vacancy_title=vacancy_title,
-            vacancy_info=vacancy_info,
-            vacancy_link_text=vacancy_link_text,
-        )
+        return vacancy_title, vacancy_info
 
 
 ALL_ACTUAL_PARSERS = [AviasalesVacancyParser, SelectelVacancyParser, X5VacancyParser]
@@ -288,8 +325,10 @@ async def add_company_id_to_parsers(session: AsyncSession):
 
 
 async def test_openai():
+    from openai import PermissionDeniedError
+
     try:
-        await gpt_client.chat.completions.create(
+        await get_gpt_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": "Write hello world"}],
         )
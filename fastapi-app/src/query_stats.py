@@ -0,0 +1,167 @@
+import logging
+import re
+import reprlib
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_FINGERPRINTS = 500
+OTHER_FINGERPRINT = "<other>"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"\$\d+(?:::\w+)?|%\(\w+\)s|%s|\?")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Statement text with literals and bind parameters replaced by ``?``.
+
+    ``IN`` lists of any length collapse to ``(...)``, so all calls of one
+    query land in one histogram.
+    """
+    statement = _STRING_RE.sub("?", statement)
+    statement = _PARAM_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _LIST_RE.sub("(...)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the percentile."""
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {
+                f"le_{bound}": count for bound, count in zip(BUCKETS_MS, self.counts)
+            }
+            | {"inf": self.counts[-1]},
+        }
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms: float = 200):
+        self.slow_query_ms = slow_query_ms
+        self.reset()
+
+    def reset(self) -> None:
+        self.statements: dict[str, LatencyHistogram] = {}
+        self.pool_wait = LatencyHistogram()
+        self.started_at = time.time()
+
+    def record_statement(self, statement: str, parameters, elapsed_ms: float) -> None:
+        key = fingerprint(statement)
+        histogram = self.statements.get(key)
+        if histogram is None:
+            if len(self.statements) >= MAX_FINGERPRINTS:
+                key = OTHER_FINGERPRINT
+            histogram = self.statements.setdefault(key, LatencyHistogram())
+        histogram.record(elapsed_ms)
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning(
+                "Slow query %.1fms: %s parameters=%s",
+                elapsed_ms,
+                key,
+                reprlib.repr(parameters),
+            )
+
+    def record_pool_wait(self, elapsed_ms: float) -> None:
+        self.pool_wait.record(elapsed_ms)
+
+    def to_dict(self) -> dict:
+        statements = sorted(
+            self.statements.items(), key=lambda item: item[1].total_ms, reverse=True
+        )
+        return {
+            "since": self.started_at,
+            "slow_query_ms": self.slow_query_ms,
+            "pool_wait": self.pool_wait.to_dict(),
+            "statements": [
+                {"statement": key} | histogram.to_dict()
+                for key, histogram in statements
+            ],
+        }
+
+
+query_stats = QueryStats()
+
+
+class TimedPoolMixin:
+    """Records how long a checkout from the pool takes, connecting included."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            query_stats.record_pool_wait((time.perf_counter() - start) * 1000)
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    query_stats.record_statement(
+        statement, parameters, (time.perf_counter() - start) * 1000
+    )
+
+
+def _handle_error(exception_context):
+    if exception_context.connection is None:
+        return
+    start_times = exception_context.connection.info.get("query_start_time")
+    if start_times:
+        start_times.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,13 @@
+from redis.asyncio import Redis
+
+from src.config import get_settings
+
+settings = get_settings()
+
+redis_client = Redis(
+    host=settings.REDIS_HOST,
+    port=int(settings.REDIS_PORT),
+    db=settings.REDIS_APP_DB,
+    decode_responses=True,
+    socket_connect_timeout=1,
+)
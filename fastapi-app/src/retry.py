@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import wraps
+from typing import Awaitable, Callable, Type, TypeVar
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class RetryError(Exception):
+    """The call failed and may not be retried any more."""
+
+
+class CircuitOpenError(RetryError):
+    """Calls to the host are refused until its circuit closes."""
+
+
+def _response_of(exc: BaseException):
+    # httpx.HTTPStatusError and the openai status errors carry the response
+    return getattr(exc, "response", None)
+
+
+def host_of(exc: BaseException) -> str | None:
+    try:
+        return exc.request.url.host
+    except (AttributeError, RuntimeError):
+        # httpx raises RuntimeError for errors created without a request
+        return None
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds the server asked to wait, from Retry-After or retry-after-ms."""
+    response = _response_of(exc)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if (value := headers.get("retry-after-ms")) is not None:
+        try:
+            return max(float(value) / 1000, 0)
+        except ValueError:
+            pass
+    if (value := headers.get("retry-after")) is None:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        until = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((until - datetime.now(tz=timezone.utc)).total_seconds(), 0)
+
+
+class RetryBudget:
+    """At most ``limit`` retries to a host within a sliding ``window``."""
+
+    def __init__(self, limit: int, window: float = 60):
+        self.limit = limit
+        self.window = window
+        self._retries: list[float] = []
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._retries = [t for t in self._retries if now - t < self.window]
+        if len(self._retries) >= self.limit:
+            return False
+        self._retries.append(now)
+        return True
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` failures in a row.
+
+    An open circuit refuses calls for ``reset_timeout``, then lets a single
+    trial call through: its success closes the circuit, its failure opens
+    it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_running:
+            return False
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_running or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self) -> None:
+        """Ends a call that tells nothing about the host, e.g. a 404."""
+        self._trial_running = False
+
+
+class HostGuards:
+    """Retry budgets and circuit breakers, shared per host by all policies."""
+
+    def __init__(self):
+        self.budgets: dict[str, RetryBudget] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def budget(self, host: str) -> RetryBudget:
+        if host not in self.budgets:
+            self.budgets[host] = RetryBudget(get_settings().RETRY_BUDGET_PER_MINUTE)
+        return self.budgets[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            settings = get_settings()
+            self.breakers[host] = CircuitBreaker(
+                settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT
+            )
+        return self.breakers[host]
+
+
+host_guards = HostGuards()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter over ``tries`` attempts.
+
+    The n-th retry waits a random time up to ``base_delay * multiplier**n``,
+    capped by ``max_delay``, or what the server asked for in Retry-After
+    when that is longer. Responses with a status outside RETRY_STATUSES
+    are not retried. Every retry spends the host's retry budget, and a host
+    whose circuit is open is not called at all. The last failure is raised
+    as RetryError, every retry is logged.
+    """
+
+    def __init__(
+        self,
+        tries: int,
+        *,
+        base_delay: float = 0.5,
+        max_delay: float = 60,
+        multiplier: float = 2,
+        exceptions: tuple[Type[BaseException], ...] = (Exception,),
+        guards: HostGuards = host_guards,
+    ):
+        self.tries = tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.exceptions = exceptions
+        self.guards = guards
+
+    def delay(self, retry_number: int, exc: BaseException | None = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier**retry_number)
+        delay = random.uniform(0, ceiling)
+        hint = retry_after(exc) if exc is not None else None
+        return delay if hint is None else max(delay, hint)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        # a nested policy already gave up
+        if isinstance(exc, RetryError) or not isinstance(exc, self.exceptions):
+            return False
+        status = getattr(_response_of(exc), "status_code", None)
+        return status is None or status in RETRY_STATUSES
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[T]],
+        *args,
+        host: str | None = None,
+        **kwargs,
+    ) -> T:
+        """``host`` enables its circuit breaker, without it only the budget
+        of the host found on the exception applies."""
+        name = getattr(func, "__qualname__", repr(func))
+        breaker = self.guards.breaker(host) if host else None
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(f"{name}: circuit of {host} is open")
+            try:
+                result = await func(*args, **kwargs)
+            except self.exceptions as e:
+                retryable = self.is_retryable(e)
+                if breaker is not None:
+                    # a client error or a nested RetryError is no outage
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.release()
+                if attempt == self.tries or not retryable:
+                    raise RetryError(
+                        f"{name} failed after {attempt} attempts: {e!r}"
+                    ) from e
+                budget_host = host or host_of(e) or name
+                if not self.guards.budget(budget_host).try_spend():
+                    raise RetryError(
+                        f"{name}: retry budget of {budget_host} is spent: {e!r}"
+                    ) from e
+                delay = self.delay(attempt - 1, e)
+                logger.warning(
+                    "Retrying %s in %.1fs, attempt %s of %s, host %s: %r",
+                    name,
+                    delay,
+                    attempt + 1,
+                    self.tries,
+                    budget_host,
+                    e,
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # cancelled, or an error this policy does not handle
+                if breaker is not None:
+                    breaker.release()
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+
+    def __call__(
+        self, func: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.call(func, *args, **kwargs)
+
+        return wrapper
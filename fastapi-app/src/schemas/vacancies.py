@@ -1,10 +1,11 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from pydantic import ConfigDict
 
-from src.choices import Languages, Grades, Companies
+from src.choices import Languages, Grades, Companies, VacancyEvent
+from src.utils import normalize_vacancy_link
 
 
 class VacancyBaseSchema(BaseModel):
@@ -17,7 +18,10 @@ class VacancyBaseSchema(BaseModel):
 
 
 class VacancyCreateSchema(VacancyBaseSchema):
-    pass
+    @field_validator("link")
+    @classmethod
+    def normalize_link(cls, link: str) -> str:
+        return normalize_vacancy_link(link)
 
 
 class VacancyRetrieveSchema(VacancyBaseSchema):
@@ -32,6 +36,22 @@ class VacancyWithCompanyNameSchema(VacancyRetrieveSchema):
     company_name: Companies
 
 
+class VacancySearchResultSchema(VacancyWithCompanyNameSchema):
+    rank: float
+
+
+class VacancyChangeSchema(BaseModel):
+    event: VacancyEvent
+    event_at: datetime
+    vacancy: VacancyWithCompanyNameSchema
+
+
+class VacancyChangesSchema(BaseModel):
+    changes: list[VacancyChangeSchema]
+    cursor: str | None
+    has_more: bool
+
+
 class VacanciesGeneralInfoSchema(BaseModel):
     all: int = Field(ge=0)
     active: int = Field(ge=0)
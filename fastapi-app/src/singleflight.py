@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable, TypeVar
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+
+from src.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation.
+
+    The computation runs in its own task, so a cancelled caller does not
+    cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._calls[key] = task
+            task.add_done_callback(partial(self._forget, key))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class RedisSingleFlight:
+    """Shares a computation between workers through a redis lock.
+
+    The lock holder computes and publishes the result under a short-lived
+    key, the others poll for it. When redis is unavailable, or the holder
+    dies without publishing, every caller computes on its own.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        lock_ttl: float,
+        result_ttl: float,
+        poll_interval: float = 0.05,
+    ):
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[T]],
+        dumps: Callable[[T], str],
+        loads: Callable[[str], T],
+    ) -> T:
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid4().hex
+        try:
+            cached = await redis_client.get(result_key)
+            if cached is not None:
+                return loads(cached)
+            locked = await redis_client.set(
+                lock_key, token, nx=True, px=int(self.lock_ttl * 1000)
+            )
+        except RedisError as e:
+            logger.warning("Single-flight lock is unavailable: %s", e)
+            return await func()
+
+        if locked:
+            try:
+                result = await func()
+                try:
+                    await redis_client.set(
+                        result_key, dumps(result), px=int(self.result_ttl * 1000)
+                    )
+                except RedisError as e:
+                    logger.warning("Single-flight result was not shared: %s", e)
+                return result
+            finally:
+                try:
+                    await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except RedisError as e:
+                    logger.warning("Single-flight lock was not released: %s", e)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                cached = await redis_client.get(result_key)
+                if cached is not None:
+                    return loads(cached)
+                if not await redis_client.exists(lock_key):
+                    break
+        except RedisError as e:
+            logger.warning("Single-flight result is unavailable: %s", e)
+        return await func()
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Iterable, Sequence
+from zoneinfo import ZoneInfo
+
+from src.choices import Companies, Grades, Languages
+from src.config import get_settings
+from src.data_version import get_data_version
+from src.database import sessionmanager
+from src.db_crud.vacancies import get_db_timezone, get_vacancies_for_snapshot
+from src.schemas.vacancies import VacanciesGeneralInfoSchema
+
+logger = logging.getLogger(__name__)
+
+
+class _BitmapBuilder:
+    def __init__(self, size: int):
+        self._bytes = bytearray((size + 7) // 8)
+
+    def add(self, index: int) -> None:
+        self._bytes[index >> 3] |= 1 << (index & 7)
+
+    def build(self) -> int:
+        return int.from_bytes(self._bytes, "little")
+
+
+def _bitmaps(size: int, keys: Iterable) -> dict:
+    return {key: _BitmapBuilder(size) for key in keys}
+
+
+class VacancySnapshot:
+    """Bitmap index over all vacancies, answers the stats endpoints in memory.
+
+    Row ``i`` of the snapshot is bit ``i`` of every bitmap, rows are sorted
+    by creation day so a day is a contiguous range of bits. A filter is an
+    AND of bitmaps and a count is a popcount, both run in C over the whole
+    table at once. Vacancy lifetimes are stored as bit planes, so their sum
+    is a popcount per plane as well.
+
+    Rows are ``(lang, grade, experience, company_name, company_active,
+    created_day, deleted_day)`` with days already cast to dates by the db.
+    """
+
+    def __init__(self, rows: Sequence, timezone: str, version: str):
+        self.version = version
+        self.timezone = ZoneInfo(timezone)
+        size = len(rows)
+
+        langs = _bitmaps(size, Languages)
+        grades = _bitmaps(size, Grades)
+        companies = _bitmaps(size, Companies)
+        experiences = {}
+        active_companies = _BitmapBuilder(size)
+        deleted = _BitmapBuilder(size)
+        lifetimes = []
+        self._day_numbers = []
+        self._day_starts = []
+
+        for i, row in enumerate(rows):
+            lang, grade, experience, company, company_active, created, removed = row
+            langs[lang].add(i)
+            grades[grade].add(i)
+            companies[company].add(i)
+            if experience not in experiences:
+                experiences[experience] = _BitmapBuilder(size)
+            experiences[experience].add(i)
+            if company_active:
+                active_companies.add(i)
+            created_day = created.toordinal()
+            if not self._day_numbers or self._day_numbers[-1] != created_day:
+                self._day_numbers.append(created_day)
+                self._day_starts.append(i)
+            if removed is not None:
+                deleted.add(i)
+                lifetime = removed.toordinal() - created_day
+                for plane in range(max(lifetime, 0).bit_length()):
+                    if len(lifetimes) <= plane:
+                        lifetimes.append(_BitmapBuilder(size))
+                    if lifetime >> plane & 1:
+                        lifetimes[plane].add(i)
+        self._day_starts.append(size)
+
+        self._langs = {key: bitmap.build() for key, bitmap in langs.items()}
+        self._grades = {key: bitmap.build() for key, bitmap in grades.items()}
+        self._companies = {key: bitmap.build() for key, bitmap in companies.items()}
+        self._experiences = sorted(
+            (key, bitmap.build()) for key, bitmap in experiences.items()
+        )
+        self._active_companies = active_companies.build()
+        self._deleted = deleted.build()
+        self._lifetimes = [bitmap.build() for bitmap in lifetimes]
+
+    def _mask(
+        self,
+        lang: Languages | None,
+        grade: Grades | None,
+        min_experience: int,
+        max_experience: int,
+    ) -> int:
+        mask = 0
+        for experience, bitmap in self._experiences:
+            if min_experience <= experience <= max_experience:
+                mask |= bitmap
+        if lang:
+            mask &= self._langs[lang]
+        if grade:
+            mask &= self._grades[grade]
+        return mask
+
+    @staticmethod
+    def _distribution(mask: int, bitmaps: dict) -> dict | None:
+        distribution = {}
+        for key, bitmap in bitmaps.items():
+            count = (mask & bitmap).bit_count()
+            if count:
+                distribution[key] = count
+        return distribution if distribution else None
+
+    def general_info(
+        self,
+        lang: Languages | None,
+        grade: Grades | None,
+        min_experience: int,
+        max_experience: int,
+    ) -> VacanciesGeneralInfoSchema:
+        mask = self._mask(lang, grade, min_experience, max_experience)
+        mask &= self._active_companies
+
+        result = {
+            "all": mask.bit_count(),
+            "active": (mask & ~self._deleted).bit_count(),
+            "company_distribution": self._distribution(mask, self._companies),
+        }
+        if not lang:
+            result["lang_distribution"] = self._distribution(mask, self._langs)
+        if not grade:
+            result["grade_distribution"] = self._distribution(mask, self._grades)
+
+        deleted_cnt = (mask & self._deleted).bit_count()
+        if deleted_cnt:
+            lifetime_sum = sum(
+                (mask & bitmap).bit_count() << plane
+                for plane, bitmap in enumerate(self._lifetimes)
+            )
+            lifetime = round(lifetime_sum / deleted_cnt, 3)
+            if lifetime:
+                result["avg_vacancy_lifetime"] = lifetime
+        return VacanciesGeneralInfoSchema(**result)
+
+    def time_trend(
+        self,
+        lang: Languages | None,
+        grade: Grades | None,
+        min_experience: int,
+        max_experience: int,
+        trend_size: int,
+    ) -> dict[str, int]:
+        mask = self._mask(lang, grade, min_experience, max_experience)
+        today = datetime.now(self.timezone).date().toordinal()
+        result = {}
+        first = bisect_right(self._day_numbers, today - trend_size)
+        for i in range(first, len(self._day_numbers)):
+            start, end = self._day_starts[i], self._day_starts[i + 1]
+            count = ((mask >> start) & ((1 << (end - start)) - 1)).bit_count()
+            if count:
+                result[date.fromordinal(self._day_numbers[i]).isoformat()] = count
+        return result
+
+
+class VacancySnapshotHolder:
+    """Keeps the worker's snapshot in step with the shared data version.
+
+    A stale snapshot is never served: callers get ``None`` and fall back
+    to SQL while a rebuild runs in the background.
+    """
+
+    def __init__(self):
+        self._snapshot: VacancySnapshot | None = None
+        self._rebuild_task: asyncio.Task | None = None
+
+    async def get(self) -> VacancySnapshot | None:
+        if not get_settings().VACANCY_SNAPSHOT:
+            return None
+        version = await get_data_version()
+        if version is None:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        self.schedule_rebuild()
+        return None
+
+    def schedule_rebuild(self) -> None:
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self.rebuild())
+
+    async def rebuild(self) -> None:
+        # the version is read before the rows, so a change made during the
+        # build leaves the snapshot outdated rather than mislabelled
+        version = await get_data_version()
+        if version is None:
+            return
+        try:
+            # not a read session: a lagging replica would label old rows
+            # with the new version
+            async with sessionmanager.session() as session:
+                timezone = await get_db_timezone(session)
+                rows = await get_vacancies_for_snapshot(session)
+            self._snapshot = await asyncio.to_thread(
+                VacancySnapshot, rows, timezone, version
+            )
+        except Exception:
+            logger.exception("Vacancy snapshot rebuild failed")
+            return
+        logger.info("Vacancy snapshot rebuilt with %s rows", len(rows))
+
+
+vacancy_snapshot = VacancySnapshotHolder()
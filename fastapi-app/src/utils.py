@@ -1,6 +1,15 @@
-import asyncio
+import hashlib
+import logging
+import os
+import time
 from functools import wraps
 from typing import Callable, Type
+from urllib.parse import urlsplit, urlunsplit
+from uuid import UUID
+
+from src.retry import RetryError, RetryPolicy
+
+logger = logging.getLogger(__name__)
 
 
 def retry(
@@ -10,15 +19,94 @@ def retry(
     backoff: float = 2,
     exceptions: tuple[Type[Exception]],
 ) -> Callable:
+    """``tries`` retries over src.retry.RetryPolicy, None once they are spent.
+
+    New code should use RetryPolicy and handle its RetryError.
+    """
+    policy = RetryPolicy(
+        tries + 1, base_delay=delay, multiplier=backoff, exceptions=exceptions
+    )
+
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            for _ in range(tries + 1):
-                try:
-                    return await func(*args, **kwargs)
-                except exceptions as e:
-                    await asyncio.sleep(delay * backoff)
+            try:
+                return await policy.call(func, *args, **kwargs)
+            except RetryError as e:
+                logger.error("%s", e)
+                return None
 
         return wrapper
 
     return decorator
+
+
+EN_KEYBOARD_LAYOUT = "`qwertyuiop[]asdfghjkl;'zxcvbnm,./"
+RU_KEYBOARD_LAYOUT = "ёйцукенгшщзхъфывапролджэячсмитьбю."
+KEYBOARD_LAYOUT_SWITCH = str.maketrans(
+    EN_KEYBOARD_LAYOUT + RU_KEYBOARD_LAYOUT[:-1],
+    RU_KEYBOARD_LAYOUT + EN_KEYBOARD_LAYOUT[:-1],
+)
+
+
+def switch_keyboard_layout(text: str) -> str:
+    """Retypes text as if the other of the ru/en keyboard layouts was active.
+
+    "знерщт" becomes "python" and "ltdjgc" becomes "девопс".
+    """
+    return text.lower().translate(KEYBOARD_LAYOUT_SWITCH)
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_vacancy_link(link: str) -> str:
+    """Canonical form of a vacancy link, the one its link_hash is taken from.
+
+    Scheme and host are lowercased, the default port, credentials, query,
+    fragment and trailing slash are dropped: none of the career sites keys
+    a vacancy by its query string, they only carry tracking parameters.
+    """
+    parts = urlsplit(link.strip())
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), "", ""))
+
+
+def vacancy_link_hash(link: str) -> UUID:
+    """Same value as the md5(link)::uuid column computed by Postgres."""
+    return UUID(bytes=hashlib.md5(link.encode()).digest())
+
+
+_uuid7_last = (0, 0)
+
+
+def uuid7() -> UUID:
+    """Time-ordered UUID of RFC 9562: unix milliseconds, then 74 random bits.
+
+    Consecutive ids land next to each other in a B-tree, and sorting by id
+    sorts by creation time. Within a millisecond the random bits of the
+    previous id are incremented, so ids of a process are strictly increasing
+    and a page of the index is only ever appended to.
+    """
+    global _uuid7_last
+    timestamp = time.time_ns() // 1_000_000
+    last_timestamp, last_random = _uuid7_last
+    if timestamp > last_timestamp:
+        random = int.from_bytes(os.urandom(10)) >> 6
+    else:
+        timestamp, random = last_timestamp, last_random + 1
+        if random >> 74:
+            timestamp, random = timestamp + 1, 0
+    _uuid7_last = (timestamp, random)
+    # version 7 in front of the top 12 random bits, the RFC 4122 variant
+    # in front of the remaining 62
+    return UUID(
+        int=timestamp << 80
+        | 0x7 << 76
+        | random >> 62 << 64
+        | 0b10 << 62
+        | random & (1 << 62) - 1
+    )
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Sequence
+
+from redis.exceptions import RedisError
+
+from src.choices import Grades, Languages
+from src.config import get_settings
+from src.redis_client import redis_client
+from src.schemas.vacancies import VacancyWithCompanyNameSchema
+
+logger = logging.getLogger(__name__)
+
+VACANCIES_CHANNEL = "vacs4devs:vacancies"
+HEARTBEAT = b": ping\n\n"
+RECONNECT_DELAY = 1
+
+
+async def publish_vacancies(vacancies: Sequence[VacancyWithCompanyNameSchema]) -> None:
+    if not vacancies:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for vacancy in vacancies:
+                pipe.publish(VACANCIES_CHANNEL, vacancy.model_dump_json())
+            await pipe.execute()
+    except RedisError as e:
+        logger.error("New vacancies were not published: %s", e)
+
+
+class _Listener:
+    __slots__ = ("lang", "grade", "min_experience", "max_experience", "queue")
+
+    def __init__(
+        self,
+        lang: Languages | None,
+        grade: Grades | None,
+        min_experience: int,
+        max_experience: int,
+        queue_size: int,
+    ):
+        self.lang = lang
+        self.grade = grade
+        self.min_experience = min_experience
+        self.max_experience = max_experience
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(queue_size)
+
+    def matches(self, vacancy: dict) -> bool:
+        return (
+            (not self.lang or vacancy["lang"] == self.lang)
+            and (not self.grade or vacancy["grade"] == self.grade)
+            and self.min_experience <= vacancy["experience"] <= self.max_experience
+        )
+
+    def send(self, frame: bytes) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class VacancyBroadcaster:
+    """One redis subscription per worker, fanned out to its SSE clients.
+
+    A frame is encoded once and shared by all queues, a client costs only
+    its filter and a bounded queue. A client whose queue overflows is
+    disconnected, it can catch up through /vacancies/changes. Heartbeats
+    come from a single timer, not from a timeout per connection.
+    """
+
+    def __init__(self):
+        self._listeners: set[_Listener] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def _start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._receive()),
+                asyncio.create_task(self._heartbeat()),
+            ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for listener in self._listeners:
+            listener.close()
+
+    async def _receive(self) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(VACANCIES_CHANNEL)
+                async for message in pubsub.listen():
+                    self.dispatch(message["data"])
+            except RedisError as e:
+                logger.warning("Vacancy subscription is lost: %s", e)
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(get_settings().SSE_HEARTBEAT_INTERVAL)
+            for listener in self._listeners:
+                listener.send(HEARTBEAT)
+
+    def dispatch(self, data: str) -> None:
+        # an exception here would end the subscription of every client
+        try:
+            vacancy = json.loads(data)
+            frame = f"event: vacancy\nid: {vacancy['id']}\ndata: {data}\n\n".encode()
+            matching = [
+                listener for listener in self._listeners if listener.matches(vacancy)
+            ]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed vacancy message: %r", data)
+            return
+        overflowed = [listener for listener in matching if not listener.send(frame)]
+        for listener in overflowed:
+            self._listeners.discard(listener)
+            listener.close()
+
+    async def listen(
+        self,
+        lang: Languages | None,
+        grade: Grades | None,
+        min_experience: int,
+        max_experience: int,
+    ) -> AsyncIterator[bytes]:
+        listener = _Listener(
+            lang,
+            grade,
+            min_experience,
+            max_experience,
+            get_settings().SSE_QUEUE_SIZE,
+        )
+        self._listeners.add(listener)
+        self._start()
+        try:
+            yield HEARTBEAT
+            while (frame := await listener.queue.get()) is not None:
+                yield frame
+        finally:
+            self._listeners.discard(listener)
+
+
+vacancy_broadcaster = VacancyBroadcaster()
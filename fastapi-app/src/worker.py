@@ -0,0 +1,61 @@
+"""Background process: owns the scheduler and the parsers.
+
+    python -m src.worker
+
+The API workers never import this module, src.jobs or src.parsers, so
+they do not load selenium, openai and bs4 or start schedulers of their own.
+Any number of workers may run, the scheduler of only the elected one is
+active. A job that is running when its worker loses the lease finishes.
+Every worker consumes the ingestion queue that the daily job fills.
+"""
+
+import asyncio
+import logging
+import signal
+
+from src.config import get_settings
+from src.database import sessionmanager
+from src.ingestion import IngestionConsumer
+from src.jobs import scheduler
+from src.leader import LeaderElection
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEADER_KEY = "vacs4devs:scheduler:leader"
+
+
+async def run() -> None:
+    settings = get_settings()
+    sessionmanager.init_from_settings(settings)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    election = LeaderElection(
+        SCHEDULER_LEADER_KEY,
+        ttl=settings.LEADER_LEASE_TTL,
+        renew_interval=settings.LEADER_RENEW_INTERVAL,
+        on_elected=scheduler.resume,
+        on_deposed=scheduler.pause,
+    )
+    scheduler.start(paused=True)
+    tasks = [asyncio.create_task(election.run())] + [
+        asyncio.create_task(IngestionConsumer().run())
+        for _ in range(settings.INGEST_CONSUMERS)
+    ]
+    logger.info("Worker started")
+    try:
+        await stopped.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await election.resign()
+        scheduler.shutdown()
+        await sessionmanager.close()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
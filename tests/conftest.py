@@ -1,6 +1,7 @@
 from random import randint
 
 import pytest_asyncio
+from sqlalchemy import text
 
 from src.choices import Companies, Languages, Grades
 from src.config import settings
@@ -22,6 +23,7 @@ async def setup_db():
 @pytest_asyncio.fixture(scope="function", loop_scope="session")
 async def create_tables():
     async with sessionmanager.connect() as connection:
+        await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await sessionmanager.drop_all(connection, Base.metadata)
         await sessionmanager.create_all(connection, Base.metadata)
 
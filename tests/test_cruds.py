@@ -1,17 +1,36 @@
 from contextlib import nullcontext as does_not_raise
+from datetime import datetime, timezone
 from random import randint
 from types import NoneType
 from typing import assert_type
 
 import pytest
 from pydantic import ValidationError
+from sqlalchemy import literal_column, select, update
 
-from src import sessionmanager
+from src import database, sessionmanager
 from src.choices import Companies, Languages, Grades
+from src.config import settings
+from src.data_version import data_version_lsn
+from src.database import DatabaseSessionManager
 from src.db_crud.companies import create_companies, create_company, get_all_companies
-from src.db_crud.vacancies import create_vacancies, create_vacancy
+from src.db_crud.vacancies import (
+    create_vacancies,
+    create_vacancy,
+    get_db_timezone,
+    get_general_info,
+    get_time_trend,
+    get_vacancies_for_snapshot,
+    update_vacancies,
+)
 from src.models import Company, Vacancy
-from src.schemas import CompanyCreateSchema, VacancyCreateSchema
+from src.schemas import (
+    CompanyCreateSchema,
+    VacancyCreateSchema,
+    VacancyRetrieveSchema,
+)
+from src.snapshot import VacancySnapshot
+from src.utils import vacancy_link_hash
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -96,3 +115,174 @@ async def test_create_vacancies(fill_companies_table):
         vacancies = await create_vacancies(session, vacs_list)
     assert len(vacancies) == len(Languages) * len(Grades)
     assert_type(vacancies[0], Vacancy)
+    ids = [vacancy.id for vacancy in vacancies]
+    assert all(vacancy_id.version == 7 for vacancy_id in ids)
+    assert ids == sorted(ids)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_vacancies_skips_known_links(fill_vacancies_table):
+    async with sessionmanager.session() as session:
+        known = (await session.scalars(select(Vacancy).limit(1))).one()
+        known_id, known_link = known.id, known.link
+        known_schema = VacancyCreateSchema(
+            **known.to_dict(exclude=["id", "link"]),
+            link=f"HTTPS://Example.com/{known_link}/?utm_source=tg#apply",
+        )
+        await session.execute(
+            update(Vacancy).where(Vacancy.id == known_id).values(link=known_schema.link)
+        )
+        new_schema = known_schema.model_copy(
+            update={"link": "https://example.com/new_vacancy"}
+        )
+        created = await create_vacancies(session, [known_schema, new_schema])
+    assert known_schema.link == f"https://example.com/{known_link}"
+    assert [vacancy.link for vacancy in created] == [new_schema.link]
+    assert created[0].link_hash == vacancy_link_hash(new_schema.link)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_vacancies_above_query_argument_limit(fill_companies_table):
+    async with sessionmanager.session() as session:
+        company_id = (await get_all_companies(session, deleted=False))[0].id
+        vacs_list = [
+            VacancyCreateSchema(
+                title=f"vacancy_{i}",
+                lang=Languages.PYTHON,
+                grade=Grades.MIDDLE,
+                company_id=company_id,
+                link=f"https://example.com/vacancy/{i % 5000}",
+                experience=1,
+            )
+            for i in range(6000)
+        ]
+        vacancies = await create_vacancies(session, vacs_list)
+    assert len(vacancies) == 5000
+    assert len({vacancy.link for vacancy in vacancies}) == 5000
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "lang, grade, min_experience, max_experience",
+    [
+        (None, None, 0, 100),
+        (Languages.GO, None, 0, 100),
+        (None, Grades.MIDDLE, 2, 5),
+    ],
+)
+async def test_snapshot_matches_sql(
+    fill_vacancies_table, lang, grade, min_experience, max_experience
+):
+    async with sessionmanager.session() as session:
+        rows = await get_vacancies_for_snapshot(session)
+        snapshot = VacancySnapshot(rows, await get_db_timezone(session), "test")
+        general_info = await get_general_info(
+            session, lang, grade, min_experience, max_experience
+        )
+        time_trend = await get_time_trend(
+            session, lang, grade, min_experience, max_experience, 7
+        )
+    assert (
+        snapshot.general_info(lang, grade, min_experience, max_experience)
+        == general_info
+    )
+    assert (
+        snapshot.time_trend(lang, grade, min_experience, max_experience, 7)
+        == time_trend
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_read_session_falls_back_to_primary(fill_companies_table):
+    unreachable_replica = (
+        f"postgresql+asyncpg://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+        f"@127.0.0.1:1/{settings.POSTGRES_DB}"
+    )
+    manager = DatabaseSessionManager()
+    manager.init(
+        settings.SQLALCHEMY_DATABASE_URL.unicode_string(),
+        replica_hosts=[unreachable_replica],
+    )
+    try:
+        async with manager.read_session() as session:
+            companies = await get_all_companies(session, deleted=False)
+    finally:
+        await manager.close()
+    assert len(companies) == len(Companies)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "lag_query",
+    ["SELECT NULL::float8, '0/1'::text", "SELECT 0::float8, NULL::text"],
+)
+async def test_read_session_skips_replica_without_replay_position(
+    create_tables, monkeypatch, lag_query
+):
+    # e.g. archive recovery without a walreceiver
+    monkeypatch.setattr(database, "REPLICA_LAG_QUERY", lag_query)
+    manager = DatabaseSessionManager()
+    manager.init(
+        settings.SQLALCHEMY_DATABASE_URL.unicode_string(),
+        replica_hosts=[settings.SQLALCHEMY_DATABASE_URL.unicode_string()],
+    )
+    primary = manager._read_only_engine
+    try:
+        async with manager.read_session() as session:
+            bind = session.bind
+    finally:
+        await manager.close()
+    assert bind is primary
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_read_session_skips_replica_behind_min_lsn(create_tables):
+    manager = DatabaseSessionManager()
+    # the primary stands in for a replica that is always caught up
+    manager.init(
+        settings.SQLALCHEMY_DATABASE_URL.unicode_string(),
+        replica_hosts=[settings.SQLALCHEMY_DATABASE_URL.unicode_string()],
+    )
+    primary = manager._read_only_engine
+    try:
+        lsn = await manager.primary_lsn()
+        async with manager.read_session(lsn) as session:
+            replayed = session.bind
+        async with manager.read_session("FFFFFFFF/0") as session:
+            ahead = session.bind
+    finally:
+        await manager.close()
+    assert data_version_lsn(f"abc@{lsn}") == lsn
+    assert data_version_lsn("abc") is None
+    assert replayed is not primary
+    assert ahead is primary
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_removed_vacancy_moves_to_archive(fill_vacancies_table):
+    async with sessionmanager.session() as session:
+        vacancy = (await session.scalars(select(Vacancy).limit(1))).one()
+        vacancy_id, link = vacancy.id, vacancy.link
+        await update_vacancies(
+            session,
+            {
+                vacancy: VacancyRetrieveSchema(
+                    **vacancy.to_dict(exclude=["deleted_at"]),
+                    deleted_at=datetime.now(tz=timezone.utc),
+                )
+            },
+        )
+        partition = await session.scalar(
+            select(literal_column("tableoid::regclass::text"))
+            .select_from(Vacancy)
+            .where(Vacancy.id == vacancy_id)
+        )
+        returned = await create_vacancy(
+            session,
+            VacancyCreateSchema(
+                **vacancy.to_dict(exclude=["id", "created_at", "deleted_at"])
+            ),
+        )
+    assert partition == "vacancy_archived"
+    assert returned.link == link
+    assert not returned.is_archived
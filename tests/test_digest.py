@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timezone
+from email import message_from_bytes
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select, update
+
+from src.choices import Grades, Languages
+from src.database import sessionmanager
+from src.db_crud.companies import get_all_companies
+from src.db_crud.subscribers import create_subscriber, get_digest_recipients
+from src.db_crud.vacancies import create_vacancies, update_vacancies
+from src.digest import DigestRenderer, SMTPPool
+from src.models import Company, Subscriber, Vacancy
+from src.schemas import (
+    SubscriberCreateSchema,
+    VacancyCreateSchema,
+    VacancyRetrieveSchema,
+)
+
+
+class SMTPSink:
+    """Minimal SMTP server keeping everything it receives."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        writer.write(b"220 sink\r\n")
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command == b"DATA":
+                writer.write(b"354 go on\r\n")
+                data = b""
+                while (line := await reader.readline()) != b".\r\n":
+                    data += line
+                self.messages.append(message_from_bytes(data))
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_smtp_pool_sends_all_messages():
+    sink = SMTPSink()
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    vacancies = {uuid4(): f"vacancy {i}\n" for i in range(3)}
+    ids = list(vacancies)
+    renderer = DigestRenderer("sender@localhost", vacancies)
+    messages = [
+        renderer.render(f"user{i}@localhost", f"user{i}", ids[: i % 3 + 1])
+        for i in range(25)
+    ]
+    pool = SMTPPool("127.0.0.1", port, connections=3, messages_per_connection=4)
+    async with server:
+        sent, failed = await pool.send_all(messages)
+
+    assert (sent, failed) == (25, 0)
+    assert sink.sessions >= 25 / 4
+    assert sorted(message["To"] for message in sink.messages) == sorted(
+        f"user{i}@localhost" for i in range(25)
+    )
+    body = sink.messages[0].get_payload(decode=True).decode()
+    assert "vacancy 0" in body
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_smtp_pool_counts_failures():
+    server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    server.close()
+    await server.wait_closed()
+    renderer = DigestRenderer("sender@localhost", {})
+    pool = SMTPPool("127.0.0.1", port, connections=2)
+
+    sent, failed = await pool.send_all(
+        renderer.render(f"user{i}@localhost", "user", []) for i in range(5)
+    )
+
+    assert (sent, failed) == (0, 5)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_digest_recipients_get_their_matching_vacancies(fill_companies_table):
+    async with sessionmanager.session() as session:
+        companies = await get_all_companies(session, deleted=False)
+        active, removed = companies[0].id, companies[1].id
+        specs = {
+            "python_senior": (Languages.PYTHON, Grades.SENIOR, 5, active),
+            "python_junior": (Languages.PYTHON, Grades.JUNIOR, 0, active),
+            "go_middle": (Languages.GO, Grades.MIDDLE, 2, active),
+            "go_senior": (Languages.GO, Grades.SENIOR, 4, active),
+            "python_senior_removed_company": (
+                Languages.PYTHON,
+                Grades.SENIOR,
+                5,
+                removed,
+            ),
+            "python_senior_old": (Languages.PYTHON, Grades.SENIOR, 3, active),
+            "python_middle_archived": (Languages.PYTHON, Grades.MIDDLE, 1, active),
+        }
+        created = await create_vacancies(
+            session,
+            [
+                VacancyCreateSchema(
+                    title=title,
+                    lang=lang,
+                    grade=grade,
+                    experience=experience,
+                    company_id=company_id,
+                    link=f"https://example.com/{title}",
+                )
+                for title, (lang, grade, experience, company_id) in specs.items()
+            ],
+        )
+        ids = {vacancy.title: vacancy.id for vacancy in created}
+        archived = (
+            await session.scalars(
+                select(Vacancy).where(Vacancy.id == ids["python_middle_archived"])
+            )
+        ).one()
+        await update_vacancies(
+            session,
+            {
+                archived: VacancyRetrieveSchema(
+                    **archived.to_dict(exclude=["deleted_at"]),
+                    deleted_at=datetime.now(tz=timezone.utc),
+                )
+            },
+        )
+        await session.execute(
+            update(Company)
+            .where(Company.id == removed)
+            .values(deleted_at=datetime.now(tz=timezone.utc))
+        )
+        for email, lang, grade in (
+            ("python@example.com", Languages.PYTHON, None),
+            ("python-senior@example.com", Languages.PYTHON, Grades.SENIOR),
+            ("go-middle@example.com", Languages.GO, Grades.MIDDLE),
+            ("java@example.com", Languages.JAVA, None),
+            ("unsubscribed@example.com", Languages.PYTHON, None),
+        ):
+            await create_subscriber(
+                session,
+                SubscriberCreateSchema(name=email, email=email, lang=lang, grade=grade),
+            )
+        await session.execute(
+            update(Subscriber)
+            .where(Subscriber.email == "unsubscribed@example.com")
+            .values(deleted_at=datetime.now(tz=timezone.utc))
+        )
+        await session.commit()
+
+        new_ids = [ids[title] for title in specs if title != "python_senior_old"]
+        rows = await get_digest_recipients(session, new_ids)
+
+    assert {email: vacancy_ids for email, _, vacancy_ids in rows} == {
+        "python@example.com": sorted([ids["python_senior"], ids["python_junior"]]),
+        "python-senior@example.com": [ids["python_senior"]],
+        "go-middle@example.com": [ids["go_middle"]],
+    }
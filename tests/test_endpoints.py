@@ -1,9 +1,25 @@
+import io
+import json
+from datetime import datetime, timedelta
+
 import pytest
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select, update
 
 from src import init_app
-from src.choices import Companies, Languages, Grades
-from src.schemas import CompanyRetrieveSchema, VacancyRetrieveSchema
+from src.api import dependencies
+from src.choices import Companies, ExportFormat, Languages, Grades
+from src.config import get_settings
+from src.data_version import bump_data_version
+from src.database import sessionmanager
+from src.export import EXPORT_COLUMNS, is_format_available, pyarrow
+from src.models import Company, Vacancy
+from src.schemas import (
+    CompanyRetrieveSchema,
+    SubscriberRetrieveSchema,
+    VacancyRetrieveSchema,
+)
+from src.schemas.vacancies import VacancyWithCompanyNameSchema
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -31,3 +47,234 @@ async def test_get_vacancies(fill_vacancies_table):
     assert len(vacancies_1) == len(Languages) * len(Grades)
     assert len(vacancies_2) == 1
     VacancyRetrieveSchema(**vacancies_1[0])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_vacancies_of_deleted_company(fill_vacancies_table):
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        rs_1 = await ac.get("/vacancies/all")
+        async with sessionmanager.session() as session:
+            await session.execute(update(Company).values(deleted_at=func.now()))
+            await session.commit()
+        await bump_data_version()
+        rs_2 = await ac.get("/vacancies/all")
+    assert len(rs_1.json()) == len(Languages) * len(Grades)
+    assert rs_2.json() == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_vacancies_not_modified(fill_vacancies_table):
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        params = {"lang": Languages.GO}
+        rs_1 = await ac.get("/vacancies/all", params=params)
+        etag = rs_1.headers["etag"]
+        rs_2 = await ac.get(
+            "/vacancies/all", params=params, headers={"If-None-Match": etag}
+        )
+        rs_3 = await ac.get(
+            "/vacancies/all",
+            params={"lang": Languages.JAVA},
+            headers={"If-None-Match": etag},
+        )
+    assert rs_1.status_code == 200
+    assert "max-age" in rs_1.headers["cache-control"]
+    assert rs_2.status_code == 304
+    assert rs_2.headers["etag"] == etag
+    assert rs_2.content == b""
+    assert rs_3.status_code == 200
+    assert rs_3.headers["etag"] != etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_time_trend_etag_changes_with_the_day(fill_vacancies_table, monkeypatch):
+    today = await dependencies.db_today()
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        params = {"mode": "7"}
+        rs_1 = await ac.get("/vacancies/time-trend", params=params)
+        etag = rs_1.headers["etag"]
+        rs_2 = await ac.get(
+            "/vacancies/time-trend", params=params, headers={"If-None-Match": etag}
+        )
+
+        async def tomorrow():
+            return today + timedelta(days=1)
+
+        monkeypatch.setattr(dependencies, "db_today", tomorrow)
+        rs_3 = await ac.get(
+            "/vacancies/time-trend", params=params, headers={"If-None-Match": etag}
+        )
+    assert rs_1.status_code == 200
+    assert rs_2.status_code == 304
+    assert rs_3.status_code == 200
+    assert rs_3.headers["etag"] != etag
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_search_vacancies(fill_vacancies_table):
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        rs_1 = await ac.get("/vacancies/search", params={"q": "python"})
+        rs_2 = await ac.get("/vacancies/search", params={"q": "python", "size": 2})
+        rs_3 = await ac.get("/vacancies/search", params={"q": "kafka"})
+        rs_4 = await ac.get("/vacancies/search", params={"q": "p"})
+    vacancies_1 = rs_1.json()
+    assert len(vacancies_1) == len(Grades)
+    assert all(vacancy["lang"] == Languages.PYTHON for vacancy in vacancies_1)
+    assert len(rs_2.json()) == 2
+    assert rs_3.json() == []
+    assert rs_4.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_suggest_vacancy_titles(fill_vacancies_table):
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        rs_1 = await ac.get("/vacancies/suggest", params={"q": "pythn"})
+        rs_2 = await ac.get("/vacancies/suggest", params={"q": "знер", "limit": 3})
+        rs_3 = await ac.get("/vacancies/suggest", params={"q": "x"})
+    titles_1 = rs_1.json()
+    assert len(titles_1) == len(Grades)
+    assert all(title.endswith(Languages.PYTHON) for title in titles_1)
+    titles_2 = rs_2.json()
+    assert len(titles_2) == 3
+    assert all(title.endswith(Languages.PYTHON) for title in titles_2)
+    assert rs_3.status_code == 422
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_vacancies(fill_vacancies_table, monkeypatch):
+    # several row groups in the Parquet file
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 16)
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        rs_ndjson = await ac.get("/vacancies/export")
+        rs_csv = await ac.get(
+            "/vacancies/export", params={"format": "csv", "lang": Languages.GO}
+        )
+        rs_empty = await ac.get(
+            "/vacancies/export", params={"created_from": "2100-01-01T00:00:00Z"}
+        )
+        rs_parquet = await ac.get("/vacancies/export", params={"format": "parquet"})
+    rows = [json.loads(line) for line in rs_ndjson.text.splitlines()]
+    assert len(rows) == len(Languages) * len(Grades)
+    VacancyWithCompanyNameSchema(**rows[0])
+    lines = rs_csv.text.splitlines()
+    assert lines[0].startswith("id,title,grade,lang")
+    assert len(lines) == len(Grades) + 1
+    assert rs_empty.text == ""
+    if not is_format_available(ExportFormat.PARQUET):
+        assert rs_parquet.status_code == 501
+        return
+    parquet = pyarrow.parquet.ParquetFile(io.BytesIO(rs_parquet.content))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.to_pylist() == [
+        {
+            **row,
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "deleted_at": None,
+        }
+        for row in rows
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_vacancy_changes(fill_vacancies_table, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CHANGES_SAFETY_LAG", 0)
+    changes = []
+    params = {"limit": 10}
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        while True:
+            page = (await ac.get("/vacancies/changes", params=params)).json()
+            changes.extend(page["changes"])
+            params["since"] = page["cursor"]
+            if not page["has_more"]:
+                break
+        rs_empty = await ac.get("/vacancies/changes", params=params)
+    assert len(changes) == len(Languages) * len(Grades)
+    assert len({change["vacancy"]["id"] for change in changes}) == len(changes)
+    assert all(change["event"] == "created" for change in changes)
+    assert rs_empty.json()["changes"] == []
+    assert rs_empty.json()["cursor"] == params["since"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_vacancy_changes_pages_through_deletions(
+    fill_vacancies_table, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "CHANGES_SAFETY_LAG", 0)
+    async with sessionmanager.session() as session:
+        ids = (await session.scalars(select(Vacancy.id))).all()
+        # the vacancies were inserted in one transaction and share created_at,
+        # the archived ones are deleted at that very time
+        archived_ids = ids[::3]
+        await session.execute(
+            update(Vacancy)
+            .where(Vacancy.id.in_(archived_ids))
+            .values(deleted_at=Vacancy.created_at, is_archived=True)
+        )
+        await session.commit()
+    expected = {(str(id_), "created") for id_ in ids}
+    expected |= {(str(id_), "deleted") for id_ in archived_ids}
+
+    changes = []
+    params = {"limit": 1}
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        while True:
+            page = (await ac.get("/vacancies/changes", params=params)).json()
+            changes.extend(page["changes"])
+            params["since"] = page["cursor"]
+            if not page["has_more"]:
+                break
+    events = [(change["vacancy"]["id"], change["event"]) for change in changes]
+    assert len(events) == len(expected)
+    assert set(events) == expected
+    # one event_at, so the order is (id, event)
+    assert events == sorted(events)
+    assert len({change["event_at"] for change in changes}) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_subscriber_lifecycle(create_tables):
+    subscriber = {
+        "name": "Test",
+        "email": "test@example.com",
+        "lang": Languages.PYTHON,
+        "grade": None,
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as ac:
+        rs_create = await ac.post("/subscribers", json=subscriber)
+        rs_duplicate = await ac.post("/subscribers", json=subscriber)
+        rs_update = await ac.put(
+            "/subscribers/test@example.com",
+            json={"lang": Languages.GO, "grade": Grades.MIDDLE},
+        )
+        rs_delete = await ac.delete("/subscribers/test@example.com")
+        rs_missing_update = await ac.put(
+            "/subscribers/test@example.com", json={"lang": None, "grade": None}
+        )
+        rs_missing_delete = await ac.delete("/subscribers/test@example.com")
+    assert rs_create.status_code == 201
+    SubscriberRetrieveSchema(**rs_create.json())
+    assert rs_duplicate.status_code == 400
+    assert rs_update.json()["lang"] == Languages.GO
+    assert rs_update.json()["grade"] == Grades.MIDDLE
+    assert rs_delete.status_code == 200
+    assert rs_missing_update.status_code == 404
+    assert rs_missing_delete.status_code == 404
@@ -0,0 +1,155 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from src import gpt_governor as governor_module
+from src.gpt_governor import GptGovernor, estimate_tokens, parse_reset
+from src.redis_client import redis_client
+
+MESSAGES = [{"role": "user", "content": "Python разработчик"}]
+
+
+class RawResponse:
+    def __init__(self, headers: dict, total_tokens: int):
+        self.headers = httpx.Headers(headers)
+        self.total_tokens = total_tokens
+
+    def parse(self):
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=self.total_tokens))
+
+
+class FakeClient:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        create = self.create
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(
+                with_raw_response=SimpleNamespace(create=create)
+            )
+        )
+
+    async def create(self, **request):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    prefix = f"test:gpt:{uuid4().hex}"
+    monkeypatch.setattr(governor_module, "REQUESTS_KEY", f"{prefix}:requests")
+    monkeypatch.setattr(governor_module, "TOKENS_KEY", f"{prefix}:tokens")
+    monkeypatch.setattr(governor_module, "PAUSE_KEY", f"{prefix}:paused")
+    monkeypatch.setattr(governor_module, "STATS_PREFIX", f"{prefix}:stats")
+    return prefix
+
+
+def test_parse_reset():
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("1.5s") == 1.5
+    assert parse_reset("20ms") == 0.02
+    assert parse_reset("") is None
+
+
+def test_estimate_tokens_covers_cyrillic():
+    # "Python разработчик" is about 6 tokens
+    assert estimate_tokens(MESSAGES) >= 6
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_requests_wait_for_the_bucket(keys):
+    governor = GptGovernor(2, 100_000, concurrency=4)
+    client = FakeClient(*(RawResponse({}, 50) for _ in range(3)))
+    for _ in range(2):
+        await governor.complete(client, messages=MESSAGES)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(governor.complete(client, messages=MESSAGES), 0.3)
+    assert governor.stats.requests == 2
+    assert governor.stats.waiting == 0
+    assert governor.stats.queue_wait.count == 3
+    assert governor.stats.queue_wait.max_ms >= 250
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_headers_lower_limits_and_usage_corrects_tokens(keys):
+    governor = GptGovernor(100, 100_000, concurrency=4)
+    headers = {
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-limit-tokens": "5000",
+        "x-ratelimit-remaining-tokens": "1234",
+    }
+    client = FakeClient(RawResponse(headers, 40))
+    await governor.complete(client, messages=MESSAGES)
+
+    assert governor.requests_per_minute == 60
+    assert governor.tokens_per_minute == 5000
+    level = float(await redis_client.hget(governor_module.TOKENS_KEY, "level"))
+    assert level <= 1234
+    assert governor.stats.used_tokens == 40
+
+    stats = await governor_module.get_gpt_stats()
+    assert [s["requests"] for s in stats] == [1]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_rate_limit_pauses_all_requests(keys):
+    governor = GptGovernor(100, 100_000, concurrency=4)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(
+        429, headers={"x-ratelimit-reset-requests": "2s"}, request=request
+    )
+    client = FakeClient(RateLimitError("rate limited", response=response, body=None))
+
+    with pytest.raises(RateLimitError):
+        await governor.complete(client, messages=MESSAGES)
+    assert governor.stats.rate_limited == 1
+    assert 1000 < await redis_client.pttl(governor_module.PAUSE_KEY) <= 2000
+
+    client = FakeClient(RawResponse({}, 40))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(governor.complete(client, messages=MESSAGES), 0.3)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_malformed_retry_after_still_pauses(keys):
+    governor = GptGovernor(100, 100_000, concurrency=4)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after-ms": "soon"}, request=request)
+    client = FakeClient(RateLimitError("rate limited", response=response, body=None))
+
+    with pytest.raises(RateLimitError):
+        await governor.complete(client, messages=MESSAGES)
+    assert 0 < await redis_client.pttl(governor_module.PAUSE_KEY) <= 1000
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_queued_requests_do_not_hold_tokens(keys):
+    governor = GptGovernor(100, 100_000, concurrency=1)
+    release = asyncio.Event()
+
+    class SlowClient(FakeClient):
+        async def create(self, **request):
+            await release.wait()
+            return await super().create(**request)
+
+    client = SlowClient(*(RawResponse({}, 50) for _ in range(2)))
+    first = asyncio.create_task(governor.complete(client, messages=MESSAGES))
+    await asyncio.sleep(0.1)
+    level = float(await redis_client.hget(governor_module.REQUESTS_KEY, "level"))
+
+    second = asyncio.create_task(governor.complete(client, messages=MESSAGES))
+    await asyncio.sleep(0.1)
+    assert governor.stats.waiting == 1
+    assert float(await redis_client.hget(governor_module.REQUESTS_KEY, "level")) == (
+        pytest.approx(level, abs=0.5)
+    )
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert governor.stats.requests == 2
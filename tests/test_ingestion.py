@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+import pytest
+
+from src.choices import Companies, Grades, Languages
+from src.config import get_settings
+from src.database import sessionmanager
+from src.db_crud.companies import get_all_companies
+from src.ingestion import (
+    DEAD_LETTER_KEY,
+    INGEST_PREFIX,
+    QUEUE_KEY,
+    IngestionConsumer,
+    _pending_key,
+    enqueue_run,
+    make_shards,
+    pop_created_ids,
+    requeue_stale_shards,
+    wait_for_run,
+)
+from src.parsers import CompanyVacanciesParser, VacancyLink
+from src.redis_client import redis_client
+from src.retry import RetryError, host_guards
+from src.schemas import VacancyCreateSchema
+from src.utils import uuid7
+
+
+class FakeParser(CompanyVacanciesParser):
+    company_name = Companies.X5
+
+    @classmethod
+    async def get_all_actual_vacancy_links(cls) -> list[VacancyLink]:
+        return []
+
+    @classmethod
+    async def fetch_vacancy_page(cls, vacancy_link_text: str) -> str:
+        return vacancy_link_text
+
+    @classmethod
+    async def vacancy_schema_from_page(
+        cls, page: str, vacancy_link_text: str
+    ) -> VacancyCreateSchema:
+        return VacancyCreateSchema(
+            title=vacancy_link_text,
+            grade=Grades.MIDDLE,
+            lang=Languages.GO,
+            experience=2,
+            link=vacancy_link_text,
+            company_id=cls.company_id,
+        )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ingestion_run(fill_companies_table, monkeypatch):
+    monkeypatch.setattr(get_settings(), "INGEST_LINK_DELAY", 0)
+    await redis_client.delete(QUEUE_KEY, DEAD_LETTER_KEY)
+    async with sessionmanager.session() as session:
+        FakeParser.company_id = (await get_all_companies(session, deleted=False))[0].id
+    run_id = uuid7().hex
+    links = [
+        VacancyLink(f"https://example.com/vacancy/{i}", FakeParser) for i in range(25)
+    ]
+    unknown_parser = {"run": run_id, "shard": 99, "parser": "Gone", "attempts": 0}
+    await enqueue_run(run_id, make_shards(run_id, links) + [json.dumps(unknown_parser)])
+
+    consumers = [
+        asyncio.create_task(IngestionConsumer([FakeParser]).run()) for _ in range(2)
+    ]
+    try:
+        finished = await wait_for_run(run_id, timeout=10, poll_interval=0.05)
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+    created_ids = await pop_created_ids(run_id)
+    dead = [
+        json.loads(shard) for shard in await redis_client.lrange(DEAD_LETTER_KEY, 0, -1)
+    ]
+
+    assert finished
+    assert len(created_ids) == len(links)
+    assert [(shard["parser"], shard["attempts"]) for shard in dead] == [
+        ("Gone", get_settings().INGEST_MAX_ATTEMPTS)
+    ]
+    await redis_client.delete(DEAD_LETTER_KEY)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_requeue_stale_shards():
+    await redis_client.delete(QUEUE_KEY)
+    live = IngestionConsumer([])
+    await live._beat()
+    await redis_client.rpush(live.processing_key, "taken")
+    await redis_client.rpush(f"{INGEST_PREFIX}:processing:stopped", "lost")
+
+    assert await requeue_stale_shards() == 1
+    assert await redis_client.lrange(QUEUE_KEY, 0, -1) == ["lost"]
+    await redis_client.delete(QUEUE_KEY, live.processing_key, live.heartbeat_key)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_malformed_shards_are_dead_lettered(monkeypatch):
+    monkeypatch.setattr(get_settings(), "INGEST_LINK_DELAY", 0)
+    await redis_client.delete(QUEUE_KEY, DEAD_LETTER_KEY)
+    run_id = uuid7().hex
+    malformed = ["{not json", json.dumps({"run": run_id, "parser": "FakeParser"})]
+    await enqueue_run(run_id, malformed)
+
+    consumer = asyncio.create_task(IngestionConsumer([FakeParser]).run())
+    try:
+        finished = await wait_for_run(run_id, timeout=1, poll_interval=0.05)
+        assert not consumer.done()
+    finally:
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+
+    # the shard without "run" can't be counted off, the other one is
+    assert not finished
+    assert await redis_client.get(_pending_key(run_id)) == "1"
+    assert await redis_client.lrange(DEAD_LETTER_KEY, 0, -1) == malformed
+    await redis_client.delete(DEAD_LETTER_KEY, _pending_key(run_id))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_late_shard_does_not_recreate_pending_counter(monkeypatch):
+    monkeypatch.setattr(get_settings(), "INGEST_LINK_DELAY", 0)
+    run_id = uuid7().hex
+    await enqueue_run(run_id, [])
+    # the coordinator gave up on the run
+    await pop_created_ids(run_id)
+    consumer = IngestionConsumer([FakeParser])
+    shard = json.dumps(
+        {"run": run_id, "shard": 0, "parser": "FakeParser", "links": [], "attempts": 0}
+    )
+    await redis_client.rpush(consumer.processing_key, shard)
+    await consumer.handle(shard)
+
+    assert not await redis_client.exists(_pending_key(run_id))
+    assert not await redis_client.exists(consumer.processing_key)
+
+
+class GptFailingParser(FakeParser):
+    fetched = 0
+
+    @classmethod
+    async def fetch_vacancy_page(cls, vacancy_link_text: str) -> str:
+        cls.fetched += 1
+        return vacancy_link_text
+
+    @classmethod
+    async def vacancy_schema_from_page(
+        cls, page: str, vacancy_link_text: str
+    ) -> VacancyCreateSchema:
+        if vacancy_link_text.endswith("invalid"):
+            raise ValueError("the model answered with a bad grade")
+        raise RetryError("gpt_analyze_vacancy_info failed after 4 attempts")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_gpt_failures_do_not_trip_the_site_breaker(
+    fill_companies_table, monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "INGEST_LINK_DELAY", 0)
+    host = f"{uuid7().hex}.example.com"
+    links = [f"https://{host}/vacancy/{i}" for i in range(5)]
+    links += [f"https://{host}/vacancy/invalid"] * 5
+    consumer = IngestionConsumer([GptFailingParser])
+
+    created_ids = await consumer.process(
+        {"run": "", "shard": 0, "parser": "GptFailingParser", "links": links}
+    )
+
+    assert created_ids == []
+    # every page is fetched once and the site stays reachable
+    assert GptFailingParser.fetched == len(links)
+    assert host_guards.breaker(host).allow()
+    assert host_guards.breaker(host)._failures == 0
@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks import openai_stub
+from benchmarks.ingestion import STAGES, measure_size, timed_map
+from benchmarks.replay import synthesize
+from src.database import sessionmanager
+from src.parsers import add_company_id_to_parsers
+from src.retry import CircuitOpenError
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_measure_size(fill_companies_table):
+    async with sessionmanager.session() as session:
+        await add_company_id_to_parsers(session)
+    result = await measure_size(
+        synthesize(per_parser=4),
+        links=12,
+        concurrency=2,
+        stub_app=openai_stub.create_app(),
+    )
+
+    assert list(result["stages"]) == list(STAGES)
+    assert 0 < result["created"] < 12
+    assert result["stages"]["fetch"]["items"] == 12
+    assert result["stages"]["persist"]["items"] == result["created"]
+    for stage in result["stages"].values():
+        assert stage["links_per_second"] > 0
+        assert 0 < stage["p50_ms"] <= stage["p99_ms"]
+        assert stage["failed"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_timed_map_counts_failures():
+    async def every_other(i):
+        if i % 2:
+            raise CircuitOpenError("circuit of api.openai.com is open")
+        return i
+
+    results, summary = await timed_map(every_other, [(i,) for i in range(6)], 2)
+
+    assert results == [0, None, 2, None, 4, None]
+    assert summary["items"] == 6
+    assert summary["failed"] == 3
+    assert summary["errors"] == {"CircuitOpenError": 3}
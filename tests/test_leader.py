@@ -0,0 +1,44 @@
+from uuid import uuid4
+
+import pytest
+
+from src.leader import LeaderElection
+from src.redis_client import redis_client
+
+
+class Role:
+    def __init__(self):
+        self.leading = False
+
+    def elected(self):
+        self.leading = True
+
+    def deposed(self):
+        self.leading = False
+
+
+def candidate(key: str, role: Role) -> LeaderElection:
+    return LeaderElection(
+        key, ttl=5, renew_interval=1, on_elected=role.elected, on_deposed=role.deposed
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_leader_with_failover():
+    key = f"test:leader:{uuid4().hex}"
+    roles = [Role(), Role()]
+    first, second = (candidate(key, role) for role in roles)
+
+    assert await first.step()
+    assert not await second.step()
+    assert await first.step()
+    assert [role.leading for role in roles] == [True, False]
+
+    await first.resign()
+    assert await second.step()
+    assert not await first.step()
+    assert [role.leading for role in roles] == [False, True]
+
+    await redis_client.delete(key)
+    assert not await second.step()
+    assert not roles[1].leading
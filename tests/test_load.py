@@ -0,0 +1,39 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.load import ENDPOINTS, FILTERS, run_scenario
+from benchmarks.primary_keys import connect
+from benchmarks.seed import seed
+from src import init_app
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_seed_and_load(fill_companies_table):
+    connection = await connect()
+    try:
+        result = await seed(connection, 2000, archived=0.25, batch=600, seed=1)
+        active_python = await connection.fetchval(
+            "SELECT count(*) FROM vacancy WHERE NOT is_archived AND lang = 'PYTHON'"
+        )
+        unordered = await connection.fetchval(
+            "SELECT count(*) FROM (SELECT id < lag(id) OVER (ORDER BY created_at)"
+            " AS unordered FROM vacancy) ids WHERE unordered"
+        )
+    finally:
+        await connection.close()
+    assert result["rows"] == 2000
+    assert unordered == 0
+    assert 0 < active_python < 2000
+
+    async with AsyncClient(
+        transport=ASGITransport(app=init_app(init_db=False)), base_url="http://test"
+    ) as client:
+        response = await client.get("/vacancies/all", params=FILTERS["lang"])
+        assert len(response.json()) == active_python
+        path, params = ENDPOINTS["time-trend"]
+        scenario = await run_scenario(
+            client, path, params | FILTERS["lang+grade"], 6, 2, 1
+        )
+    assert scenario["errors"] == 0
+    assert scenario["requests_per_second"] > 0
+    assert 0 < scenario["p50_ms"] <= scenario["p99_ms"] <= scenario["max_ms"]
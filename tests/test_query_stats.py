@@ -0,0 +1,37 @@
+from src.query_stats import QueryStats, fingerprint
+
+
+def test_fingerprint():
+    assert fingerprint(
+        "SELECT vacancy.id FROM vacancy\n"
+        "WHERE vacancy.experience >= $1::INTEGER AND vacancy.lang = 'go'"
+        " AND vacancy.grade IN ($2, $3, $4) LIMIT 10"
+    ) == (
+        "SELECT vacancy.id FROM vacancy WHERE vacancy.experience >= ?"
+        " AND vacancy.lang = ? AND vacancy.grade IN (...) LIMIT ?"
+    )
+    assert fingerprint("SELECT anon_1.id FROM anon_1 WHERE x IN ($1)") == (
+        "SELECT anon_1.id FROM anon_1 WHERE x IN (...)"
+    )
+
+
+def test_query_stats(caplog):
+    stats = QueryStats(slow_query_ms=100)
+    for elapsed_ms in [3, 4, 8, 120]:
+        stats.record_statement("SELECT $1", (1,), elapsed_ms)
+    stats.record_statement("SELECT 2", (), 1)
+    stats.record_pool_wait(0.5)
+
+    result = stats.to_dict()
+    assert len(result["statements"]) == 1
+    statement = result["statements"][0]
+    assert statement["statement"] == "SELECT ?"
+    assert statement["count"] == 5
+    assert statement["max_ms"] == 120
+    assert statement["p50_ms"] == 5
+    assert statement["p99_ms"] == 120
+    assert result["pool_wait"]["count"] == 1
+    assert "Slow query 120.0ms" in caplog.text
+
+    stats.reset()
+    assert stats.to_dict()["statements"] == []
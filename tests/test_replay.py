@@ -0,0 +1,45 @@
+import httpx
+import pytest
+
+from benchmarks import openai_stub
+from benchmarks.offline_run import run_offline
+from benchmarks.replay import ReplayTransport, synthesize
+from src.config import get_settings
+from src.gpt_governor import gpt_governor
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_replay_serves_copies_of_recorded_pages():
+    fixtures = synthesize(per_parser=2)
+    listings = fixtures.scaled_listings(12)
+    links = [link for parser_links in listings.values() for link in parser_links]
+    assert len(links) == len(set(links)) == 12
+
+    async with httpx.AsyncClient(transport=ReplayTransport(fixtures)) as client:
+        original = await client.get(listings["X5VacancyParser"][1])
+        copy = await client.get(listings["X5VacancyParser"][-1])
+        missing = await client.get("https://x5-tech.ru/vacancy/unknown")
+    assert listings["X5VacancyParser"][-1].endswith("~1")
+    assert copy.status_code == 200
+    assert copy.text == original.text
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_daily_processing_offline(fill_companies_table, monkeypatch):
+    for name in ("INGEST_LINK_DELAY", "INGEST_POLL_INTERVAL"):
+        monkeypatch.setattr(get_settings(), name, getattr(get_settings(), name))
+    for name in ("requests_per_minute", "tokens_per_minute"):
+        monkeypatch.setattr(gpt_governor, name, getattr(gpt_governor, name))
+    fixtures = synthesize(per_parser=5)
+    stub_app = openai_stub.create_app(error_rate=0.1, seed=1)
+
+    first = await run_offline(fixtures, links=30, consumers=2, stub_app=stub_app)
+    second = await run_offline(fixtures, links=30, consumers=2, stub_app=stub_app)
+
+    # some of the synthetic titles are not developer vacancies
+    assert 0 < first["active"] < 30
+    assert first["replay_misses"] == first["dead_shards"] == 0
+    assert first["gpt_requests"] > 30
+    assert second["active"] == first["active"]
+    assert second["archived"] == 0
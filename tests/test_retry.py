@@ -0,0 +1,161 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import retry as retry_module
+from src.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HostGuards,
+    RetryBudget,
+    RetryError,
+    RetryPolicy,
+)
+
+
+def status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://careers.example.com/vacancy/1")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+
+class Flaky:
+    def __init__(self, *errors: BaseException):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(retry_module.asyncio, "sleep", sleep)
+    return delays
+
+
+def test_delay_is_jittered_exponential():
+    policy = RetryPolicy(10, base_delay=1, max_delay=8, multiplier=2)
+    for retry_number, ceiling in enumerate((1, 2, 4, 8, 8)):
+        delays = [policy.delay(retry_number) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling / 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_retries_until_success(sleeps):
+    func = Flaky(status_error(503), httpx.ConnectError("refused"))
+    policy = RetryPolicy(3, guards=HostGuards())
+    assert await policy.call(func) == "ok"
+    assert func.calls == 3
+    assert len(sleeps) == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_retry_after_is_honored(sleeps):
+    func = Flaky(status_error(429, {"Retry-After": "7"}))
+    policy = RetryPolicy(2, base_delay=0.01, guards=HostGuards())
+    assert await policy.call(func) == "ok"
+    assert sleeps == [7]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_client_errors_are_not_retried(sleeps):
+    func = Flaky(status_error(404))
+    policy = RetryPolicy(5, guards=HostGuards())
+    with pytest.raises(RetryError) as error:
+        await policy.call(func)
+    assert isinstance(error.value.__cause__, httpx.HTTPStatusError)
+    assert func.calls == 1
+    assert sleeps == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_last_failure_is_raised(sleeps):
+    func = Flaky(*(status_error(500) for _ in range(3)))
+    policy = RetryPolicy(3, guards=HostGuards())
+    with pytest.raises(RetryError):
+        await policy.call(func)
+    assert func.calls == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_retry_budget_is_per_host(sleeps):
+    guards = HostGuards()
+    guards.budgets["careers.example.com"] = RetryBudget(2)
+    policy = RetryPolicy(10, guards=guards)
+    func = Flaky(*(status_error(502) for _ in range(10)))
+    with pytest.raises(RetryError, match="budget"):
+        await policy.call(func)
+    assert func.calls == 3
+    assert guards.budget("other.example.com").try_spend()
+
+
+def test_circuit_opens_and_half_opens(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(retry_module.time, "monotonic", lambda: now)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now += 10
+    assert breaker.allow()
+    # only one trial call while half-open
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_open_circuit_refuses_calls(sleeps):
+    guards = HostGuards()
+    guards.breakers["careers.example.com"] = CircuitBreaker(2, reset_timeout=60)
+    policy = RetryPolicy(5, guards=guards)
+    func = Flaky(*(status_error(503) for _ in range(5)))
+    with pytest.raises(CircuitOpenError):
+        await policy.call(func, host="careers.example.com")
+    assert func.calls == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_client_errors_keep_the_circuit_closed(sleeps):
+    guards = HostGuards()
+    guards.breakers["careers.example.com"] = CircuitBreaker(2, reset_timeout=60)
+    policy = RetryPolicy(3, guards=guards)
+    for error in (status_error(404), status_error(404), RetryError("nested")):
+        with pytest.raises(RetryError):
+            await policy.call(Flaky(error), host="careers.example.com")
+    assert await policy.call(Flaky(), host="careers.example.com") == "ok"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_interrupted_trial_frees_the_circuit(monkeypatch, sleeps):
+    now = 1000.0
+    monkeypatch.setattr(retry_module.time, "monotonic", lambda: now)
+    guards = HostGuards()
+    breaker = guards.breakers["careers.example.com"] = CircuitBreaker(1, 10)
+    breaker.record_failure()
+    now += 10
+    policy = RetryPolicy(3, exceptions=(httpx.HTTPError,), guards=guards)
+    for error in (asyncio.CancelledError(), ValueError("unhandled")):
+        with pytest.raises(type(error)):
+            await policy.call(Flaky(error), host="careers.example.com")
+    assert await policy.call(Flaky(), host="careers.example.com") == "ok"
@@ -0,0 +1,122 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError
+
+from src import singleflight
+from src.redis_client import redis_client
+from src.singleflight import RedisSingleFlight, SingleFlight
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_shares_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    results = await asyncio.gather(*[flight.do("key", compute) for _ in range(10)])
+    assert results == [1] * 10
+    assert await flight.do("key", compute) == 2
+    assert await flight.do("other", compute) == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_shares_exception():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise ValueError
+
+    results = await asyncio.gather(
+        *[flight.do("key", compute) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_survives_cancelled_caller():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+
+
+class Counter:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return 42
+
+
+def redis_flight() -> RedisSingleFlight:
+    return RedisSingleFlight(
+        prefix=f"test:{uuid4().hex}", lock_ttl=2, result_ttl=5, poll_interval=0.01
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redis_single_flight_serves_shared_result():
+    flight = redis_flight()
+    await redis_client.set(f"{flight.prefix}:result:key", "7", ex=5)
+    compute = Counter()
+    assert await flight.do("key", compute, dumps=str, loads=int) == 7
+    assert compute.calls == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redis_single_flight_coalesces_workers():
+    prefix = f"test:{uuid4().hex}"
+    # one instance per worker, the lock is all they share
+    workers = [RedisSingleFlight(prefix, 2, 5, poll_interval=0.01) for _ in range(5)]
+    compute = Counter(delay=0.1)
+    results = await asyncio.gather(
+        *[flight.do("key", compute, dumps=str, loads=int) for flight in workers]
+    )
+    assert results == [42] * 5
+    assert compute.calls == 1
+    assert not await redis_client.exists(f"{prefix}:lock:key")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redis_single_flight_computes_without_redis(monkeypatch):
+    unreachable = Redis(port=1, decode_responses=True, socket_connect_timeout=0.1)
+    monkeypatch.setattr(singleflight, "redis_client", unreachable)
+    compute = Counter()
+    assert await redis_flight().do("key", compute, dumps=str, loads=int) == 42
+    assert compute.calls == 1
+    await unreachable.aclose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redis_single_flight_returns_unpublished_result(monkeypatch):
+    set_ = redis_client.set
+
+    async def set_lock_only(name, *args, **kwargs):
+        if ":result:" in name:
+            raise ConnectionError("redis went away")
+        return await set_(name, *args, **kwargs)
+
+    monkeypatch.setattr(redis_client, "set", set_lock_only)
+    flight = redis_flight()
+    assert await flight.do("key", Counter(), dumps=str, loads=int) == 42
+    assert not await redis_client.exists(f"{flight.prefix}:lock:key")
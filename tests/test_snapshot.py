@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+from src.choices import Companies, Grades, Languages
+from src.snapshot import VacancySnapshot
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def make_rows():
+    rows = [
+        (Languages.GO, Grades.MIDDLE, 2, Companies.X5, True, TODAY, None),
+        (Languages.GO, Grades.SENIOR, 5, Companies.X5, True, TODAY, None),
+        (Languages.PYTHON, Grades.MIDDLE, 1, Companies.SELECTEL, True, TODAY, None),
+        (
+            Languages.PYTHON,
+            Grades.JUNIOR,
+            0,
+            Companies.AVIASALES,
+            False,
+            TODAY - timedelta(days=3),
+            None,
+        ),
+        (
+            Languages.JAVA,
+            Grades.MIDDLE,
+            3,
+            Companies.X5,
+            True,
+            TODAY - timedelta(days=40),
+            TODAY - timedelta(days=35),
+        ),
+        (
+            Languages.GO,
+            Grades.MIDDLE,
+            2,
+            Companies.SELECTEL,
+            True,
+            TODAY - timedelta(days=10),
+            TODAY - timedelta(days=2),
+        ),
+    ]
+    return sorted(rows, key=lambda row: row[5])
+
+
+def test_snapshot_general_info():
+    snapshot = VacancySnapshot(make_rows(), "UTC", "v1")
+
+    info = snapshot.general_info(None, None, 0, 100)
+    assert info.all == 5
+    assert info.active == 3
+    assert info.lang_distribution == {
+        Languages.GO: 3,
+        Languages.PYTHON: 1,
+        Languages.JAVA: 1,
+    }
+    assert info.company_distribution == {Companies.X5: 3, Companies.SELECTEL: 2}
+    assert info.avg_vacancy_lifetime == 6.5
+
+    info = snapshot.general_info(Languages.GO, Grades.MIDDLE, 0, 100)
+    assert info.all == 2
+    assert info.active == 1
+    assert info.lang_distribution is None
+    assert info.grade_distribution is None
+    assert info.avg_vacancy_lifetime == 8
+
+    info = snapshot.general_info(None, None, 4, 100)
+    assert info.all == 1
+    assert info.grade_distribution == {Grades.SENIOR: 1}
+    assert info.avg_vacancy_lifetime is None
+
+    info = snapshot.general_info(Languages.IOS, None, 0, 100)
+    assert info.all == 0
+    assert info.company_distribution is None
+
+
+def test_snapshot_time_trend():
+    snapshot = VacancySnapshot(make_rows(), "UTC", "v1")
+
+    assert snapshot.time_trend(None, None, 0, 100, 7) == {
+        (TODAY - timedelta(days=3)).isoformat(): 1,
+        TODAY.isoformat(): 3,
+    }
+    assert snapshot.time_trend(Languages.GO, None, 0, 100, 30) == {
+        (TODAY - timedelta(days=10)).isoformat(): 1,
+        TODAY.isoformat(): 2,
+    }
+    assert snapshot.time_trend(None, Grades.MIDDLE, 3, 100, 30) == {}
+
+
+def test_empty_snapshot():
+    snapshot = VacancySnapshot([], "UTC", "v1")
+    assert snapshot.general_info(None, None, 0, 100).all == 0
+    assert snapshot.time_trend(None, None, 0, 100, 7) == {}
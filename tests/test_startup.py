@@ -0,0 +1,22 @@
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "fastapi-app"
+
+
+def test_api_does_not_import_worker_modules():
+    code = (
+        "import sys; from src import init_app; init_app(init_db=False); "
+        "print(sorted(name for name in sys.modules if name.partition('.')[0] in "
+        "('selenium', 'openai', 'apscheduler', 'bs4') "
+        "or name in ('src.jobs', 'src.parsers', 'src.worker')))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=APP_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output.strip() == "[]"
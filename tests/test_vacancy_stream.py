@@ -0,0 +1,80 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+from src.choices import Grades, Languages
+from src.redis_client import redis_client
+from src.vacancy_stream import HEARTBEAT, VACANCIES_CHANNEL, VacancyBroadcaster
+
+
+def vacancy_message(lang: Languages, grade: Grades, experience: int = 1) -> str:
+    return json.dumps(
+        {"id": str(uuid4()), "lang": lang, "grade": grade, "experience": experience}
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_broadcaster_filters_vacancies(monkeypatch):
+    broadcaster = VacancyBroadcaster()
+    monkeypatch.setattr(broadcaster, "_start", lambda: None)
+    go_stream = broadcaster.listen(Languages.GO, None, 0, 100)
+    senior_stream = broadcaster.listen(None, Grades.SENIOR, 3, 100)
+    assert await anext(go_stream) == HEARTBEAT
+    assert await anext(senior_stream) == HEARTBEAT
+
+    go_junior = vacancy_message(Languages.GO, Grades.JUNIOR)
+    broadcaster.dispatch(go_junior)
+    broadcaster.dispatch(vacancy_message(Languages.JAVA, Grades.SENIOR, 1))
+    java_senior = vacancy_message(Languages.JAVA, Grades.SENIOR, 5)
+    broadcaster.dispatch(java_senior)
+
+    assert go_junior.encode() in await anext(go_stream)
+    assert java_senior.encode() in await anext(senior_stream)
+    await go_stream.aclose()
+    await senior_stream.aclose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_broadcaster_drops_slow_listener(monkeypatch):
+    broadcaster = VacancyBroadcaster()
+    monkeypatch.setattr(broadcaster, "_start", lambda: None)
+    stream = broadcaster.listen(None, None, 0, 100)
+    await anext(stream)
+
+    for _ in range(1000):
+        broadcaster.dispatch(vacancy_message(Languages.GO, Grades.JUNIOR))
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_broadcaster_survives_malformed_messages():
+    broadcaster = VacancyBroadcaster()
+    stream = broadcaster.listen(Languages.GO, None, 0, 100)
+    try:
+        await anext(stream)
+        async with asyncio.timeout(2):
+            while not dict(await redis_client.pubsub_numsub(VACANCIES_CHANNEL)).get(
+                VACANCIES_CHANNEL
+            ):
+                await asyncio.sleep(0.01)
+        for malformed in (
+            "not json",
+            "[1, 2]",
+            json.dumps({"id": str(uuid4())}),
+            json.dumps(
+                {"id": str(uuid4()), "lang": "go", "grade": None, "experience": "1"}
+            ),
+        ):
+            await redis_client.publish(VACANCIES_CHANNEL, malformed)
+        valid = vacancy_message(Languages.GO, Grades.MIDDLE)
+        await redis_client.publish(VACANCIES_CHANNEL, valid)
+
+        async with asyncio.timeout(2):
+            assert valid.encode() in await anext(stream)
+    finally:
+        await stream.aclose()
+        await broadcaster.close()